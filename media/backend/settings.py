@@ -56,12 +56,79 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# The catalog database: SQLite by default, or PostgreSQL with
+# DATABASE_ENGINE=postgresql, which lifts SQLite's single-writer limit.
+# DATABASE_READ_ONLY makes the connections refuse writes; the FastAPI
+# service, which never writes, runs with it.
+DATABASE_ENGINE = os.getenv("DATABASE_ENGINE", "sqlite")
+DATABASE_READ_ONLY = os.getenv("DATABASE_READ_ONLY", "False").lower() in ("1", "true", "yes")
+
+# Django, the Celery workers and the FastAPI service all open the same
+# SQLite file, so every connection is set up for concurrent readers: WAL lets
+# reads go on while the writer commits, and a writer waits up to
+# SQLITE_TIMEOUT seconds for the lock instead of failing with "database is
+# locked". Write transactions take the lock when they begin (IMMEDIATE),
+# which is where that wait applies. synchronous=NORMAL is durable in WAL
+# mode except for the last commits before a power loss.
+SQLITE_TIMEOUT = float(os.getenv("SQLITE_TIMEOUT", "20"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Seconds a connection is kept open for reuse (by the API's ORM threads, the
+# Celery workers) before it is reopened.
+SQLITE_CONN_MAX_AGE = int(os.getenv("SQLITE_CONN_MAX_AGE", "600"))
+
+SQLITE_PRAGMAS = [
+    "journal_mode=WAL",
+    f"busy_timeout={int(SQLITE_TIMEOUT * 1000)}",
+    "synchronous=NORMAL",
+    f"cache_size=-{SQLITE_CACHE_SIZE_KB}",
+    f"mmap_size={SQLITE_MMAP_SIZE}",
+    "temp_store=MEMORY",
+] + (["query_only=ON"] if DATABASE_READ_ONLY else [])
+
+# PostgreSQL connections are either pooled per process (POSTGRES_POOL_MAX_SIZE
+# > 0, psycopg's pool) or kept open for POSTGRES_CONN_MAX_AGE seconds and
+# checked before reuse.
+POSTGRES_CONN_MAX_AGE = int(os.getenv("POSTGRES_CONN_MAX_AGE", "60"))
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1"))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "0"))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "10"))
+
+if DATABASE_ENGINE == "postgresql":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("POSTGRES_DB", "media"),
+            'USER': os.getenv("POSTGRES_USER", "media"),
+            'PASSWORD': os.getenv("POSTGRES_PASSWORD", ""),
+            'HOST': os.getenv("POSTGRES_HOST", "localhost"),
+            'PORT': os.getenv("POSTGRES_PORT", "5432"),
+            # Django's pool takes over reuse: it needs CONN_MAX_AGE = 0.
+            'CONN_MAX_AGE': 0 if POSTGRES_POOL_MAX_SIZE else POSTGRES_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                **({'pool': {
+                    'min_size': POSTGRES_POOL_MIN_SIZE,
+                    'max_size': POSTGRES_POOL_MAX_SIZE,
+                    'timeout': POSTGRES_POOL_TIMEOUT,
+                }} if POSTGRES_POOL_MAX_SIZE else {}),
+                **({'options': '-c default_transaction_read_only=on'} if DATABASE_READ_ONLY else {}),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': SQLITE_CONN_MAX_AGE,
+            'OPTIONS': {
+                'timeout': SQLITE_TIMEOUT,
+                'init_command': ";".join(f"PRAGMA {pragma}" for pragma in SQLITE_PRAGMAS),
+                **({} if DATABASE_READ_ONLY else {'transaction_mode': 'IMMEDIATE'}),
+            },
+        }
     }
-}
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -92,3 +159,68 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
+
+# Published by the catalog tasks after every committed change; the FastAPI
+# service listens on it to drop its in-process response cache.
+CATALOG_CHANGES_CHANNEL = os.getenv("CATALOG_CHANGES_CHANNEL", "catalog:changes")
+
+# Feeds read by the import tasks: an http(s) URL or a local path / file:// URL.
+CATALOG_SHOWS_FEED = os.getenv("CATALOG_SHOWS_FEED", "https://channelsapi.s3.amazonaws.com/media/test/shows.json")
+CATALOG_MOVIES_FEED = os.getenv("CATALOG_MOVIES_FEED", "https://channelsapi.s3.amazonaws.com/media/test/movies.json")
+
+# Parse / normalize / diff stages a Celery import is split into (a group of
+# shard tasks on the imports queue feeding one writer). Management commands
+# import inline.
+CATALOG_IMPORT_SHARDS = int(os.getenv("CATALOG_IMPORT_SHARDS", "1"))
+# Where a Celery import stages the feed split into shards and the rows the
+# shards found changed, one subdirectory per kind. Every import worker and
+# the writer need to see it.
+CATALOG_IMPORT_STAGING_DIR = os.getenv("CATALOG_IMPORT_STAGING_DIR", str(BASE_DIR / "import_staging"))
+
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "1024"))
+API_CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Threads the FastAPI service runs ORM work on, and requests that may wait
+# for one before the rest are turned away with a 503.
+API_DB_THREADS = int(os.getenv("API_DB_THREADS", "8"))
+API_DB_QUEUE = int(os.getenv("API_DB_QUEUE", "64"))
+
+# Source validation: probes in flight at once, and at once against one host.
+SOURCE_VALIDATION_CONCURRENCY = int(os.getenv("SOURCE_VALIDATION_CONCURRENCY", "32"))
+SOURCE_VALIDATION_PER_HOST = int(os.getenv("SOURCE_VALIDATION_PER_HOST", "4"))
+# Seconds until a URL is probed again: after its first check, after its
+# result flipped, and the cap that steady results back off to.
+SOURCE_CHECK_INTERVAL = int(os.getenv("SOURCE_CHECK_INTERVAL", str(6 * 3600)))
+SOURCE_CHECK_MIN_INTERVAL = int(os.getenv("SOURCE_CHECK_MIN_INTERVAL", "3600"))
+SOURCE_CHECK_MAX_INTERVAL = int(os.getenv("SOURCE_CHECK_MAX_INTERVAL", str(7 * 24 * 3600)))
+
+# Dotted path of the catalog.ratings.RatingProvider that update_ratings_task
+# asks for Kinopoisk ratings.
+RATINGS_PROVIDER = os.getenv("RATINGS_PROVIDER", "catalog.ratings.RandomRatingProvider")
+# A scheduled ratings run (every RATINGS_RUN_INTERVAL seconds) refreshes the
+# stalest ratings, sized so the whole catalog is refreshed within
+# RATINGS_FRESHNESS_WINDOW and releases of the last RATINGS_RECENT_DAYS
+# within RATINGS_RECENT_WINDOW, but never more than RATINGS_RUN_BUDGET
+# provider lookups per run.
+RATINGS_RUN_INTERVAL = int(os.getenv("RATINGS_RUN_INTERVAL", "180"))
+RATINGS_RUN_BUDGET = int(os.getenv("RATINGS_RUN_BUDGET", "1000"))
+RATINGS_FRESHNESS_WINDOW = int(os.getenv("RATINGS_FRESHNESS_WINDOW", str(24 * 3600)))
+RATINGS_RECENT_DAYS = int(os.getenv("RATINGS_RECENT_DAYS", "90"))
+RATINGS_RECENT_WINDOW = int(os.getenv("RATINGS_RECENT_WINDOW", str(3 * 3600)))
+
+# Cache in front of the ratings provider: "sqlite" (a file at
+# RATINGS_CACHE_PATH), "redis" (REDIS_URL) or "" to turn it off. Found
+# ratings live RATINGS_CACHE_TTL seconds, "not found" answers
+# RATINGS_CACHE_NEGATIVE_TTL; the least recently used entries beyond
+# RATINGS_CACHE_MAX_ENTRIES are evicted.
+RATINGS_CACHE = os.getenv("RATINGS_CACHE", "sqlite")
+RATINGS_CACHE_PATH = os.getenv("RATINGS_CACHE_PATH", str(BASE_DIR / "ratings_cache.sqlite3"))
+RATINGS_CACHE_TTL = float(os.getenv("RATINGS_CACHE_TTL", str(6 * 3600)))
+RATINGS_CACHE_NEGATIVE_TTL = float(os.getenv("RATINGS_CACHE_NEGATIVE_TTL", "3600"))
+RATINGS_CACHE_MAX_ENTRIES = int(os.getenv("RATINGS_CACHE_MAX_ENTRIES", "200000"))
+
+# Leases of the scheduled tasks (see catalog.leases): a run's lease expires
+# TASK_LEASE_TTL seconds after its worker stops renewing it, and a run's
+# queued writes hold it for TASK_LEASE_HANDOFF_TTL seconds at most.
+TASK_LEASE_TTL = float(os.getenv("TASK_LEASE_TTL", "60"))
+TASK_LEASE_HANDOFF_TTL = float(os.getenv("TASK_LEASE_HANDOFF_TTL", "3600"))
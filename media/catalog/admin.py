@@ -1,36 +1,97 @@
 from django.contrib import admin
-from .models import Show, Season, Episode, Movie, Source
+from .models import MOVIES, SHOWS, Show, Season, Episode, Movie, Source
 from django.db.models.functions import Coalesce
 from django.db.models import Case, IntegerField, Value, When
+from .changes import catalog_edited
+from .search import index_objects, remove_objects, search
+
+class CatalogChangeAdmin(admin.ModelAdmin):
+    """
+    Admin edits bypass the Celery tasks, so flag the affected snapshots as
+    stale (the API serves live data until the next task rebuilds them) and
+    bump the catalog version so cached client copies are revalidated.
+    """
+    catalog_kinds = ()
+
+    def mark_catalog_edited(self):
+        for kind in self.catalog_kinds:
+            catalog_edited(kind)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.mark_catalog_edited()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.mark_catalog_edited()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self.mark_catalog_edited()
+
+class SearchIndexedAdmin(CatalogChangeAdmin):
+    """
+    Keeps the full-text index in step with admin edits and answers the admin
+    search box from it instead of a LIKE '%q%' scan.
+    """
+    search_kind = None
+    search_limit = 1000
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        index_objects(self.search_kind, [obj])
+
+    def delete_model(self, request, obj):
+        object_id = obj.pk
+        super().delete_model(request, obj)
+        remove_objects(self.search_kind, [object_id])
+
+    def delete_queryset(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        remove_objects(self.search_kind, ids)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        ids = [hit.id for hit in search(search_term, [self.search_kind], self.search_limit)]
+        return queryset.filter(pk__in=ids), False
 
 @admin.register(Show)
-class ShowAdmin(admin.ModelAdmin):
+class ShowAdmin(SearchIndexedAdmin):
+    catalog_kinds = (SHOWS,)
+    search_kind = SHOWS
     list_display = ('title', 'release_date', 'imdb_rating', 'kinopoisk_rating')
     search_fields = ('title',)
     ordering = ('title',)
 
 @admin.register(Season)
-class SeasonAdmin(admin.ModelAdmin):
+class SeasonAdmin(CatalogChangeAdmin):
+    catalog_kinds = (SHOWS,)
     list_display = ('show', 'number')
     list_filter = ('show',)
     ordering = ('show__title', 'number')
 
 @admin.register(Episode)
-class EpisodeAdmin(admin.ModelAdmin):
+class EpisodeAdmin(CatalogChangeAdmin):
+    catalog_kinds = (SHOWS,)
     list_display = ('title', 'season', 'number', 'release_date')
     list_filter = ('season__show',)
     ordering = ('season__show__title', 'season__number', 'number')
 
 @admin.register(Movie)
-class MovieAdmin(admin.ModelAdmin):
+class MovieAdmin(SearchIndexedAdmin):
+    catalog_kinds = (MOVIES,)
+    search_kind = MOVIES
     list_display = ('title', 'release_date', 'imdb_rating', 'kinopoisk_rating')
     search_fields = ('title',)
     ordering = ('title',)
 
 @admin.register(Source)
-class SourceAdmin(admin.ModelAdmin):
-    list_display  = ("url", "source_type", "linked_movie", "linked_episode")
-    list_filter   = ("source_type",)
+class SourceAdmin(CatalogChangeAdmin):
+    catalog_kinds = (SHOWS, MOVIES)
+    list_display  = ("url", "source_type", "linked_movie", "linked_episode", "is_active", "last_status", "last_checked_at")
+    list_filter   = ("source_type", "is_active")
     search_fields = ("url",)
 
     def linked_movie(self, obj):
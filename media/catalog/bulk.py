@@ -0,0 +1,102 @@
+"""
+`bulk_create` with a PostgreSQL fast path for the import tasks.
+
+On PostgreSQL (psycopg 3) a large batch is streamed with `COPY` into a
+temporary staging table and moved into place with one
+`INSERT ... SELECT ... ON CONFLICT`, instead of a multi-row INSERT whose
+parameters the server has to parse and plan. Elsewhere (SQLite), and for
+small batches, it is a plain `bulk_create`, which already upserts with
+`ON CONFLICT` on both backends.
+"""
+import itertools
+from typing import List, Optional, Sequence
+
+from django.db import connection, transaction
+
+# Below this a multi-row INSERT is as fast as creating the staging table.
+COPY_MIN_ROWS = 100
+
+_staging_names = itertools.count()
+
+
+def copy_available(rows: int) -> bool:
+    if connection.vendor != "postgresql" or rows < COPY_MIN_ROWS:
+        return False
+    # Only importable with a PostgreSQL driver installed.
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    return is_psycopg3
+
+
+def bulk_load(
+    model,
+    objs: List,
+    ignore_conflicts: bool = False,
+    update_conflicts: bool = False,
+    unique_fields: Optional[Sequence[str]] = None,
+    update_fields: Optional[Sequence[str]] = None,
+) -> None:
+    """
+    Insert `objs` as `model.objects.bulk_create` would, with the same
+    conflict handling. On upserts the objects get the primary key of the
+    row they were written to, new or existing.
+    """
+    if not objs:
+        return
+    if not copy_available(len(objs)):
+        model.objects.bulk_create(
+            objs,
+            ignore_conflicts=ignore_conflicts,
+            update_conflicts=update_conflicts,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+        return
+    _copy_load(model, objs, ignore_conflicts, update_conflicts, unique_fields or (), update_fields or ())
+
+
+def _copy_load(model, objs, ignore_conflicts, update_conflicts, unique_fields, update_fields) -> None:
+    meta = model._meta
+    quote = connection.ops.quote_name
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    unique = [meta.get_field(name) for name in unique_fields]
+    columns = ", ".join(quote(field.column) for field in fields)
+    table = quote(meta.db_table)
+    staging = quote(f"{meta.db_table}_load_{next(_staging_names)}")
+
+    rows = [
+        [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+        for obj in objs
+    ]
+
+    conflict = ""
+    if update_conflicts:
+        targets = ", ".join(quote(field.column) for field in unique)
+        updates = ", ".join(
+            f"{quote(meta.get_field(name).column)} = EXCLUDED.{quote(meta.get_field(name).column)}"
+            for name in update_fields
+        )
+        conflict = f" ON CONFLICT ({targets}) DO UPDATE SET {updates}"
+    elif ignore_conflicts:
+        conflict = " ON CONFLICT DO NOTHING"
+    returning = ""
+    if update_conflicts:
+        returning = " RETURNING " + ", ".join(quote(field.column) for field in [meta.pk, *unique])
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+        with cursor.copy(f"COPY {staging} ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}{conflict}{returning}")
+        written = cursor.fetchall() if returning else []
+
+    # RETURNING comes back in no particular order: match rows on the
+    # conflict target.
+    ids = {tuple(key): pk for pk, *key in written}
+    for obj in objs:
+        pk = ids.get(tuple(getattr(obj, field.attname) for field in unique))
+        if pk is not None:
+            obj.pk = pk
+            obj._state.adding = False
+            obj._state.db = connection.alias
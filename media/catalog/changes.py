@@ -0,0 +1,57 @@
+"""
+Hooks that every catalog writer calls, so the data derived from the catalog
+(API snapshot, version counter, API response caches) is kept in step from a
+single place.
+"""
+import logging
+from typing import Iterable, Optional
+
+import redis
+from django.conf import settings
+
+from catalog.snapshot import mark_stale, refresh_snapshot
+from catalog.versioning import bump_version
+
+logger = logging.getLogger(__name__)
+
+
+def publish_change(kind: str) -> None:
+    """
+    Tell every API process to drop its cached `kind` responses.
+
+    Best effort: without Redis (e.g. management commands run on their own)
+    the API caches simply expire by TTL.
+    """
+    try:
+        client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1
+        )
+        client.publish(settings.CATALOG_CHANGES_CHANNEL, kind)
+    except redis.RedisError as exc:
+        logger.warning("Could not publish %s catalog change: %s", kind, exc)
+
+
+def catalog_changing(kind: str) -> None:
+    """
+    Call before writing: readers stop trusting derived data for `kind`.
+    """
+    mark_stale(kind)
+
+
+def catalog_changed(kind: str, ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Call once the writes are committed: rebuild derived data for `kind`
+    (or just `ids`), publish a new catalog version and invalidate caches.
+    """
+    refresh_snapshot(kind, ids)
+    bump_version(kind)
+    publish_change(kind)
+
+
+def catalog_edited(kind: str) -> None:
+    """
+    Out-of-band edits (e.g. the admin) that leave the rebuild to the next task.
+    """
+    mark_stale(kind)
+    bump_version(kind)
+    publish_change(kind)
@@ -0,0 +1,155 @@
+"""
+Streaming readers for the JSON array feeds.
+
+`iter_feed` yields the items of a feed one at a time while the body is still
+downloading (or being read from disk), so an import holds one read chunk
+plus the items of its current batch in memory, never the whole feed.
+"""
+import codecs
+import json
+import os
+from contextlib import contextmanager
+from email.utils import formatdate
+from typing import Iterable, Iterator, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+
+FEED_CHUNK_SIZE = 64 * 1024
+FEED_TIMEOUT = (5, 60)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+class FeedError(ValueError):
+    pass
+
+
+class FeedNotModified(Exception):
+    """
+    The feed still matches the validators sent with the request.
+    """
+
+
+class Feed(NamedTuple):
+    chunks: Iterator[str]
+    etag: str = ""
+    last_modified: str = ""
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator:
+    """
+    Decode the items of a top-level JSON array from text `chunks`.
+
+    Each item is decoded with `raw_decode` as soon as it is complete; the
+    consumed part of the buffer is dropped whenever a new chunk arrives.
+    """
+    chunks = iter(chunks)
+    buffer, pos = "", 0
+    state = "start"  # then "first" (item or ]), "item", "separator" (, or ])
+
+    def read_more() -> bool:
+        nonlocal buffer, pos
+        for chunk in chunks:
+            if chunk:
+                buffer, pos = buffer[pos:] + chunk, 0
+                return True
+        return False
+
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos == len(buffer):
+            if read_more():
+                continue
+            raise FeedError("Feed ended before the closing ]")
+
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise FeedError("Feed is not a JSON array")
+            state, pos = "first", pos + 1
+        elif char == "]" and state in ("first", "separator"):
+            return
+        elif state == "separator":
+            if char != ",":
+                raise FeedError(f"Expected , or ] in feed, got {char!r}")
+            state, pos = "item", pos + 1
+        else:
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if read_more():
+                    continue
+                raise FeedError("Malformed item in feed")
+            if (end == len(buffer) or buffer[end] not in _DELIMITERS) and read_more():
+                # A number can continue in the next chunk ("12" + ".5").
+                continue
+            yield item
+            state, pos = "separator", end
+
+
+def _decode(byte_chunks: Iterable[bytes]) -> Iterator[str]:
+    # JSON is UTF-8 whatever the Content-Type says; -sig drops a leading BOM.
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in byte_chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+@contextmanager
+def open_feed(
+    location: str,
+    chunk_size: int = FEED_CHUNK_SIZE,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+):
+    """
+    Open the feed at `location` (an http(s) URL, streamed with requests, or a
+    local path / file:// URL) as a `Feed` of text chunks plus its validators.
+
+    Pass the validators of the previous download to make the request
+    conditional: FeedNotModified is raised, before any body is read, when the
+    feed has not changed since. Local files get validators from their mtime
+    and size.
+    """
+    parsed = urlparse(location)
+    if parsed.scheme in ("http", "https"):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        with requests.get(location, headers=headers, stream=True, timeout=FEED_TIMEOUT) as response:
+            if response.status_code == 304:
+                raise FeedNotModified(location)
+            response.raise_for_status()
+            yield Feed(
+                _decode(response.iter_content(chunk_size)),
+                response.headers.get("ETag", ""),
+                response.headers.get("Last-Modified", ""),
+            )
+    else:
+        path = parsed.path if parsed.scheme == "file" else location
+        with open(path, "rb") as feed:
+            stat = os.fstat(feed.fileno())
+            file_etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            modified = formatdate(stat.st_mtime, usegmt=True)
+            if etag == file_etag or (not etag and last_modified == modified):
+                raise FeedNotModified(location)
+            yield Feed(_decode(iter(lambda: feed.read(chunk_size), b"")), file_etag, modified)
+
+
+def iter_feed(location: str, chunk_size: int = FEED_CHUNK_SIZE) -> Iterator:
+    """
+    Items of the JSON array feed at `location`, decoded incrementally.
+    """
+    with open_feed(location, chunk_size) as feed:
+        yield from iter_json_array(feed.chunks)
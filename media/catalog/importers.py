@@ -0,0 +1,420 @@
+"""
+Bulk import engine for the show and movie feeds.
+
+Feed items are normalized to plain field dicts and written a batch at a time,
+each batch in one transaction. A batch is diffed in memory against the rows
+it already has by a per-record content hash, so only new rows are inserted
+(`bulk_create` with `update_conflicts`, which also covers a concurrent writer
+inserting the same title; streamed with COPY on PostgreSQL, see
+catalog.bulk) and only rows whose feed record changed are updated
+(`bulk_update`). Every level of the show -> season -> episode -> source tree
+costs one SELECT plus at most one INSERT per batch, however many rows the
+batch holds.
+
+`import_feed` wraps that in a conditional GET of the feed, so an unchanged
+feed is not even downloaded. Celery imports run the same steps in stages
+that hand their work on through files instead of memory: `stage_feed`
+splits the feed into shards, `prepare_shard` diffs one shard, and
+`write_shards` writes the changed rows of all of them.
+"""
+import hashlib
+import heapq
+import json
+import os
+import shutil
+from contextlib import ExitStack
+from datetime import date, datetime
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.bulk import bulk_load
+from catalog.changes import catalog_changed, catalog_changing
+from catalog.feeds import FeedNotModified, iter_json_array, open_feed
+from catalog.models import MOVIES, SHOWS, Episode, FeedState, Movie, Season, Show, Source
+from catalog.search import index_objects
+
+IMPORT_BATCH_SIZE = 500
+
+# Columns the feeds own; anything else (the Kinopoisk rating kept up to date
+# by update_ratings_task, edits made in the admin to seasons) is left alone on
+# re-import.
+SHOW_IMPORT_FIELDS = ("description", "image", "release_date", "imdb_rating")
+MOVIE_IMPORT_FIELDS = ("description", "image", "release_date", "imdb_rating", "release_year")
+# Only set when a title is first created.
+CREATE_DEFAULTS = {"kinopoisk_rating": 0.0}
+
+# The feeds carry no seasons, episodes or sources yet, so every show gets the
+# same placeholder structure and every title one placeholder source.
+PLACEHOLDER_SEASONS = (1, 2)
+PLACEHOLDER_EPISODES = (1, 2)
+EPISODE_SOURCE_URL = "https://example.com/episode-placeholder.mp4"
+MOVIE_SOURCE_URL = "https://example.com/movie-placeholder.mp4"
+
+
+class ImportStats(NamedTuple):
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    # Seasons, episodes and sources added under new or incomplete titles.
+    children_created: int = 0
+
+    @property
+    def written(self) -> bool:
+        return bool(self.created or self.updated or self.children_created)
+
+    def merge(self, other: "ImportStats") -> "ImportStats":
+        return ImportStats(*(a + b for a, b in zip(self, other)))
+
+
+def _image_url(raw: str) -> str:
+    return raw if raw.startswith("http") else f"https:{raw}"
+
+
+def normalize_show(item: dict) -> Optional[dict]:
+    """
+    Show fields for one shows.json item, or None if it cannot be stored.
+    """
+    first_aired = item.get("first_aired")
+    try:
+        release_date = datetime.strptime(first_aired, "%Y-%m-%d").date() if first_aired else None
+    except ValueError:
+        release_date = None
+    if not item.get("name") or release_date is None:
+        return None
+    return {
+        "title": item["name"],
+        "description": item.get("description", ""),
+        "image": _image_url(item.get("image", "")),
+        "release_date": release_date,
+        "imdb_rating": item.get("imdb_rating") or 0.0,
+    }
+
+
+def normalize_movie(item: dict) -> Optional[dict]:
+    """
+    Movie fields for one movies.json item, or None if it cannot be stored.
+    """
+    if not item.get("name"):
+        return None
+    year = item.get("release_year")
+    return {
+        "title": item["name"],
+        "description": item.get("description", ""),
+        "image": _image_url(item.get("image", "")),
+        "release_date": date(year, 1, 1) if year else None,
+        "imdb_rating": item.get("imdb_rating") or 0.0,
+        "release_year": year,
+    }
+
+
+def batched(iterable: Iterable, size: int = IMPORT_BATCH_SIZE) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def content_hash(row: dict) -> str:
+    """
+    Fingerprint of a normalized feed record, stored with the row it was
+    written to so an unchanged record is recognized without comparing fields.
+    """
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _upsert_titles(model, rows: List[dict], fields: Sequence[str]) -> Tuple[list, list, ImportStats]:
+    """
+    Write one batch of shows / movies keyed by title.
+
+    Rows whose content hash matches the stored one are not written at all.
+    Returns (all objects of the batch, the created or updated ones, stats).
+    """
+    rows = list({row["title"]: row for row in rows}.values())
+    existing = (
+        model.objects.filter(title__in=[row["title"] for row in rows])
+        .only("id", "title", "content_hash")
+        .in_bulk(field_name="title")
+    )
+
+    created, updated, objects = [], [], []
+    for row in rows:
+        digest = content_hash(row)
+        obj = existing.get(row["title"])
+        if obj is None:
+            obj = model(**CREATE_DEFAULTS, **row, content_hash=digest)
+            created.append(obj)
+        elif obj.content_hash != digest:
+            for name in fields:
+                setattr(obj, name, row[name])
+            obj.content_hash = digest
+            updated.append(obj)
+        objects.append(obj)
+
+    write_fields = [*fields, "content_hash"]
+    if created:
+        bulk_load(model, created, update_conflicts=True, unique_fields=["title"], update_fields=write_fields)
+    if updated:
+        model.objects.bulk_update(updated, write_fields)
+    stats = ImportStats(len(created), len(updated), len(rows) - len(created) - len(updated))
+    return objects, created + updated, stats
+
+
+def _ensure_children(
+    model, parent_field: str, parents: Dict[int, Iterable[int]], build
+) -> Tuple[Dict[Tuple[int, int], int], int]:
+    """
+    Make sure each parent id has a child for each of its numbers.
+
+    `build(parent_id, number)` makes a missing child. Returns
+    {(parent_id, number): child_id} for every requested child and the number
+    of children created.
+    """
+    wanted = [(parent_id, number) for parent_id, numbers in parents.items() for number in numbers]
+    rows = model.objects.filter(**{f"{parent_field}__in": list(parents)}).values_list(parent_field, "number", "id")
+    existing = {(parent_id, number): child_id for parent_id, number, child_id in rows}
+    ids = {key: existing[key] for key in wanted if key in existing}
+    missing = [build(parent_id, number) for parent_id, number in wanted if (parent_id, number) not in ids]
+    if missing:
+        # A no-op update on conflict (rather than ignore) so the ids come back.
+        bulk_load(model, missing, update_conflicts=True, unique_fields=[parent_field, "number"], update_fields=["number"])
+        ids.update({(getattr(child, parent_field), child.number): child.id for child in missing})
+    return ids, len(missing)
+
+
+def _ensure_sources(owner_field: str, owner_ids: Iterable[int], url: str) -> int:
+    owner_ids = list(owner_ids)
+    existing = set(
+        Source.objects.filter(**{f"{owner_field}__in": owner_ids}, url=url).values_list(owner_field, flat=True)
+    )
+    missing = [
+        Source(**{owner_field: owner_id}, url=url, source_type="direct")
+        for owner_id in owner_ids
+        if owner_id not in existing
+    ]
+    if missing:
+        bulk_load(Source, missing, ignore_conflicts=True)
+    return len(missing)
+
+
+def _write_show_batch(rows: List[dict]) -> ImportStats:
+    shows, changed, stats = _upsert_titles(Show, rows, SHOW_IMPORT_FIELDS)
+    release_dates = {row["title"]: row["release_date"] for row in rows}
+
+    seasons, seasons_created = _ensure_children(
+        Season,
+        "show_id",
+        {show.id: PLACEHOLDER_SEASONS for show in shows},
+        lambda show_id, number: Season(
+            show_id=show_id, number=number, description=f"Placeholder season {number}"
+        ),
+    )
+    show_titles = {show.id: show.title for show in shows}
+    season_dates = {
+        season_id: release_dates[show_titles[show_id]] for (show_id, _), season_id in seasons.items()
+    }
+    episodes, episodes_created = _ensure_children(
+        Episode,
+        "season_id",
+        {season_id: PLACEHOLDER_EPISODES for season_id in seasons.values()},
+        lambda season_id, number: Episode(
+            season_id=season_id,
+            number=number,
+            title=f"Episode {number} (Placeholder)",
+            description="",
+            release_date=season_dates[season_id],
+        ),
+    )
+    sources_created = _ensure_sources("episode_id", episodes.values(), EPISODE_SOURCE_URL)
+
+    index_objects(SHOWS, changed)
+    return stats._replace(children_created=seasons_created + episodes_created + sources_created)
+
+
+def _write_movie_batch(rows: List[dict]) -> ImportStats:
+    movies, changed, stats = _upsert_titles(Movie, rows, MOVIE_IMPORT_FIELDS)
+    sources_created = _ensure_sources("movie_id", [movie.id for movie in movies], MOVIE_SOURCE_URL)
+    index_objects(MOVIES, changed)
+    return stats._replace(children_created=sources_created)
+
+
+def _write_rows(rows: Iterable[Optional[dict]], write_batch, batch_size: int, on_write=None) -> ImportStats:
+    """
+    Write normalized rows in batches; None rows (unstorable items) are
+    counted as skipped.
+    """
+    stats = ImportStats()
+    for batch in batched(rows, batch_size):
+        batch_rows = [row for row in batch if row is not None]
+        stats = stats.merge(ImportStats(skipped=len(batch) - len(batch_rows)))
+        if not batch_rows:
+            continue
+        with transaction.atomic():
+            batch_stats = write_batch(batch_rows)
+            # In the same transaction, so readers see the change and the
+            # stale flag together.
+            if batch_stats.written and on_write is not None:
+                on_write()
+        stats = stats.merge(batch_stats)
+    return stats
+
+
+def import_shows(items: Iterable[dict], batch_size: int = IMPORT_BATCH_SIZE, on_write=None) -> ImportStats:
+    """
+    Upsert shows.json items (with their placeholder seasons, episodes and
+    sources) and keep the search index in step. Reads `items` lazily;
+    `on_write()` is called inside every batch transaction that writes.
+    """
+    return _write_rows(map(normalize_show, items), _write_show_batch, batch_size, on_write)
+
+
+def import_movies(items: Iterable[dict], batch_size: int = IMPORT_BATCH_SIZE, on_write=None) -> ImportStats:
+    """
+    Upsert movies.json items (with their placeholder source) and keep the
+    search index in step. Reads `items` lazily; `on_write()` is called inside
+    every batch transaction that writes.
+    """
+    return _write_rows(map(normalize_movie, items), _write_movie_batch, batch_size, on_write)
+
+
+_IMPORTERS = {SHOWS: import_shows, MOVIES: import_movies}
+_NORMALIZERS = {SHOWS: normalize_show, MOVIES: normalize_movie}
+_BATCH_WRITERS = {SHOWS: _write_show_batch, MOVIES: _write_movie_batch}
+_MODELS = {SHOWS: Show, MOVIES: Movie}
+
+
+def _conditional_validators(kind: str, location: str, force: bool) -> dict:
+    state = FeedState.objects.filter(kind=kind, url=location).first()
+    if state is None or force:
+        return {}
+    return {"etag": state.etag, "last_modified": state.last_modified}
+
+
+def finish_import(kind: str, location: str, stats: ImportStats, etag: str, last_modified: str) -> None:
+    """
+    Rebuild the derived catalog data if the import wrote anything, and
+    remember the feed's validators for the next conditional GET.
+    """
+    if stats.written:
+        catalog_changed(kind)
+    state = FeedState.objects.filter(kind=kind).first()
+    if state is None or (state.url, state.etag, state.last_modified) != (location, etag, last_modified):
+        FeedState.objects.update_or_create(
+            kind=kind,
+            defaults={"url": location, "etag": etag, "last_modified": last_modified, "imported_at": timezone.now()},
+        )
+
+
+def import_feed(kind: str, location: str, force: bool = False) -> Optional[ImportStats]:
+    """
+    Import the `kind` feed at `location` if it changed since the last run.
+
+    The validators of the last successful import are sent as a conditional
+    GET; an unchanged feed costs that one round trip and no database writes,
+    and None is returned. Otherwise only new or changed records are written,
+    and the derived catalog data is only rebuilt if something was.
+    """
+    try:
+        with open_feed(location, **_conditional_validators(kind, location, force)) as feed:
+            stats = _IMPORTERS[kind](iter_json_array(feed.chunks), on_write=lambda: catalog_changing(kind))
+    except FeedNotModified:
+        return None
+    finish_import(kind, location, stats, feed.etag, feed.last_modified)
+    return stats
+
+
+def _staged(directory: str, stage: str, shard: int) -> str:
+    return os.path.join(directory, f"{stage}-{shard}.ndjson")
+
+
+def _read_staged(path: str) -> Iterator[list]:
+    with open(path) as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def _freeze(row: dict) -> dict:
+    return {**row, "release_date": row["release_date"] and row["release_date"].isoformat()}
+
+
+def _thaw(row: dict) -> dict:
+    return {**row, "release_date": row["release_date"] and date.fromisoformat(row["release_date"])}
+
+
+def stage_feed(kind: str, location: str, directory: str, shards: int, force: bool = False) -> Optional[Tuple[str, str]]:
+    """
+    Download the `kind` feed, if it changed since the last import, and deal
+    its items round robin into one `[feed_index, item]` NDJSON file per
+    shard in `directory`, replacing whatever an earlier run left there.
+
+    The feed is read once, and each item is written out as soon as it is
+    decoded. Returns the feed's (etag, last_modified), or None if it has
+    not changed.
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    try:
+        with open_feed(location, **_conditional_validators(kind, location, force)) as feed, ExitStack() as stack:
+            files = [stack.enter_context(open(_staged(directory, "feed", shard), "w")) for shard in range(shards)]
+            for index, item in enumerate(iter_json_array(feed.chunks)):
+                files[index % shards].write(json.dumps([index, item]) + "\n")
+    except FeedNotModified:
+        return None
+    return feed.etag, feed.last_modified
+
+
+def prepare_shard(kind: str, directory: str, shard: int, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Normalize the items `stage_feed` dealt to `shard` and write the ones
+    whose content hash differs from the stored row to the shard's rows
+    file, for `write_shards`. Only reads the database, so any number of
+    shards can run at once.
+
+    Returns the shard's counts, `{"changed": n, "unchanged": n, "skipped": n}`;
+    the rows themselves stay on disk.
+    """
+    model, normalize = _MODELS[kind], _NORMALIZERS[kind]
+    changed = unchanged = skipped = 0
+    with open(_staged(directory, "rows", shard), "w") as out:
+        for batch in batched(_read_staged(_staged(directory, "feed", shard)), batch_size):
+            rows = [(index, row) for index, row in ((index, normalize(item)) for index, item in batch) if row is not None]
+            skipped += len(batch) - len(rows)
+            stored = dict(
+                model.objects.filter(title__in=[row["title"] for _, row in rows]).values_list("title", "content_hash")
+            )
+            for index, row in rows:
+                if stored.get(row["title"]) == content_hash(row):
+                    unchanged += 1
+                else:
+                    out.write(json.dumps([index, _freeze(row)]) + "\n")
+                    changed += 1
+    return {"changed": changed, "unchanged": unchanged, "skipped": skipped}
+
+
+def write_shards(kind: str, directory: str, results: List[dict], batch_size: int = IMPORT_BATCH_SIZE) -> ImportStats:
+    """
+    The single-writer stage of a sharded import: stream the changed rows of
+    every shard (`results` are their counts, in shard order) back in feed
+    order, so a title repeated in the feed ends up as its last record, as
+    in a serial import, and write them in batched transactions.
+
+    Each shard's rows file is already in feed order, so merging them holds
+    one row per shard in memory.
+    """
+    rows = heapq.merge(
+        *(_read_staged(_staged(directory, "rows", shard)) for shard in range(len(results))),
+        key=itemgetter(0),
+    )
+    stats = _write_rows(
+        (_thaw(row) for _, row in rows),
+        _BATCH_WRITERS[kind],
+        batch_size,
+        on_write=lambda: catalog_changing(kind),
+    )
+    return stats.merge(ImportStats(
+        unchanged=sum(result["unchanged"] for result in results),
+        skipped=sum(result["skipped"] for result in results),
+    ))
@@ -0,0 +1,175 @@
+"""
+Leases that keep the periodic catalog tasks from overlapping.
+
+A run of a task holds a lease in Redis: a key with a random token that
+expires after TASK_LEASE_TTL seconds unless a heartbeat thread keeps
+extending it, so a worker that dies mid-run frees the task within one TTL.
+While the lease is held, a new run of the same task is skipped (its work is
+coalesced into the run in progress) and counted in the task-run metrics,
+instead of queueing up behind it.
+
+A run that leaves writes queued for the writer hands its lease off: the
+lease is stretched to TASK_LEASE_HANDOFF_TTL and released by a task queued
+after those writes, so the next run only starts once the writer caught up.
+
+Leases are best effort: without Redis (e.g. management commands run on
+their own) every run goes ahead unguarded.
+"""
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = "catalog:lease:"
+METRICS_KEY = "catalog:task-runs"
+
+# Only touch the key while it still holds our token: the lease may have
+# expired and been taken by another run since.
+_EXTEND = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def get_client() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+
+
+class TaskLease:
+    """
+    The lease of one task `name`, held under a token of its own.
+    """
+
+    def __init__(self, name: str, client: redis.Redis, ttl: float, token: Optional[str] = None):
+        self.name = name
+        self.key = LEASE_PREFIX + name
+        self.client = client
+        self.ttl = ttl
+        self.token = token or uuid.uuid4().hex
+        self.handed_off = False
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        return bool(self.client.set(self.key, self.token, nx=True, px=int(self.ttl * 1000)))
+
+    def extend(self, ttl: Optional[float] = None) -> bool:
+        """
+        Push the expiry `ttl` (the lease TTL by default) seconds out; False
+        if the lease is no longer ours.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        return bool(self.client.eval(_EXTEND, 1, self.key, self.token, int(ttl * 1000)))
+
+    def release(self) -> bool:
+        return bool(self.client.eval(_RELEASE, 1, self.key, self.token))
+
+    def start_heartbeat(self) -> None:
+        self._heartbeat = threading.Thread(target=self._beat, name=f"lease-{self.name}", daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.extend():
+                    logger.warning("Lost the %s lease; another run may start", self.name)
+                    return
+            except redis.RedisError as exc:
+                logger.warning("Could not extend the %s lease: %s", self.name, exc)
+
+    def hand_off(self) -> None:
+        """
+        Keep the lease after the run, for TASK_LEASE_HANDOFF_TTL at most;
+        whatever it was handed to calls `release_lease` when done.
+        """
+        self.handed_off = True
+
+
+def _count(client: redis.Redis, name: str, outcome: str) -> None:
+    pipe = client.pipeline()
+    pipe.hincrby(METRICS_KEY, f"{name}:{outcome}", 1)
+    pipe.hset(METRICS_KEY, f"{name}:last_{outcome}_at", timezone.now().isoformat())
+    pipe.execute()
+
+
+@contextmanager
+def exclusive_run(name: str) -> Iterator[Optional[TaskLease]]:
+    """
+    Hold the lease of task `name` for the body, heartbeat included.
+
+    Yields the lease, or None if another run holds it: the body should then
+    return without doing anything; the skip is logged and counted. Without
+    Redis it yields an unheld lease and the body runs anyway.
+    """
+    client = get_client()
+    lease = TaskLease(name, client, settings.TASK_LEASE_TTL)
+    try:
+        acquired = lease.acquire()
+    except redis.RedisError as exc:
+        logger.warning("Running %s without a lease: %s", name, exc)
+        yield lease
+        return
+    if not acquired:
+        logger.info("Skipping %s: the previous run is still in progress", name)
+        try:
+            _count(client, name, "skipped")
+        except redis.RedisError:
+            pass
+        yield None
+        return
+
+    lease.start_heartbeat()
+    try:
+        try:
+            _count(client, name, "started")
+        except redis.RedisError:
+            pass
+        yield lease
+    finally:
+        lease.stop_heartbeat()
+        try:
+            if lease.handed_off:
+                lease.extend(settings.TASK_LEASE_HANDOFF_TTL)
+            else:
+                lease.release()
+        except redis.RedisError as exc:
+            logger.warning("Could not release the %s lease; it expires by itself: %s", name, exc)
+
+
+def release_lease(name: str, token: str) -> bool:
+    """
+    Release a lease handed off by `exclusive_run`, if it is still that run's.
+    """
+    try:
+        return TaskLease(name, get_client(), settings.TASK_LEASE_TTL, token).release()
+    except redis.RedisError as exc:
+        logger.warning("Could not release the %s lease; it expires by itself: %s", name, exc)
+        return False
+
+
+def run_counts() -> Dict[str, str]:
+    """
+    The task-run metrics: "<task>:started" / "<task>:skipped" counts and
+    when each last happened.
+    """
+    return {key.decode(): value.decode() for key, value in get_client().hgetall(METRICS_KEY).items()}
@@ -1,9 +1,22 @@
 from django.core.management.base import BaseCommand
-from catalog.tasks import import_movies_task
+from catalog.tasks import SKIPPED, import_movies_task
 
 class Command(BaseCommand):
     help = "Run import_movies_task synchronously (no Celery)"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--feed",
+            help="Feed URL or local file to import instead of settings.CATALOG_MOVIES_FEED",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Import even if the feed has not changed since the last import",
+        )
+
     def handle(self, *args, **kwargs):
-        import_movies_task()
+        if import_movies_task(kwargs["feed"], force=kwargs["force"], inline=True) == SKIPPED:
+            self.stdout.write(self.style.WARNING("import_movies_task is already running; skipped"))
+            return
         self.stdout.write(self.style.SUCCESS("import_movies_task completed synchronously"))
\ No newline at end of file
@@ -1,9 +1,22 @@
 from django.core.management.base import BaseCommand
-from catalog.tasks import import_shows_task
+from catalog.tasks import SKIPPED, import_shows_task
 
 class Command(BaseCommand):
     help = "Run import_shows_task synchronously (no Celery)"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--feed",
+            help="Feed URL or local file to import instead of settings.CATALOG_SHOWS_FEED",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Import even if the feed has not changed since the last import",
+        )
+
     def handle(self, *args, **kwargs):
-        import_shows_task()
+        if import_shows_task(kwargs["feed"], force=kwargs["force"], inline=True) == SKIPPED:
+            self.stdout.write(self.style.WARNING("import_shows_task is already running; skipped"))
+            return
         self.stdout.write(self.style.SUCCESS("import_shows_task completed synchronously"))
\ No newline at end of file
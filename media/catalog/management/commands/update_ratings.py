@@ -1,9 +1,18 @@
 from django.core.management.base import BaseCommand
-from catalog.tasks import update_ratings_task
+from catalog.tasks import SKIPPED, update_ratings_task
 
 class Command(BaseCommand):
     help = "Run update_ratings_task synchronously (no Celery)"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Refresh every rating instead of the stalest ones a scheduled run would",
+        )
+
     def handle(self, *args, **kwargs):
-        update_ratings_task()
+        if update_ratings_task(full=kwargs["all"], inline=True) == SKIPPED:
+            self.stdout.write(self.style.WARNING("update_ratings_task is already running; skipped"))
+            return
         self.stdout.write(self.style.SUCCESS("update_ratings_task completed synchronously"))
\ No newline at end of file
@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
-from catalog.tasks import validate_sources_task
+from catalog.tasks import SKIPPED, validate_sources_task
 
 class Command(BaseCommand):
     help = "Run validate_sources_task synchronously (no Celery)"
 
     def handle(self, *args, **kwargs):
-        validate_sources_task()
+        if validate_sources_task(inline=True) == SKIPPED:
+            self.stdout.write(self.style.WARNING("validate_sources_task is already running; skipped"))
+            return
         self.stdout.write(self.style.SUCCESS("validate_sources_task completed synchronously"))
\ No newline at end of file
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_alter_source_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotState',
+            fields=[
+                ('kind', models.CharField(choices=[('shows', 'Shows'), ('movies', 'Movies')], max_length=10, primary_key=True, serialize=False)),
+                ('built_at', models.DateTimeField()),
+                ('is_stale', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Snapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('shows', 'Shows'), ('movies', 'Movies')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('body', models.BinaryField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_snapshot_object')],
+            },
+        ),
+    ]
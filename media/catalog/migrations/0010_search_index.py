@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE catalog_search USING fts5("
+        "title, description, kind UNINDEXED, object_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO catalog_search (rowid, kind, object_id, title, description) "
+        "SELECT id * 2, 'shows', id, title, description FROM catalog_show"
+    )
+    schema_editor.execute(
+        "INSERT INTO catalog_search (rowid, kind, object_id, title, description) "
+        "SELECT id * 2 + 1, 'movies', id, title, description FROM catalog_movie"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS catalog_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
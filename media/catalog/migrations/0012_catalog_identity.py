@@ -0,0 +1,80 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:39
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def _delete_duplicates(queryset, fields):
+    """
+    Keep the oldest row of every `fields` group and delete the rest.
+    """
+    deleted = 0
+    groups = queryset.values(*fields).annotate(keep_id=Min('id'), rows=Count('id')).filter(rows__gt=1)
+    for group in groups:
+        duplicates = queryset.filter(**{name: group[name] for name in fields}).exclude(id=group['keep_id'])
+        deleted += duplicates.delete()[0]
+    return deleted
+
+
+def dedupe_catalog(apps, schema_editor):
+    Show = apps.get_model('catalog', 'Show')
+    Season = apps.get_model('catalog', 'Season')
+    Episode = apps.get_model('catalog', 'Episode')
+    Movie = apps.get_model('catalog', 'Movie')
+    Source = apps.get_model('catalog', 'Source')
+    SnapshotState = apps.get_model('catalog', 'SnapshotState')
+
+    deleted = (
+        _delete_duplicates(Show.objects.all(), ['title'])
+        + _delete_duplicates(Movie.objects.all(), ['title'])
+        + _delete_duplicates(Season.objects.all(), ['show', 'number'])
+        + _delete_duplicates(Episode.objects.all(), ['season', 'number'])
+        + _delete_duplicates(Source.objects.filter(movie__isnull=False), ['movie', 'url'])
+        + _delete_duplicates(Source.objects.filter(episode__isnull=False), ['episode', 'url'])
+    )
+    if not deleted:
+        return
+    # The API snapshot and the search index may still hold deleted rows.
+    SnapshotState.objects.update(is_stale=True)
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "DELETE FROM catalog_search WHERE kind = 'shows' AND object_id NOT IN (SELECT id FROM catalog_show)"
+        )
+        schema_editor.execute(
+            "DELETE FROM catalog_search WHERE kind = 'movies' AND object_id NOT IN (SELECT id FROM catalog_movie)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_catalog, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='episode',
+            constraint=models.UniqueConstraint(fields=('season', 'number'), name='unique_episode_number'),
+        ),
+        migrations.AddConstraint(
+            model_name='movie',
+            constraint=models.UniqueConstraint(fields=('title',), name='unique_movie_title'),
+        ),
+        migrations.AddConstraint(
+            model_name='season',
+            constraint=models.UniqueConstraint(fields=('show', 'number'), name='unique_season_number'),
+        ),
+        migrations.AddConstraint(
+            model_name='show',
+            constraint=models.UniqueConstraint(fields=('title',), name='unique_show_title'),
+        ),
+        migrations.AddConstraint(
+            model_name='source',
+            constraint=models.UniqueConstraint(condition=models.Q(('movie__isnull', False)), fields=('movie', 'url'), name='unique_movie_source_url'),
+        ),
+        migrations.AddConstraint(
+            model_name='source',
+            constraint=models.UniqueConstraint(condition=models.Q(('episode__isnull', False)), fields=('episode', 'url'), name='unique_episode_source_url'),
+        ),
+    ]
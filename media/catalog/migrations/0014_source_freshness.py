@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_incremental_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_status',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='source',
+            index=models.Index(fields=['next_check_at'], name='source_next_check_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='source',
+            index=models.Index(fields=['url'], name='source_url_idx'),
+        ),
+    ]
@@ -7,6 +7,19 @@ class Show(models.Model):
     release_date = models.DateField()
     imdb_rating = models.FloatField()
     kinopoisk_rating = models.FloatField()
+    rating_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    content_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['title'], name='unique_show_title'),
+        ]
+        indexes = [
+            models.Index(fields=['release_date'], name='show_release_date_idx'),
+            models.Index(fields=['imdb_rating'], name='show_imdb_rating_idx'),
+            models.Index(fields=['kinopoisk_rating'], name='show_kinopoisk_rating_idx'),
+            models.Index(fields=['rating_updated_at'], name='show_rating_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -18,6 +31,9 @@ class Season(models.Model):
 
     class Meta:
         ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['show', 'number'], name='unique_season_number'),
+        ]
 
     def __str__(self):
         return f'{self.show.title} - Season {self.number}'
@@ -31,6 +47,9 @@ class Episode(models.Model):
 
     class Meta:
         ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'number'], name='unique_episode_number'),
+        ]
 
     def __str__(self):
         return f'{self.season.show.title} S{self.season.number}E{self.number} - {self.title}'
@@ -43,6 +62,20 @@ class Movie(models.Model):
     imdb_rating = models.FloatField()
     kinopoisk_rating = models.FloatField(null=True, blank=True, default=0)
     release_year = models.PositiveIntegerField(null=True, blank=True)
+    rating_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    content_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['title'], name='unique_movie_title'),
+        ]
+        indexes = [
+            models.Index(fields=['release_year', 'imdb_rating'], name='movie_year_imdb_idx'),
+            models.Index(fields=['release_date'], name='movie_release_date_idx'),
+            models.Index(fields=['imdb_rating'], name='movie_imdb_rating_idx'),
+            models.Index(fields=['kinopoisk_rating'], name='movie_kinopoisk_rating_idx'),
+            models.Index(fields=['rating_updated_at'], name='movie_rating_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -58,7 +91,90 @@ class Source(models.Model):
     url = models.URLField()
     source_type = models.CharField(max_length=20, choices=SOURCE_TYPE_CHOICES)
     is_active = models.BooleanField(default=True)
+    # Written by source validation: the HTTP status of the last probe (0 when
+    # the server did not answer) and when the URL is due again (null: now).
+    last_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_status = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    next_check_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        # A source is identified by its URL within the movie / episode it
+        # belongs to.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['movie', 'url'],
+                condition=models.Q(movie__isnull=False),
+                name='unique_movie_source_url',
+            ),
+            models.UniqueConstraint(
+                fields=['episode', 'url'],
+                condition=models.Q(episode__isnull=False),
+                name='unique_episode_source_url',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['next_check_at'], name='source_next_check_idx'),
+            models.Index(fields=['url'], name='source_url_idx'),
+        ]
 
     def __str__(self):
         target = self.movie or self.episode
         return f'{target} - {self.get_source_type_display()}'
+
+SHOWS = 'shows'
+MOVIES = 'movies'
+
+CATALOG_KIND_CHOICES = [
+    (SHOWS, 'Shows'),
+    (MOVIES, 'Movies'),
+]
+
+class Snapshot(models.Model):
+    """
+    Pre-serialized JSON for one show or movie, as served by the API.
+    """
+    kind = models.CharField(max_length=10, choices=CATALOG_KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    body = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_snapshot_object'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.object_id}'
+
+class SnapshotState(models.Model):
+    kind = models.CharField(max_length=10, choices=CATALOG_KIND_CHOICES, primary_key=True)
+    built_at = models.DateTimeField()
+    is_stale = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f'{self.kind} snapshot ({"stale" if self.is_stale else "fresh"})'
+
+class CatalogVersion(models.Model):
+    """
+    Monotonic change counter per catalog kind, bumped after every committed
+    write so the API can answer conditional requests without loading rows.
+    """
+    kind = models.CharField(max_length=10, choices=CATALOG_KIND_CHOICES, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.kind} v{self.version}'
+
+class FeedState(models.Model):
+    """
+    Validators from the last successful import of a feed, sent back as a
+    conditional GET so an unchanged feed is not downloaded again.
+    """
+    kind = models.CharField(max_length=10, choices=CATALOG_KIND_CHOICES, primary_key=True)
+    url = models.CharField(max_length=500)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    imported_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.kind} feed ({self.etag or self.last_modified or "no validators"})'
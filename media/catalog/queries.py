@@ -0,0 +1,59 @@
+from django.db.models import Prefetch
+from catalog.models import Show, Season, Episode, Movie, Source
+from catalog.serializers import MOVIE_LEVELS, SHOW_LEVELS
+
+
+def episode_queryset(include=SHOW_LEVELS):
+    """
+    Episodes ordered by number, with their sources prefetched in one query.
+    """
+    queryset = Episode.objects.order_by("number", "id")
+    if "sources" in include:
+        queryset = queryset.prefetch_related(
+            Prefetch("sources", queryset=Source.objects.order_by("id"))
+        )
+    return queryset
+
+
+def season_queryset(include=SHOW_LEVELS):
+    """
+    Seasons ordered by number, with the episode -> source levels prefetched.
+    """
+    queryset = Season.objects.order_by("number", "id")
+    if "episodes" in include:
+        queryset = queryset.prefetch_related(
+            Prefetch("episodes", queryset=episode_queryset(include))
+        )
+    return queryset
+
+
+def show_tree_queryset(include=SHOW_LEVELS, fields=None):
+    """
+    Shows with the whole show -> season -> episode -> source hierarchy.
+
+    Evaluating it costs one query per level (four in total), no matter how
+    many shows, seasons or episodes are in the catalog. `include` limits the
+    levels that are prefetched and `fields` the show columns that are read.
+    """
+    queryset = Show.objects.order_by("id")
+    if fields is not None:
+        queryset = queryset.only(*fields)
+    if "seasons" in include:
+        queryset = queryset.prefetch_related(
+            Prefetch("seasons", queryset=season_queryset(include))
+        )
+    return queryset
+
+
+def movie_queryset(include=MOVIE_LEVELS, fields=None):
+    """
+    Movies with their sources prefetched in one query.
+    """
+    queryset = Movie.objects.order_by("id")
+    if fields is not None:
+        queryset = queryset.only(*fields)
+    if "sources" in include:
+        queryset = queryset.prefetch_related(
+            Prefetch("sources", queryset=Source.objects.order_by("id"))
+        )
+    return queryset
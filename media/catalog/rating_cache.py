@@ -0,0 +1,234 @@
+"""
+A persistent cache in front of the rating provider.
+
+Each (kind, id) lookup is stored with its own expiry: RATINGS_CACHE_TTL for a
+rating, the shorter RATINGS_CACHE_NEGATIVE_TTL for an id the provider had
+no rating for, so titles that are not found do not cost a lookup on every
+run either. Entries also keep the time they were fetched, which is what a
+ratings run records as the rating's age when it is answered from the
+cache. The store is bounded to RATINGS_CACHE_MAX_ENTRIES, evicting the
+least recently used entries, and lives outside the worker (a local SQLite
+file or Redis) so it survives restarts.
+
+The cache is best effort: when the store fails, lookups go to the provider.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_ERRORS = (redis.RedisError, sqlite3.Error)
+
+# key -> (rating, or None for "not found"; seconds to live)
+Entries = Dict[str, Tuple[Optional[float], float]]
+# key -> (rating, or None for "not found"; time it was fetched)
+Found = Dict[str, Tuple[Optional[float], float]]
+
+
+class CacheStats(NamedTuple):
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    errors: int = 0
+
+
+class SQLiteRatingStore:
+    """
+    The cache as a table in its own SQLite file, apart from the catalog
+    database so cache writes never wait on (or block) catalog writers.
+    """
+
+    def __init__(self, path, max_entries: int, clock: Callable[[], float] = time.time):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS rating_entries (key TEXT PRIMARY KEY, rating REAL, "
+                    "fetched_at REAL NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS rating_entries_expires ON rating_entries (expires_at)")
+                connection.execute("CREATE INDEX IF NOT EXISTS rating_entries_used ON rating_entries (used_at)")
+            self._connection = connection
+        return self._connection
+
+    def get_many(self, keys: Sequence[str], fetched_after: float = 0.0) -> Found:
+        """
+        The live entries for `keys` fetched after `fetched_after`.
+        """
+        now = self._clock()
+        placeholders = ", ".join("?" * len(keys))
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                found = {
+                    key: (rating, fetched_at)
+                    for key, rating, fetched_at in connection.execute(
+                        f"SELECT key, rating, fetched_at FROM rating_entries "
+                        f"WHERE key IN ({placeholders}) AND expires_at > ? AND fetched_at > ?",
+                        [*keys, now, fetched_after],
+                    )
+                }
+                if found:
+                    connection.execute(
+                        f"UPDATE rating_entries SET used_at = ? WHERE key IN ({', '.join('?' * len(found))})",
+                        [now, *found],
+                    )
+        return found
+
+    def set_many(self, entries: Entries) -> None:
+        now = self._clock()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO rating_entries (key, rating, fetched_at, expires_at, used_at) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET rating = excluded.rating, "
+                    "fetched_at = excluded.fetched_at, expires_at = excluded.expires_at, used_at = excluded.used_at",
+                    [(key, rating, now, now + ttl, now) for key, (rating, ttl) in entries.items()],
+                )
+                connection.execute("DELETE FROM rating_entries WHERE expires_at <= ?", [now])
+                (count,) = connection.execute("SELECT COUNT(*) FROM rating_entries").fetchone()
+                if count > self.max_entries:
+                    connection.execute(
+                        "DELETE FROM rating_entries WHERE key IN "
+                        "(SELECT key FROM rating_entries ORDER BY used_at LIMIT ?)",
+                        [count - self.max_entries],
+                    )
+
+
+class RedisRatingStore:
+    """
+    The cache in Redis: one key per entry with a native expiry, holding
+    "<fetched at> <rating>", plus a sorted set of last-use times that bounds
+    the entry count.
+    """
+
+    def __init__(self, url: str, max_entries: int, prefix: str = "ratings:entries:", clock: Callable[[], float] = time.time):
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=1)
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.index = prefix + "lru"
+        self._clock = clock
+
+    def get_many(self, keys: Sequence[str], fetched_after: float = 0.0) -> Found:
+        found = {}
+        for key, value in zip(keys, self.client.mget([self.prefix + key for key in keys])):
+            if value is None:
+                continue
+            fetched_at, _, rating = value.decode().partition(" ")
+            if float(fetched_at) > fetched_after:
+                found[key] = (float(rating) if rating else None, float(fetched_at))
+        if found:
+            now = self._clock()
+            self.client.zadd(self.index, {key: now for key in found})
+        return found
+
+    def set_many(self, entries: Entries) -> None:
+        now = self._clock()
+        pipeline = self.client.pipeline()
+        for key, (rating, ttl) in entries.items():
+            value = f"{now!r} {'' if rating is None else repr(rating)}"
+            pipeline.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+        pipeline.zadd(self.index, {key: now for key in entries})
+        pipeline.zcard(self.index)
+        count = pipeline.execute()[-1]
+        if count > self.max_entries:
+            evicted = [key.decode() for key, _ in self.client.zpopmin(self.index, count - self.max_entries)]
+            self.client.delete(*(self.prefix + key for key in evicted))
+
+
+class CachedRatingProvider:
+    """
+    A RatingProvider that answers from `store` and only asks `provider`
+    for the ids it has no live entry for. `stats` counts this instance's
+    lookups, so a provider built per task run reports per run.
+    """
+
+    def __init__(self, provider, store, ttl: float, negative_ttl: float):
+        self.provider = provider
+        self.store = store
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+
+    def ratings(self, kind: str, ids: Sequence[int]) -> Dict[int, float]:
+        return self.lookup(kind, ids)[0]
+
+    def lookup(
+        self, kind: str, ids: Sequence[int], fetched_after: float = 0.0
+    ) -> Tuple[Dict[int, float], Dict[int, float]]:
+        """
+        The ratings by id, as `ratings` returns them, and when the ids that
+        were answered from the cache were fetched. Entries fetched before
+        `fetched_after` are asked for again.
+        """
+        keys = {f"{kind}:{object_id}": object_id for object_id in ids}
+        errors = 0
+        try:
+            cached = self.store.get_many(list(keys), fetched_after)
+        except CACHE_ERRORS as exc:
+            logger.warning("Rating cache read failed: %s", exc)
+            cached, errors = {}, 1
+
+        ratings = {keys[key]: rating for key, (rating, _) in cached.items() if rating is not None}
+        missing = [object_id for key, object_id in keys.items() if key not in cached]
+        fetched = self.provider.ratings(kind, missing) if missing else {}
+        ratings.update(fetched)
+
+        if missing:
+            try:
+                self.store.set_many({
+                    f"{kind}:{object_id}": (
+                        (fetched[object_id], self.ttl) if object_id in fetched else (None, self.negative_ttl)
+                    )
+                    for object_id in missing
+                })
+            except CACHE_ERRORS as exc:
+                logger.warning("Rating cache write failed: %s", exc)
+                errors += 1
+
+        negative_hits = sum(rating is None for rating, _ in cached.values())
+        self.stats = CacheStats(
+            self.stats.hits + len(cached) - negative_hits,
+            self.stats.negative_hits + negative_hits,
+            self.stats.misses + len(missing),
+            self.stats.errors + errors,
+        )
+        return ratings, {keys[key]: fetched_at for key, (_, fetched_at) in cached.items()}
+
+
+def get_store():
+    """
+    The store named by RATINGS_CACHE ("sqlite", "redis"), or None when the
+    cache is off.
+    """
+    backend = settings.RATINGS_CACHE
+    if backend == "sqlite":
+        return SQLiteRatingStore(settings.RATINGS_CACHE_PATH, settings.RATINGS_CACHE_MAX_ENTRIES)
+    if backend == "redis":
+        return RedisRatingStore(settings.REDIS_URL, settings.RATINGS_CACHE_MAX_ENTRIES)
+    return None
+
+
+def cached(provider):
+    """
+    `provider` behind the configured cache, or unchanged if there is none.
+    """
+    store = get_store()
+    if store is None:
+        return provider
+    return CachedRatingProvider(provider, store, settings.RATINGS_CACHE_TTL, settings.RATINGS_CACHE_NEGATIVE_TTL)
@@ -0,0 +1,232 @@
+"""
+Kinopoisk rating refreshes.
+
+Ratings come from a `RatingProvider` (the class named by the RATINGS_PROVIDER
+setting) that answers for a batch of ids at a time. Each batch is compared
+with the stored ratings and only the rows whose rating moved are written,
+with one `bulk_update` per batch in its own short transaction, so the API
+is never locked out for a whole run.
+
+A scheduled run does not walk the whole catalog: it refreshes the rows whose
+`rating_updated_at` is oldest, recent releases first, and `plan_run` sizes it
+so every row comes round once per RATINGS_FRESHNESS_WINDOW, within the
+per-run RATINGS_RUN_BUDGET of provider lookups.
+"""
+import abc
+import logging
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from catalog.changes import catalog_changed
+from catalog.importers import batched
+from catalog.models import MOVIES, SHOWS, Movie, Show
+from catalog.rating_cache import CachedRatingProvider, cached
+
+logger = logging.getLogger(__name__)
+
+RATINGS_BATCH_SIZE = 500
+
+_MODELS = {SHOWS: Show, MOVIES: Movie}
+
+
+class RatingProvider(abc.ABC):
+    """
+    Looks up the current Kinopoisk ratings of a batch of shows or movies.
+    """
+
+    @abc.abstractmethod
+    def ratings(self, kind: str, ids: Sequence[int]) -> Dict[int, float]:
+        """
+        Ratings by id; ids the provider has no rating for are left out.
+        """
+
+
+class RandomRatingProvider(RatingProvider):
+    """
+    Local stand-in for a real ratings API: a random rating in 5.0-9.0.
+    """
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def ratings(self, kind: str, ids: Sequence[int]) -> Dict[int, float]:
+        return {object_id: round(self.random.uniform(5.0, 9.0), 1) for object_id in ids}
+
+
+def get_provider() -> RatingProvider:
+    """
+    The RATINGS_PROVIDER, behind the ratings cache when one is configured.
+    """
+    return cached(import_string(settings.RATINGS_PROVIDER)())
+
+
+class RatingStats(NamedTuple):
+    checked: int = 0
+    updated: int = 0
+    missing: int = 0
+
+
+def _recent(model, now: datetime):
+    since = (now - timedelta(days=settings.RATINGS_RECENT_DAYS)).date()
+    return model.objects.filter(release_date__gte=since)
+
+
+def _stalest_first(queryset):
+    return queryset.order_by(F("rating_updated_at").asc(nulls_first=True), "id").values_list("id", "kinopoisk_rating")
+
+
+def stalest(kind: str, limit: int, now: Optional[datetime] = None) -> List[Tuple[int, float]]:
+    """
+    (id, rating) of the `limit` rows of `kind` next in line for a refresh:
+    recent releases rated longer than RATINGS_RECENT_WINDOW ago, then the
+    rest by how long ago they were rated (never first).
+    """
+    now = now or timezone.now()
+    model = _MODELS[kind]
+    recent_stale = Q(rating_updated_at__isnull=True) | Q(
+        rating_updated_at__lt=now - timedelta(seconds=settings.RATINGS_RECENT_WINDOW)
+    )
+    rows = list(_stalest_first(_recent(model, now).filter(recent_stale))[:limit])
+    picked = {object_id for object_id, _ in rows}
+    rows.extend(row for row in _stalest_first(model.objects.all())[:limit] if row[0] not in picked)
+    return rows[:limit]
+
+
+def plan_run(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    How many rows of each kind one scheduled run refreshes.
+
+    A run every RATINGS_RUN_INTERVAL has to cover count / runs-per-window
+    rows to cycle the catalog within RATINGS_FRESHNESS_WINDOW, plus the same
+    share of recent releases for their shorter window. Sizes over the
+    budget are scaled down to it.
+    """
+    now = now or timezone.now()
+    interval = settings.RATINGS_RUN_INTERVAL
+    wanted = {
+        kind: (
+            math.ceil(model.objects.count() * interval / settings.RATINGS_FRESHNESS_WINDOW)
+            + math.ceil(_recent(model, now).count() * interval / settings.RATINGS_RECENT_WINDOW)
+        )
+        for kind, model in _MODELS.items()
+    }
+    total, budget = sum(wanted.values()), settings.RATINGS_RUN_BUDGET
+    if total <= budget:
+        return wanted
+    logger.warning(
+        "Ratings need %d lookups per run to stay within the freshness window; the budget is %d",
+        total, budget,
+    )
+    return {kind: budget * count // total for kind, count in wanted.items()}
+
+
+def _all_rows(model, batch_size: int) -> Iterator[List[Tuple[int, float]]]:
+    last_id = 0
+    while True:
+        batch = list(model.objects.filter(id__gt=last_id).order_by("id").values_list("id", "kinopoisk_rating")[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        yield batch
+
+
+def write_ratings(
+    kind: str,
+    changes: Sequence[Tuple[int, float]],
+    ids: Sequence[int],
+    now: datetime,
+    cached_at: Sequence[Tuple[int, datetime]] = (),
+) -> None:
+    """
+    Store one refreshed batch: the (id, rating) `changes`, and as the
+    rating_updated_at of every id that was looked up, the time its rating
+    was fetched: `now`, or for the ids answered from the ratings cache, the
+    (id, fetched at) in `cached_at`.
+
+    The snapshot is not marked stale: it keeps serving the old ratings of
+    these rows until `finish` rebuilds just them at the end of the run.
+    """
+    model = _MODELS[kind]
+    with transaction.atomic():
+        if changes:
+            model.objects.bulk_update(
+                [model(id=object_id, kinopoisk_rating=rating) for object_id, rating in changes],
+                ["kinopoisk_rating"],
+            )
+        cached_at = dict(cached_at)
+        model.objects.filter(id__in=[object_id for object_id in ids if object_id not in cached_at]).update(
+            rating_updated_at=now
+        )
+        if cached_at:
+            model.objects.bulk_update(
+                [model(id=object_id, rating_updated_at=fetched_at) for object_id, fetched_at in cached_at.items()],
+                ["rating_updated_at"],
+            )
+
+
+def refresh_ratings(
+    kind: str,
+    provider: RatingProvider = None,
+    limit: Optional[int] = None,
+    batch_size: int = RATINGS_BATCH_SIZE,
+    now: Optional[datetime] = None,
+    write: Callable = write_ratings,
+    finish: Callable[[str, List[int]], None] = catalog_changed,
+) -> RatingStats:
+    """
+    Ask `provider` for the ratings of the `limit` stalest `kind` rows (all
+    of them by default) and store the ones that changed. Every row asked
+    for gets its `rating_updated_at` stamped, rating changed or not.
+
+    A rating answered from the ratings cache is stamped with the time it
+    was fetched, not `now`, so it comes round again on schedule. Entries
+    older than the shortest refresh window are fetched again: stamped with
+    their age, they would be due again straight away.
+
+    Each batch goes to `write` and, if any rating changed, `finish(kind,
+    ids)` runs after the last one with the ids whose rating changed; the
+    Celery task passes hooks that queue both for the single writer instead.
+    """
+    provider = provider or get_provider()
+    now = now or timezone.now()
+    model = _MODELS[kind]
+    if limit is None:
+        batches = _all_rows(model, batch_size)
+    else:
+        batches = batched(stalest(kind, limit, now), batch_size)
+
+    window = min(settings.RATINGS_RECENT_WINDOW, settings.RATINGS_FRESHNESS_WINDOW)
+    fetched_after = (now - timedelta(seconds=window)).timestamp()
+
+    checked = missing = 0
+    changed = []
+    for batch in batches:
+        current = dict(batch)
+        ids = list(current)
+        if isinstance(provider, CachedRatingProvider):
+            ratings, fetched = provider.lookup(kind, ids, fetched_after)
+        else:
+            ratings, fetched = provider.ratings(kind, ids), {}
+        changes = [
+            (object_id, rating)
+            for object_id, rating in ratings.items()
+            if object_id in current and rating != current[object_id]
+        ]
+        cached_at = [(object_id, datetime.fromtimestamp(at, now.tzinfo)) for object_id, at in fetched.items()]
+        write(kind, changes, ids, now, cached_at)
+
+        checked += len(ids)
+        changed.extend(object_id for object_id, _ in changes)
+        missing += sum(object_id not in ratings for object_id in ids)
+
+    if changed:
+        finish(kind, changed)
+    return RatingStats(checked, len(changed), missing)
@@ -0,0 +1,93 @@
+"""
+API payloads built straight from `.values()` rows.
+
+The live API paths read plain dicts instead of model instances and hand
+them to `dumps` as they are, without building the Pydantic response
+schemas: those would validate every object once on construction and again
+in FastAPI's `response_model`. Each nested level costs one `.values()`
+query, grouped under its parent rows, and the dicts have the same keys in
+the same order as the schemas (and as `catalog.serializers`).
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from catalog.models import Episode, Season, Source
+from catalog.serializers import MOVIE_FIELDS, MOVIE_LEVELS, SHOW_FIELDS, SHOW_LEVELS
+
+SOURCE_COLUMNS = ("id", "url", "source_type")
+EPISODE_COLUMNS = ("id", "number", "title", "release_date")
+SEASON_COLUMNS = ("id", "number")
+
+
+def group_by(rows: Iterable[dict], parent: str) -> Dict[int, List[dict]]:
+    """
+    {parent id: [row, ...]}, each list in the order the rows came in; the
+    `parent` key is taken out of the rows.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.pop(parent)].append(row)
+    return groups
+
+
+def embed(rows: List[dict], key: str, children: Dict[int, List[dict]]) -> List[dict]:
+    """
+    Attach each row's children under `key` and return them all, flattened.
+    """
+    flat = []
+    for row in rows:
+        row[key] = children.get(row["id"], [])
+        flat.extend(row[key])
+    return flat
+
+
+def source_rows(queryset) -> List[dict]:
+    return list(queryset.order_by("id").values(*SOURCE_COLUMNS))
+
+
+def episode_rows(rows: List[dict], include=SHOW_LEVELS) -> List[dict]:
+    """
+    `rows` read with `.values(*EPISODE_COLUMNS)`, with their sources
+    embedded in place.
+    """
+    if "sources" in include and rows:
+        sources = Source.objects.filter(episode_id__in=[row["id"] for row in rows]).order_by("id")
+        embed(rows, "sources", group_by(sources.values("episode_id", *SOURCE_COLUMNS), "episode_id"))
+    return rows
+
+
+def season_rows(rows: List[dict], include=SHOW_LEVELS) -> List[dict]:
+    """
+    `rows` read with `.values(*SEASON_COLUMNS)`, with the episode -> source
+    levels embedded in place.
+    """
+    if "episodes" in include and rows:
+        episodes = Episode.objects.filter(season_id__in=[row["id"] for row in rows]).order_by("number", "id")
+        episodes = group_by(episodes.values("season_id", *EPISODE_COLUMNS), "season_id")
+        episode_rows(embed(rows, "episodes", episodes), include)
+    return rows
+
+
+def show_rows(rows: List[dict], include=SHOW_LEVELS, fields=SHOW_FIELDS) -> List[dict]:
+    """
+    Show dicts from `.values()` rows: `fields` in schema order (any extra
+    columns read for sorting are dropped) and the `include` levels below
+    them, one query per level.
+    """
+    shows = [{name: row[name] for name in fields} for row in rows]
+    if "seasons" in include and shows:
+        seasons = Season.objects.filter(show_id__in=[row["id"] for row in shows]).order_by("number", "id")
+        seasons = group_by(seasons.values("show_id", *SEASON_COLUMNS), "show_id")
+        season_rows(embed(shows, "seasons", seasons), include)
+    return shows
+
+
+def movie_rows(rows: List[dict], include=MOVIE_LEVELS, fields=MOVIE_FIELDS) -> List[dict]:
+    """
+    Movie dicts from `.values()` rows, as `show_rows` does for shows.
+    """
+    movies = [{name: row[name] for name in fields} for row in rows]
+    if "sources" in include and movies:
+        sources = Source.objects.filter(movie_id__in=[row["id"] for row in movies]).order_by("id")
+        embed(movies, "sources", group_by(sources.values("movie_id", *SOURCE_COLUMNS), "movie_id"))
+    return movies
@@ -0,0 +1,132 @@
+"""
+Full-text search over show and movie titles and descriptions.
+
+On SQLite the index is the `catalog_search` FTS5 virtual table (created by
+migration 0010) ranked with bm25, titles weighted above descriptions. Other
+databases fall back to a ranked-by-title LIKE scan until they get a native
+backend. Writers keep the index in sync through `index_objects` /
+`remove_objects`; nothing is indexed implicitly on save.
+"""
+import re
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from django.db import connection
+from django.db.models import Q
+
+from catalog.models import MOVIES, SHOWS, Movie, Show
+
+SEARCH_TABLE = "catalog_search"
+INDEX_BATCH_SIZE = 500
+
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_MODELS = {SHOWS: Show, MOVIES: Movie}
+# FTS5 cannot index the UNINDEXED kind / object_id columns, so rows are keyed
+# by a rowid derived from both to keep updates and deletes off a table scan.
+_ROWID_OFFSETS = {SHOWS: 0, MOVIES: 1}
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    title: str
+    rank: float
+
+
+def tokenize(query: str) -> List[str]:
+    return _TOKEN_RE.findall(query.lower())
+
+
+def _rowid(kind: str, object_id: int) -> int:
+    return object_id * 2 + _ROWID_OFFSETS[kind]
+
+
+class SQLiteFTSBackend:
+    def index(self, kind: str, objects: Sequence) -> None:
+        with connection.cursor() as cursor:
+            for start in range(0, len(objects), INDEX_BATCH_SIZE):
+                batch = objects[start:start + INDEX_BATCH_SIZE]
+                self._delete(cursor, kind, [obj.pk for obj in batch])
+                cursor.executemany(
+                    f"INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, title, description) "
+                    f"VALUES (%s, %s, %s, %s, %s)",
+                    [(_rowid(kind, obj.pk), kind, obj.pk, obj.title, obj.description) for obj in batch],
+                )
+
+    def remove(self, kind: str, ids: Sequence[int]) -> None:
+        with connection.cursor() as cursor:
+            for start in range(0, len(ids), INDEX_BATCH_SIZE):
+                self._delete(cursor, kind, ids[start:start + INDEX_BATCH_SIZE])
+
+    def _delete(self, cursor, kind: str, ids: Sequence[int]) -> None:
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+            [_rowid(kind, object_id) for object_id in ids],
+        )
+
+    def search(self, query: str, kinds: Sequence[str], limit: int) -> List[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Quote every token so user input can never be read as FTS5 syntax;
+        # the trailing * gives prefix (type-ahead) matching.
+        match = " ".join(f'"{token}"*' for token in tokens)
+        kind_placeholders = ", ".join(["%s"] * len(kinds))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT kind, object_id, title, bm25({SEARCH_TABLE}, %s, %s) AS rank "
+                f"FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s AND kind IN ({kind_placeholders}) "
+                f"ORDER BY rank LIMIT %s",
+                [TITLE_WEIGHT, DESCRIPTION_WEIGHT, match, *kinds, limit],
+            )
+            return [SearchHit(kind, int(object_id), title, rank) for kind, object_id, title, rank in cursor.fetchall()]
+
+
+class LikeSearchBackend:
+    """
+    Unindexed fallback: every token must appear in the title or description;
+    title matches rank first.
+    """
+
+    def index(self, kind: str, objects: Sequence) -> None:
+        pass
+
+    def remove(self, kind: str, ids: Sequence[int]) -> None:
+        pass
+
+    def search(self, query: str, kinds: Sequence[str], limit: int) -> List[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        hits = []
+        for kind in kinds:
+            condition = Q()
+            for token in tokens:
+                condition &= Q(title__icontains=token) | Q(description__icontains=token)
+            for object_id, title in _MODELS[kind].objects.filter(condition).values_list("id", "title")[:limit]:
+                in_title = sum(token in title.lower() for token in tokens)
+                hits.append(SearchHit(kind, object_id, title, -float(in_title)))
+        hits.sort(key=lambda hit: (hit.rank, hit.id))
+        return hits[:limit]
+
+
+def get_backend():
+    if connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    return LikeSearchBackend()
+
+
+def index_objects(kind: str, objects: Iterable) -> None:
+    get_backend().index(kind, list(objects))
+
+
+def remove_objects(kind: str, ids: Iterable[int]) -> None:
+    get_backend().remove(kind, list(ids))
+
+
+def search(query: str, kinds: Optional[Sequence[str]] = None, limit: int = 20) -> List[SearchHit]:
+    return get_backend().search(query, list(kinds or (SHOWS, MOVIES)), limit)
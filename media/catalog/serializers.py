@@ -0,0 +1,71 @@
+import orjson
+
+# Nested levels that can be embedded, outermost first.
+SHOW_LEVELS = ("seasons", "episodes", "sources")
+MOVIE_LEVELS = ("sources",)
+
+# Top-level fields, in the same order as the API schemas.
+SHOW_FIELDS = ("id", "title", "description", "image", "release_date", "imdb_rating", "kinopoisk_rating")
+MOVIE_FIELDS = ("id", "title", "description", "image", "release_date", "imdb_rating", "kinopoisk_rating")
+
+
+def source_to_dict(src) -> dict:
+    return {
+        "id": src.id,
+        "url": src.url,
+        "source_type": src.source_type,
+    }
+
+
+def episode_to_dict(ep, include=SHOW_LEVELS) -> dict:
+    data = {
+        "id": ep.id,
+        "number": ep.number,
+        "title": ep.title,
+        "release_date": ep.release_date,
+    }
+    if "sources" in include:
+        data["sources"] = [source_to_dict(src) for src in ep.sources.all()]
+    return data
+
+
+def season_to_dict(season, include=SHOW_LEVELS) -> dict:
+    data = {
+        "id": season.id,
+        "number": season.number,
+    }
+    if "episodes" in include:
+        data["episodes"] = [episode_to_dict(ep, include) for ep in season.episodes.all()]
+    return data
+
+
+def show_to_dict(show, include=SHOW_LEVELS, fields=SHOW_FIELDS) -> dict:
+    """
+    Same shape and key order as service.schemas.show.Show, unless `include`
+    or `fields` trim it down.
+    """
+    data = {name: getattr(show, name) for name in fields}
+    if "seasons" in include:
+        data["seasons"] = [season_to_dict(season, include) for season in show.seasons.all()]
+    return data
+
+
+def movie_to_dict(movie, include=MOVIE_LEVELS, fields=MOVIE_FIELDS) -> dict:
+    """
+    Same shape and key order as service.schemas.movie.Movie, unless `include`
+    or `fields` trim it down.
+    """
+    data = {name: getattr(movie, name) for name in fields}
+    if "sources" in include:
+        data["sources"] = [source_to_dict(src) for src in movie.sources.all()]
+    return data
+
+
+def dumps(data) -> bytes:
+    """
+    Compact JSON bytes, matching what FastAPI sends for the same data.
+
+    orjson encodes dates as ISO strings itself; integer keys (batch results)
+    become strings, as they would with `json`.
+    """
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,136 @@
+"""
+Pre-serialized copies of the API payloads for shows and movies.
+
+The catalog only changes when the Celery tasks run, so instead of rebuilding
+the same JSON on every request we store one serialized body per show / movie
+and let the FastAPI service stream those bytes back. A task marks its kind
+stale before it starts writing and rebuilds it once its writes are committed;
+while a kind is stale (or was never built) readers fall back to the live ORM.
+Ratings runs only touch a few rows each, so they leave the kind fresh and
+rebuild just those rows afterwards.
+"""
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.bulk import bulk_load
+from catalog.models import MOVIES, SHOWS, Snapshot, SnapshotState
+from catalog.queries import movie_queryset, show_tree_queryset
+from catalog.serializers import dumps, movie_to_dict, show_to_dict
+
+BUILD_BATCH_SIZE = 500
+
+_BUILDERS = {
+    SHOWS: (show_tree_queryset, show_to_dict),
+    MOVIES: (movie_queryset, movie_to_dict),
+}
+
+
+def mark_stale(kind: str) -> None:
+    SnapshotState.objects.filter(kind=kind).update(is_stale=True)
+
+
+def is_fresh(kind: str) -> bool:
+    return SnapshotState.objects.filter(kind=kind, is_stale=False).exists()
+
+
+def _serialized_rows(kind: str, ids: Optional[Iterable[int]] = None) -> Iterator[List[Snapshot]]:
+    queryset_factory, to_dict = _BUILDERS[kind]
+    queryset = queryset_factory()
+    if ids is not None:
+        queryset = queryset.filter(id__in=list(ids))
+
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:BUILD_BATCH_SIZE])
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield [
+            Snapshot(kind=kind, object_id=obj.id, body=dumps(to_dict(obj)))
+            for obj in batch
+        ]
+
+
+@transaction.atomic
+def refresh_snapshot(kind: str, ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Rebuild the snapshot for `kind`, or only the rows for `ids` after a
+    write that touched just those rows and left the kind fresh.
+
+    A stale or never built snapshot may be out of date anywhere, so a
+    partial refresh of one rebuilds all of it instead.
+    """
+    if ids is not None and not is_fresh(kind):
+        ids = None
+
+    if ids is None:
+        Snapshot.objects.filter(kind=kind).delete()
+        for rows in _serialized_rows(kind):
+            bulk_load(Snapshot, rows)
+    else:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), BUILD_BATCH_SIZE):
+            chunk = ids[start:start + BUILD_BATCH_SIZE]
+            Snapshot.objects.filter(kind=kind, object_id__in=chunk).delete()
+            for rows in _serialized_rows(kind, chunk):
+                bulk_load(Snapshot, rows)
+
+    SnapshotState.objects.update_or_create(
+        kind=kind,
+        defaults={"built_at": timezone.now(), "is_stale": False},
+    )
+
+
+def read_one(kind: str, object_id: int) -> Optional[bytes]:
+    body = (
+        Snapshot.objects.filter(kind=kind, object_id=object_id)
+        .values_list("body", flat=True)
+        .first()
+    )
+    return bytes(body) if body is not None else None
+
+
+def read_all(kind: str) -> List[bytes]:
+    bodies = (
+        Snapshot.objects.filter(kind=kind)
+        .order_by("object_id")
+        .values_list("body", flat=True)
+    )
+    return [bytes(body) for body in bodies]
+
+
+def read_page(kind: str, limit: int, after_id: int = 0) -> Tuple[List[bytes], Optional[int]]:
+    """
+    One keyset page of bodies ordered by object id.
+
+    Returns the bodies and the id to continue after, or None on the last page.
+    """
+    rows = list(
+        Snapshot.objects.filter(kind=kind, object_id__gt=after_id)
+        .order_by("object_id")
+        .values_list("object_id", "body")[: limit + 1]
+    )
+    bodies = [bytes(body) for _, body in rows[:limit]]
+    if len(rows) <= limit:
+        return bodies, None
+    return bodies, rows[limit - 1][0]
+
+
+def iter_bodies(kind: str, chunk_size: int = BUILD_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Every body of `kind` in id order, read one keyset page at a time.
+    """
+    after_id = 0
+    while after_id is not None:
+        bodies, after_id = read_page(kind, chunk_size, after_id)
+        yield from bodies
+
+
+def read_many(kind: str, ids: Iterable[int]) -> dict:
+    """
+    {object_id: body} for the requested ids that are in the snapshot.
+    """
+    rows = Snapshot.objects.filter(kind=kind, object_id__in=list(ids)).values_list("object_id", "body")
+    return {object_id: bytes(body) for object_id, body in rows}
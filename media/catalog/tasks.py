@@ -1,154 +1,247 @@
-from celery import shared_task
-from catalog.models import Show, Season, Episode, Movie, Source
-import requests
-from datetime import datetime, date
-import random
+import functools
+import logging
+import os
+import shutil
+from datetime import datetime
+
+from celery import chord, shared_task
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.utils import timezone
+from catalog.changes import catalog_changed
+from catalog.models import MOVIES, SHOWS
+from catalog.importers import finish_import, import_feed, prepare_shard, stage_feed, write_shards
+from catalog.leases import exclusive_run, release_lease
+from catalog.rating_cache import CachedRatingProvider
+from catalog.ratings import get_provider, plan_run, refresh_ratings, write_ratings
+from catalog.validation import SourceValidator, check_urls, due_urls, is_reachable, record_checks, validate_sources
+
+logger = logging.getLogger(__name__)
+
+# Every task that writes to the database is routed to the "writes" queue,
+# which a single worker drains one task at a time (see celery_app.py), so
+# SQLite only ever sees one writer. The other tasks only read and do the
+# slow parts (downloads, parsing, provider lookups, probes) in parallel.
+#
+# The scheduled tasks run under a lease (see catalog.leases): a run that
+# starts while the previous one, or the writes it queued, is still going is
+# skipped and returns SKIPPED.
+
+SKIPPED = {"skipped": True}
+
+
+def _hand_off(lease):
+    """
+    The task that releases `lease` once the work queued before it is done.
+    """
+    lease.hand_off()
+    return release_lease_task.si(lease.name, lease.token)
 
-@shared_task
-def import_shows_task():
+
+def _start_import(kind, location, force, shards, inline, lease):
     """
-    1. Fetch the shows.json feed.
-    2. For each show:
-       - Create or update the Show object.
-       - Create two Seasons (Season 1 and Season 2).
-       - In each Season, create two Episodes (Episode 1 and Episode 2).
-       - For each Episode, create one dummy Source.
-       - Set kinopoisk_rating to 0.0 (placeholder).
+    Import inline, or download the feed once here, split into shard files
+    (see catalog.importers.stage_feed), and hand the import to a chord:
+    read-only shard tasks on the imports queue parse, normalize and diff
+    their file (all of the feed with a single shard), and one writer
+    callback streams in only the rows that changed. The lease is released
+    after the write.
     """
-    url = "https://channelsapi.s3.amazonaws.com/media/test/shows.json"
-    response = requests.get(url)
-    data = response.json()
-
-    for item in data:
-        title = item.get("name")
-        description = item.get("description", "")
-        raw_image = item.get("image", "")
-        image = raw_image if raw_image.startswith("http") else f"https:{raw_image}"
-        first_aired = item.get("first_aired")
-        try:
-            release_date = (
-                datetime.strptime(first_aired, "%Y-%m-%d").date()
-                if first_aired
-                else None
-            )
-        except ValueError:
-            release_date = None
-
-        imdb_rating = item.get("imdb_rating") or 0.0
-        kinopoisk_rating = 0.0 
-
-        show_obj, _ = Show.objects.update_or_create(
-            title=title,
-            defaults={
-                "description": description,
-                "image": image,
-                "release_date": release_date,
-                "imdb_rating": imdb_rating,
-                "kinopoisk_rating": kinopoisk_rating,
-            },
-        )
+    if inline:
+        import_feed(kind, location, force=force)
+        return
+    shards = max(shards or settings.CATALOG_IMPORT_SHARDS, 1)
+    directory = os.path.join(settings.CATALOG_IMPORT_STAGING_DIR, kind)
+    validators = stage_feed(kind, location, directory, shards, force=force)
+    if validators is None:
+        return
+    chord(
+        prepare_import_shard_task.s(kind, directory, shard) for shard in range(shards)
+    )(write_import_shards_task.s(kind, location, directory, *validators) | _hand_off(lease))
 
-        for season_number in [1, 2]:
-            season_obj, _ = Season.objects.get_or_create(
-                show=show_obj,
-                number=season_number,
-                defaults={"description": f"Placeholder season {season_number}"},
-            )
-
-            for ep_number in [1, 2]:
-                ep_title = f"Episode {ep_number} (Placeholder)"
-                episode_date = release_date or date.today()
-                episode_obj, _ = Episode.objects.get_or_create(
-                    season=season_obj,
-                    number=ep_number,
-                    defaults={
-                        "title": ep_title,
-                        "description": "",
-                        "release_date": episode_date,
-                    },
-                )
-
-                Source.objects.get_or_create(
-                    episode=episode_obj,
-                    url="https://example.com/episode-placeholder.mp4",
-                    source_type="direct",
-                )
+
+@shared_task
+def import_shows_task(feed=None, force=False, shards=None, inline=False):
+    """
+    1. Conditionally GET the shows.json feed (settings.CATALOG_SHOWS_FEED
+       unless `feed` is given); if it has not changed since the last import,
+       stop there. `force` skips the check.
+    2. Stream it into the bulk importer (see catalog.importers), writing only
+       new or changed shows: each new show gets two placeholder Seasons with
+       two Episodes each, one dummy Source per Episode, and kinopoisk_rating
+       0.0 (placeholder, never reset afterwards). Changed shows are re-indexed
+       for search as they are written. Parsing and diffing run on the imports
+       queue, split into settings.CATALOG_IMPORT_SHARDS shards unless
+       `shards` is given, and only the changed rows go to the writer, through
+       staged files rather than task results; see _start_import. `inline`
+       runs it all in this process.
+    3. If anything was written, rebuild the shows snapshot served by the API
+       and bump the catalog version.
+    Skipped while another shows import is in progress.
+    """
+    with exclusive_run("import_shows_task") as lease:
+        if lease is None:
+            return SKIPPED
+        _start_import(SHOWS, feed or settings.CATALOG_SHOWS_FEED, force, shards, inline, lease)
 
 
 @shared_task
-def import_movies_task():
+def import_movies_task(feed=None, force=False, shards=None, inline=False):
     """
-    1. Fetch the movies.json feed.
-    2. For each movie:
-       - Create or update the Movie object.
-       - Add one dummy Source.
+    1. Conditionally GET the movies.json feed (settings.CATALOG_MOVIES_FEED
+       unless `feed` is given); if it has not changed since the last import,
+       stop there. `force` skips the check.
+    2. Stream it into the bulk importer (see catalog.importers), writing only
+       new or changed movies: each new movie gets one dummy Source. Changed
+       movies are re-indexed for search as they are written. Parsing and
+       diffing run on the imports queue, split into
+       settings.CATALOG_IMPORT_SHARDS shards unless `shards` is given, and
+       only the changed rows go to the writer, through staged files rather
+       than task results; see _start_import. `inline` runs it all in this
+       process.
+    3. If anything was written, rebuild the movies snapshot served by the API
+       and bump the catalog version.
+    Skipped while another movies import is in progress.
     """
-    url = "https://channelsapi.s3.amazonaws.com/media/test/movies.json"
-    response = requests.get(url)
-    data = response.json()
-
-    for item in data:
-        title = item.get("name")
-        description = item.get("description", "")
-        raw_image = item.get("image", "")
-        image = raw_image if raw_image.startswith("http") else f"https:{raw_image}"
-        year = item.get("release_year")
-        release_date = date(year, 1, 1) if year else None
-        imdb_rating = item.get("imdb_rating") or 0.0
-        kinopoisk_rating = 0.0
-
-        movie_obj, _ = Movie.objects.update_or_create(
-            title=title,
-            defaults={
-                "description": description,
-                "image": image,
-                "release_date": release_date,
-                "imdb_rating": imdb_rating,
-                "kinopoisk_rating": kinopoisk_rating,
-                "release_year": year,
-            },
-        )
+    with exclusive_run("import_movies_task") as lease:
+        if lease is None:
+            return SKIPPED
+        _start_import(MOVIES, feed or settings.CATALOG_MOVIES_FEED, force, shards, inline, lease)
 
-        Source.objects.get_or_create(
-            movie=movie_obj,
-            url="https://example.com/movie-placeholder.mp4",
-            source_type="direct",
-        )
+
+@shared_task
+def prepare_import_shard_task(kind, directory, shard):
+    return prepare_shard(kind, directory, shard)
 
 
 @shared_task
-def update_ratings_task():
+def write_import_shards_task(results, kind, location, directory, etag, last_modified):
+    try:
+        stats = write_shards(kind, directory, results)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    finish_import(kind, location, stats, etag, last_modified)
+
+
+def _queue_rating_writes(kind, changes, ids, now, cached_at):
+    write_ratings_task.delay(
+        kind, changes, ids, now.isoformat(), [(object_id, at.isoformat()) for object_id, at in cached_at]
+    )
+
+
+@shared_task
+def update_ratings_task(full=False, inline=False):
     """
-    In prod/actual project: 
-      - Query OMDb/TMDb for IMDb rating (using an API key).
-      - Scrape Kinopoisk, or related.
-    Here: placeholder sets all ratings to random value between 5.0 and 9.0.
+    Refresh kinopoisk_rating from the configured RatingProvider
+    (settings.RATINGS_PROVIDER; a local random stand-in by default, behind
+    the ratings cache), writing only the ratings that changed, in batches:
+      - by default, only the stalest rows, recent releases first, as many
+        as `plan_run` sizes for the freshness window and per-run budget;
+      - with `full`, every movie and show.
+    Lookups run here; each batch's writes, and the rebuild of the changed
+    rows' snapshot after the last one, are queued for the writer unless
+    `inline`. Returns the
+    per-kind and cache statistics of the run, or SKIPPED while the previous
+    run (its queued writes included) is in progress. See catalog.ratings
+    and catalog.rating_cache.
     """
-    for m in Movie.objects.all():
-        ## TODO: replace this with a real API call fetch kinopoisk_rating.
-        m.kinopoisk_rating = round(random.uniform(5.0, 9.0), 1)
-        m.save()
-    for s in Show.objects.all():
-        ## TODO: same as above
-        s.kinopoisk_rating = round(random.uniform(5.0, 9.0), 1)
-        s.save()
+    with exclusive_run("update_ratings_task") as lease:
+        if lease is None:
+            return SKIPPED
+        return _update_ratings(full, inline, lease)
+
+
+def _update_ratings(full, inline, lease):
+    provider = get_provider()
+    hooks = {} if inline else {"write": _queue_rating_writes, "finish": finish_ratings_task.delay}
+    limits = {MOVIES: None, SHOWS: None} if full else plan_run()
+    report = {
+        kind: refresh_ratings(kind, provider, limit=limit, **hooks)._asdict()
+        for kind, limit in limits.items()
+    }
+    if not inline:
+        _hand_off(lease).delay()
+    if isinstance(provider, CachedRatingProvider):
+        report["cache"] = provider.stats._asdict()
+        logger.info(
+            "Ratings cache: %(hits)d hits, %(negative_hits)d not-found hits, %(misses)d misses, %(errors)d errors",
+            report["cache"],
+        )
+    return report
 
 
 @shared_task
-def validate_sources_task():
+def write_ratings_task(kind, changes, ids, now, cached_at=()):
+    write_ratings(
+        kind, changes, ids, datetime.fromisoformat(now),
+        [(object_id, datetime.fromisoformat(at)) for object_id, at in cached_at],
+    )
+
+
+@shared_task
+def finish_ratings_task(kind, ids):
+    catalog_changed(kind, ids)
+
+
+@functools.lru_cache(maxsize=None)
+def _process_validator():
+    # One per worker process: concurrent check tasks share its global and
+    # per-host limits and its keep-alive sessions.
+    return SourceValidator()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def _close_process_validator(**kwargs):
+    if _process_validator.cache_info().currsize:
+        _process_validator().close()
+
+
+@shared_task
+def validate_sources_task(inline=False):
     """
-    In prod/actual project:
-      - Use a HEAD (or GET) request to each Source.url.
-      - If non-200, set is_active=False, optionally store a 'last_checked' timestamp.
-    Here: placeholder will mark any non-200 or exception as inactive.
+    Probe the URLs of the sources that are due, each distinct URL once and
+    concurrently (bounded per host, HEAD with a GET fallback, retried with
+    backoff), and write is_active plus the next check time back to every
+    source sharing it. See catalog.validation.
+
+    This task only pages through the due URLs and queues a chord of one
+    check_sources_task per batch, whose results are queued for the writer;
+    `inline` does the whole run in this process instead. Skipped while the
+    previous run (its checks included) is in progress.
     """
-    for src in Source.objects.all():
-        try:
-            r = requests.head(src.url, timeout=2)
-            if r.status_code != 200:
-                # TODO: maybe log the reason, or retry with exponential backoff.
-                src.is_active = False
-                src.save()
-        except Exception:
-            src.is_active = False
-            src.save()
+    with exclusive_run("validate_sources_task") as lease:
+        if lease is None:
+            return SKIPPED
+        if inline:
+            return validate_sources()._asdict()
+        now = timezone.now()
+        checks = [check_sources_task.s(urls, now.isoformat()) for urls in due_urls(now=now)]
+        if checks:
+            # Each check queues its writes before it returns, so the release
+            # lands on the writer's queue behind all of them.
+            chord(checks)(_hand_off(lease))
+        return {"batches": len(checks)}
+
+
+@shared_task
+def check_sources_task(urls, now):
+    groups, statuses = check_urls(_process_validator(), urls, datetime.fromisoformat(now))
+    record_source_checks_task.delay(
+        [(status, next_check_at.isoformat(), group) for status, next_check_at, group in groups], now
+    )
+    return {"probed": len(urls), "reachable": sum(is_reachable(status) for status in statuses.values())}
+
+
+@shared_task
+def record_source_checks_task(groups, now):
+    deactivated, reactivated = record_checks(
+        [(status, datetime.fromisoformat(next_check_at), urls) for status, next_check_at, urls in groups],
+        datetime.fromisoformat(now),
+    )
+    return {"deactivated": deactivated, "reactivated": reactivated}
+
+
+@shared_task
+def release_lease_task(name, token):
+    release_lease(name, token)
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture(scope="session")
+def redis_url():
+    import redis
+    from django.conf import settings
+
+    try:
+        redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.2).ping()
+    except redis.RedisError:
+        pytest.skip("needs a Redis server at REDIS_URL")
+    return settings.REDIS_URL
+
+
+class SourceServer:
+    """
+    A local host whose paths behave like the servers sources point at.
+    """
+
+    def __init__(self):
+        self.requests = Counter()
+        self.connections = set()
+        self.in_flight = self.max_in_flight = 0
+        lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def respond(self, body):
+                path = self.path.split("?")[0]
+                with lock:
+                    server.requests[self.command, path] += 1
+                    server.connections.add(self.client_address)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    attempt = server.requests[self.command, path]
+                try:
+                    if path == "/slow":
+                        time.sleep(0.05)
+                    if path == "/missing":
+                        status = 404
+                    elif path == "/no-head" and self.command == "HEAD":
+                        status = 405
+                    elif path == "/down" or (path == "/flaky" and attempt == 1):
+                        status = 503
+                    else:
+                        status = 200
+                    self.send_response(status)
+                    self.send_header("Content-Length", "2")
+                    self.end_headers()
+                    if body:
+                        self.wfile.write(b"ok")
+                finally:
+                    with lock:
+                        server.in_flight -= 1
+
+            def do_HEAD(self):
+                self.respond(body=False)
+
+            def do_GET(self):
+                self.respond(body=True)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return self.base + path
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = SourceServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def validator():
+    from catalog.validation import SourceValidator
+
+    validators = []
+
+    def make(**kwargs):
+        kwargs.setdefault("concurrency", 8)
+        kwargs.setdefault("per_host", 4)
+        validators.append(SourceValidator(sleep=lambda seconds: None, **kwargs))
+        return validators[-1]
+
+    yield make
+    for made in validators:
+        made.close()
@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from catalog.bulk import COPY_MIN_ROWS, bulk_load
+from catalog.models import MOVIES, Movie, Snapshot, Source
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="run the suite with DATABASE_ENGINE=postgresql"
+)
+
+
+def movies(count, rating=7.0):
+    return [
+        Movie(title=f"Movie {i}", description="", image="//x", release_date=date(2001, 1, 1), imdb_rating=rating)
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_upserts_give_every_object_the_id_of_its_row():
+    count = COPY_MIN_ROWS + 10
+    first = movies(count // 2)
+    bulk_load(Movie, first, update_conflicts=True, unique_fields=["title"], update_fields=["imdb_rating"])
+
+    second = movies(count, rating=8.0)
+    bulk_load(Movie, second, update_conflicts=True, unique_fields=["title"], update_fields=["imdb_rating"])
+
+    assert Movie.objects.count() == count
+    assert [movie.pk for movie in second[: count // 2]] == [movie.pk for movie in first]
+    assert dict(Movie.objects.values_list("title", "id")) == {movie.title: movie.pk for movie in second}
+    assert set(Movie.objects.values_list("imdb_rating", flat=True)) == {8.0}
+
+
+@pytest.mark.django_db
+def test_ignored_conflicts_are_left_alone():
+    bulk_load(Movie, movies(1), update_conflicts=True, unique_fields=["title"], update_fields=["imdb_rating"])
+    movie_id = Movie.objects.get().id
+
+    def sources(url):
+        return [Source(movie_id=movie_id, url=f"{url}{i}", source_type="direct") for i in range(COPY_MIN_ROWS)]
+
+    bulk_load(Source, sources("https://example.com/a"), ignore_conflicts=True)
+    bulk_load(Source, sources("https://example.com/a") + sources("https://example.com/b"), ignore_conflicts=True)
+    assert Source.objects.count() == 2 * COPY_MIN_ROWS
+
+
+@postgres_only
+@pytest.mark.django_db
+def test_large_batches_are_copied_on_postgres():
+    rows = [Snapshot(kind=MOVIES, object_id=i, body=b'{"id": %d}' % i) for i in range(COPY_MIN_ROWS)]
+    with CaptureQueriesContext(connection) as queries:
+        bulk_load(Snapshot, rows)
+    statements = [query["sql"] for query in queries.captured_queries]
+    assert any(sql.startswith("CREATE TEMPORARY TABLE") for sql in statements)
+    assert not any("VALUES" in sql for sql in statements)
+    assert bytes(Snapshot.objects.get(kind=MOVIES, object_id=7).body) == b'{"id": 7}'
+
+
+def load_settings(monkeypatch, **env):
+    """
+    A fresh copy of backend.settings evaluated under `env`.
+    """
+    for name in ("DATABASE_ENGINE", "DATABASE_READ_ONLY", "POSTGRES_POOL_MAX_SIZE"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    spec = importlib.util.spec_from_file_location(
+        "settings_under_test", os.path.join(os.path.dirname(__file__), "..", "..", "backend", "settings.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.DATABASES["default"]
+
+
+def test_database_is_configured_from_the_environment(monkeypatch):
+    assert load_settings(monkeypatch)["ENGINE"] == "django.db.backends.sqlite3"
+
+    persistent = load_settings(monkeypatch, DATABASE_ENGINE="postgresql", POSTGRES_HOST="db")
+    assert persistent["ENGINE"] == "django.db.backends.postgresql"
+    assert persistent["HOST"] == "db"
+    assert (persistent["CONN_MAX_AGE"], persistent["CONN_HEALTH_CHECKS"]) == (60, True)
+    assert "pool" not in persistent["OPTIONS"]
+
+    pooled = load_settings(monkeypatch, DATABASE_ENGINE="postgresql", POSTGRES_POOL_MAX_SIZE="8")
+    assert pooled["CONN_MAX_AGE"] == 0
+    assert pooled["OPTIONS"]["pool"]["max_size"] == 8
+
+    read_only = load_settings(monkeypatch, DATABASE_ENGINE="postgresql", DATABASE_READ_ONLY="1")
+    assert read_only["OPTIONS"]["options"] == "-c default_transaction_read_only=on"
+    assert "query_only=ON" in load_settings(monkeypatch, DATABASE_READ_ONLY="1")["OPTIONS"]["init_command"]
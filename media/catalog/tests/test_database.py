@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from catalog.importers import import_movies
+from catalog.models import Movie
+
+
+pytestmark = pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite tuning")
+
+
+def open_database(path, alias="file", **options):
+    """
+    A connection to the SQLite file at `path`, set up as settings.DATABASES
+    sets up every connection of the app (the test database is in memory).
+    """
+    options = {**settings.DATABASES["default"]["OPTIONS"], **options}
+    database = DatabaseWrapper({**connection.settings_dict, "NAME": str(path), "OPTIONS": options}, alias=alias)
+    database.ensure_connection()
+    return database
+
+
+def pragma(database, name):
+    with database.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+def count_movies(database):
+    with database.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {Movie._meta.db_table}")
+        return cursor.fetchone()[0]
+
+
+def movie_items(count, prefix):
+    return [
+        {"name": f"{prefix} {i}", "image": "https://example.com/movie.jpg", "release_year": 2001, "imdb_rating": 7.0}
+        for i in range(count)
+    ]
+
+
+@contextmanager
+def default_database(path):
+    """
+    Point this thread's default connection at the SQLite file at `path`, so
+    the app's own code (importers, transactions) runs against it.
+    """
+    test_database = connections["default"]
+    connections["default"] = open_database(path, alias="default")
+    try:
+        yield
+    finally:
+        connections["default"].close()
+        connections["default"] = test_database
+
+
+@pytest.fixture(autouse=True)
+def unblocked(django_db_blocker):
+    # These tests open their own connections to files next to the test
+    # database, which pytest-django would otherwise refuse.
+    with django_db_blocker.unblock():
+        yield
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = open_database(tmp_path / "db.sqlite3")
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def catalog_database(tmp_path):
+    """
+    A migrated catalog database in a file, and a connection to it.
+    """
+    path = tmp_path / "catalog.sqlite3"
+    with default_database(path):
+        call_command("migrate", verbosity=0)
+    database = open_database(path)
+    yield path, database
+    database.close()
+
+
+def test_connections_are_tuned_for_concurrent_readers(database):
+    assert pragma(database, "journal_mode") == "wal"
+    assert pragma(database, "busy_timeout") == settings.SQLITE_TIMEOUT * 1000
+    assert pragma(database, "synchronous") == 1  # NORMAL
+    assert pragma(database, "temp_store") == 2  # MEMORY
+    assert pragma(database, "cache_size") == -settings.SQLITE_CACHE_SIZE_KB
+    assert pragma(database, "mmap_size") == settings.SQLITE_MMAP_SIZE
+    assert pragma(database, "query_only") == 0
+
+
+def test_reads_continue_during_a_bulk_import(catalog_database):
+    path, database = catalog_database
+    with default_database(path):
+        import_movies(movie_items(1000, "Seed"))
+
+    batch_size, batches = 250, 20
+    importing = threading.Event()
+
+    def bulk_import():
+        with default_database(path):
+            importing.set()
+            import_movies(movie_items(batch_size * batches, "Movie"), batch_size=batch_size)
+
+    writer = threading.Thread(target=bulk_import)
+    writer.start()
+    importing.wait()
+    counts, slowest = [], 0.0
+    while writer.is_alive():
+        started = time.monotonic()
+        counts.append(count_movies(database))
+        slowest = max(slowest, time.monotonic() - started)
+    writer.join()
+
+    # Every read went through at once and saw whole committed batches.
+    assert len(counts) > 10
+    assert counts == sorted(counts)
+    assert {(count - 1000) % batch_size for count in counts} == {0}
+    assert slowest < 0.5
+    assert count_movies(database) == 1000 + batch_size * batches
+
+
+def test_read_only_connections_refuse_writes(tmp_path, database):
+    with database.cursor() as cursor:
+        cursor.execute("CREATE TABLE title (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    options = settings.DATABASES["default"]["OPTIONS"]
+    reader = open_database(tmp_path / "db.sqlite3", init_command=options["init_command"] + ";PRAGMA query_only=ON")
+    try:
+        assert pragma(reader, "query_only") == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            with reader.cursor() as cursor:
+                cursor.execute("INSERT INTO title (name) VALUES ('x')")
+    finally:
+        reader.close()
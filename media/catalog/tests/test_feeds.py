@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from catalog.feeds import FeedError, iter_feed, iter_json_array
+from catalog.importers import import_movies
+from catalog.models import Movie
+
+def test_items_split_across_chunks_decode_intact():
+    items = [{"name": "Amélie", "tags": ["a", "b"]}, 12.5e3, -7, "x,]", None, True, [[]]]
+    text = json.dumps(items, ensure_ascii=False)
+    for size in (1, 2, 5, len(text)):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert list(iter_json_array(chunks)) == items
+
+@pytest.mark.parametrize("text", ["{}", "[1,", "[1 2]", "[1,]", ""])
+def test_malformed_feeds_are_rejected(text):
+    with pytest.raises(FeedError):
+        list(iter_json_array([text]))
+
+def test_items_are_yielded_before_the_feed_is_fully_read():
+    read = []
+
+    def chunks():
+        yield "["
+        for i in range(10_000):
+            read.append(i)
+            yield json.dumps({"name": f"Item {i}"}) + ","
+        yield '{"name": "last"}]'
+
+    items = iter_json_array(chunks())
+    for _ in range(3):
+        next(items)
+    assert len(read) <= 4
+
+@pytest.mark.django_db
+def test_importer_reads_a_local_feed(tmp_path):
+    feed = tmp_path / "movies.json"
+    feed.write_text(json.dumps([
+        {"name": f"Local {i}", "image": "//example.com/m.jpg", "release_year": 1999, "imdb_rating": 6.5}
+        for i in range(5)
+    ]), encoding="utf-8")
+
+    assert len(list(iter_feed(str(feed), chunk_size=16))) == 5
+    import_movies(iter_feed(feed.as_uri(), chunk_size=16), batch_size=2)
+    assert Movie.objects.filter(title__startswith="Local").count() == 5
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from catalog.importers import (
+    ImportStats,
+    finish_import,
+    import_feed,
+    import_movies,
+    import_shows,
+    prepare_shard,
+    stage_feed,
+    write_shards,
+)
+from catalog.models import MOVIES, Episode, Movie, Season, Show, Source
+from catalog.search import search
+from catalog.versioning import get_version
+
+def show_items(count, rating=7.0):
+    return [
+        {
+            "name": f"Show {i}",
+            "description": "A show.",
+            "image": "//example.com/show.jpg",
+            "first_aired": "2015-03-01",
+            "imdb_rating": rating,
+        }
+        for i in range(count)
+    ]
+
+def movie_items(count, rating=7.0):
+    return [
+        {"name": f"Movie {i}", "image": "https://example.com/movie.jpg", "release_year": 2001, "imdb_rating": rating}
+        for i in range(count)
+    ]
+
+@pytest.mark.django_db
+def test_show_import_builds_the_placeholder_tree_once():
+    assert import_shows(show_items(3)) == ImportStats(created=3, children_created=3 * (2 + 4 + 4))
+    assert import_shows(show_items(3)) == ImportStats(unchanged=3)
+
+    assert Show.objects.count() == 3
+    assert Season.objects.count() == 3 * 2
+    assert Episode.objects.count() == 3 * 2 * 2
+    assert Source.objects.filter(episode__isnull=False).count() == 3 * 2 * 2
+    show = Show.objects.get(title="Show 0")
+    assert show.image == "https://example.com/show.jpg"
+    assert {hit.id for hit in search("show")} == set(Show.objects.values_list("id", flat=True))
+
+@pytest.mark.django_db
+def test_movie_import_updates_only_changed_rows_and_skips_invalid_items():
+    import_movies(movie_items(3))
+    Movie.objects.filter(title="Movie 1").update(kinopoisk_rating=6.2)
+    items = movie_items(3)
+    items[1]["imdb_rating"] = 8.5
+    items.append({"description": "no title"})
+
+    assert import_movies(items) == ImportStats(updated=1, unchanged=2, skipped=1)
+    movie = Movie.objects.get(title="Movie 1")
+    assert (movie.imdb_rating, movie.kinopoisk_rating) == (8.5, 6.2)
+    assert Source.objects.filter(movie__isnull=False).count() == 3
+
+def insert_statements(model, rows):
+    """
+    The INSERT statements `bulk_create` splits `rows` new rows of `model`
+    into on this backend.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    return -(-rows // connection.ops.bulk_batch_size(fields, [model()] * rows))
+
+@pytest.mark.django_db
+def test_import_statement_count_does_not_grow_with_the_batch(monkeypatch):
+    # Count the multi-row INSERTs, not PostgreSQL's COPY fast path.
+    monkeypatch.setattr("catalog.bulk.COPY_MIN_ROWS", 10**9)
+    with CaptureQueriesContext(connection) as small:
+        import_shows(show_items(2))
+    Show.objects.all().delete()
+    with CaptureQueriesContext(connection) as large:
+        import_shows(show_items(40))
+    # Only Django's splitting of an INSERT past the backend's parameter cap
+    # (999 on SQLite) may add statements, never the number of shows.
+    split = sum(
+        insert_statements(model, 40 * per_show) - insert_statements(model, 2 * per_show)
+        for model, per_show in ((Season, 2), (Episode, 4), (Source, 4))
+    )
+    assert len(large) == len(small) + split
+
+    with CaptureQueriesContext(connection) as batched:
+        import_movies(movie_items(40), batch_size=10)
+    with CaptureQueriesContext(connection) as rerun:
+        import_movies(movie_items(40), batch_size=10)
+    # Four batches; an unchanged re-run only reads.
+    assert len(batched) < 4 * 10
+    assert not [q for q in rerun.captured_queries if not q["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))]
+
+class FeedServer:
+    """
+    A local feed endpoint that honours If-None-Match.
+    """
+
+    def __init__(self, body):
+        self.body = body
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                etag = '"%s"' % hashlib.sha1(server.body).hexdigest()
+                server.requests.append(dict(self.headers))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/movies.json"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def feed_server():
+    server = FeedServer(json.dumps(movie_items(3)).encode())
+    yield server
+    server.close()
+
+@pytest.mark.django_db
+def test_unchanged_feed_costs_one_round_trip_and_no_writes(feed_server):
+    assert import_feed(MOVIES, feed_server.url) == ImportStats(created=3, children_created=3)
+    version = get_version(MOVIES)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert import_feed(MOVIES, feed_server.url) is None
+    assert len(feed_server.requests) == 2
+    assert feed_server.requests[1]["If-None-Match"]
+    assert [q["sql"].split()[0] for q in queries.captured_queries] == ["SELECT"]
+    assert get_version(MOVIES) == version
+
+    items = movie_items(4)
+    items[0]["imdb_rating"] = 9.1
+    feed_server.body = json.dumps(items).encode()
+    assert import_feed(MOVIES, feed_server.url) == ImportStats(created=1, updated=1, unchanged=2, children_created=1)
+    assert get_version(MOVIES)[0] == version[0] + 1
+
+@pytest.mark.django_db
+def test_local_feed_is_skipped_until_the_file_changes(tmp_path):
+    feed = tmp_path / "movies.json"
+    feed.write_text(json.dumps(movie_items(2)))
+    assert import_feed(MOVIES, str(feed)).created == 2
+    assert import_feed(MOVIES, str(feed)) is None
+
+    feed.write_text(json.dumps(movie_items(3)))
+    assert import_feed(MOVIES, str(feed)).created == 1
+    assert import_feed(MOVIES, str(feed), force=True) == ImportStats(unchanged=3)
+
+def staged_titles(directory):
+    return [json.loads(line)[1]["title"] for path in sorted(Path(directory).glob("rows-*.ndjson")) for line in path.open()]
+
+@pytest.mark.django_db
+def test_sharded_import_matches_a_serial_one(tmp_path):
+    items = movie_items(7)
+    items.append({**items[2], "imdb_rating": 9.9})  # repeated title: the last record wins
+    items.append({"description": "no title"})
+    feed = tmp_path / "movies.json"
+    feed.write_text(json.dumps(items))
+    staging = str(tmp_path / "staging")
+
+    assert stage_feed(MOVIES, str(feed), staging, 3) is not None
+    results = [prepare_shard(MOVIES, staging, shard, batch_size=2) for shard in range(3)]
+    assert sum(result["changed"] for result in results) == 8
+    stats = write_shards(MOVIES, staging, json.loads(json.dumps(results)), batch_size=3)
+    assert (stats.created, stats.skipped) == (7, 1)
+    assert Movie.objects.get(title="Movie 2").imdb_rating == 9.9
+
+    for shard in range(3):
+        prepare_shard(MOVIES, staging, shard)
+    # Only the repeated title's first record differs from what was stored.
+    assert staged_titles(staging) == ["Movie 2"]
+
+@pytest.mark.django_db
+def test_shards_share_one_download_of_the_feed(feed_server, tmp_path):
+    staging = str(tmp_path / "staging")
+    etag, last_modified = stage_feed(MOVIES, feed_server.url, staging, 2)
+    results = [prepare_shard(MOVIES, staging, shard) for shard in range(2)]
+    assert len(feed_server.requests) == 1
+    assert results == [{"changed": 2, "unchanged": 0, "skipped": 0}, {"changed": 1, "unchanged": 0, "skipped": 0}]
+
+    finish_import(MOVIES, feed_server.url, write_shards(MOVIES, staging, results), etag, last_modified)
+    assert Movie.objects.count() == 3
+    assert stage_feed(MOVIES, feed_server.url, staging, 2) is None
+    assert len(feed_server.requests) == 2
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.conf import settings
+from django.test import override_settings
+from catalog import tasks
+from catalog.leases import LEASE_PREFIX, METRICS_KEY, exclusive_run, get_client, release_lease, run_counts
+
+NO_REDIS = "redis://127.0.0.1:1/0"
+
+
+@override_settings(REDIS_URL=NO_REDIS, RATINGS_CACHE="")
+@pytest.mark.django_db
+def test_runs_go_ahead_without_redis():
+    with exclusive_run("update_ratings_task") as lease:
+        assert lease is not None
+        with exclusive_run("update_ratings_task") as other:
+            assert other is not None
+    assert tasks.update_ratings_task(inline=True)["movies"] == {"checked": 0, "updated": 0, "missing": 0}
+
+
+@pytest.fixture
+def client(redis_url):
+    client = get_client()
+    client.delete(*client.keys(LEASE_PREFIX + "test-*") or [LEASE_PREFIX + "test-task"])
+    fields = [field for field in client.hkeys(METRICS_KEY) if field.startswith(b"test-")]
+    if fields:
+        client.hdel(METRICS_KEY, *fields)
+    return client
+
+
+def test_overlapping_runs_are_skipped_and_counted(client):
+    with exclusive_run("test-task") as lease:
+        assert lease is not None
+        with exclusive_run("test-task") as other:
+            assert other is None
+        with exclusive_run("test-other-task") as other:
+            assert other is not None
+    with exclusive_run("test-task") as lease:
+        assert lease is not None
+
+    counts = run_counts()
+    assert counts["test-task:started"] == "2"
+    assert counts["test-task:skipped"] == "1"
+    assert "test-task:last_skipped_at" in counts
+
+
+@override_settings(TASK_LEASE_TTL=0.3)
+def test_heartbeat_keeps_a_long_run_leased_and_a_dead_one_expires(client):
+    with exclusive_run("test-task") as lease:
+        time.sleep(1)
+        assert client.get(lease.key).decode() == lease.token
+    assert not client.exists(LEASE_PREFIX + "test-task")
+
+    client.set(LEASE_PREFIX + "test-task", "a worker that died", px=300)
+    with exclusive_run("test-task") as lease:
+        assert lease is None
+    time.sleep(0.4)
+    with exclusive_run("test-task") as lease:
+        assert lease is not None
+
+
+def test_handed_off_lease_is_held_until_released(client):
+    with exclusive_run("test-task") as lease:
+        lease.hand_off()
+    with exclusive_run("test-task") as other:
+        assert other is None
+    assert 0 < client.pttl(lease.key) <= settings.TASK_LEASE_HANDOFF_TTL * 1000
+
+    assert not release_lease("test-task", "another run's token")
+    assert release_lease("test-task", lease.token)
+    with exclusive_run("test-task") as other:
+        assert other is not None
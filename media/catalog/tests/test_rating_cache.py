@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.test import override_settings
+from catalog.models import MOVIES
+from catalog.rating_cache import CachedRatingProvider, CacheStats, RedisRatingStore, SQLiteRatingStore
+from catalog.ratings import RandomRatingProvider, get_provider
+
+
+class CountingProvider:
+    def __init__(self, ratings):
+        self.fixed = ratings
+        self.asked = []
+
+    def ratings(self, kind, ids):
+        self.asked.extend(ids)
+        return {object_id: self.fixed[object_id] for object_id in ids if object_id in self.fixed}
+
+
+class BrokenStore:
+    def get_many(self, keys, fetched_after=0.0):
+        raise sqlite3.OperationalError("database is locked")
+
+    def set_many(self, entries):
+        raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return SQLiteRatingStore(tmp_path / "ratings.sqlite3", max_entries=3, clock=clock)
+
+
+def test_entries_expire_per_key_and_survive_a_restart(tmp_path, store, clock):
+    store.set_many({"movies:1": (7.5, 60), "movies:2": (None, 10)})
+    assert store.get_many(["movies:1", "movies:2", "movies:3"]) == {
+        "movies:1": (7.5, 1000.0), "movies:2": (None, 1000.0),
+    }
+
+    clock.now += 30
+    reopened = SQLiteRatingStore(tmp_path / "ratings.sqlite3", max_entries=3, clock=clock)
+    assert reopened.get_many(["movies:1", "movies:2"]) == {"movies:1": (7.5, 1000.0)}
+    assert reopened.get_many(["movies:1"], fetched_after=1000.0) == {}
+
+
+def test_least_recently_used_entries_are_evicted(store, clock):
+    for key in ("a", "b", "c"):
+        store.set_many({key: (1.0, 60)})
+        clock.now += 1
+    store.get_many(["a"])
+    clock.now += 1
+    store.set_many({"d": (1.0, 60)})
+    assert set(store.get_many(["a", "b", "c", "d"])) == {"a", "c", "d"}
+
+
+def test_provider_is_only_asked_for_uncached_ids(store, clock):
+    inner = CountingProvider({1: 7.0, 2: 8.0})
+    provider = CachedRatingProvider(inner, store, ttl=60, negative_ttl=10)
+
+    assert provider.ratings(MOVIES, [1, 2, 3]) == {1: 7.0, 2: 8.0}
+    assert provider.ratings(MOVIES, [1, 2, 3]) == {1: 7.0, 2: 8.0}
+    assert inner.asked == [1, 2, 3]
+    assert provider.stats == CacheStats(hits=2, negative_hits=1, misses=3)
+
+    # The "not found" answer expires first.
+    clock.now += 20
+    provider.ratings(MOVIES, [1, 2, 3])
+    assert inner.asked == [1, 2, 3, 3]
+
+    # Hits come with the time they were fetched; older entries are refetched.
+    assert provider.lookup(MOVIES, [1, 3], fetched_after=1000.0) == ({1: 7.0}, {3: 1020.0})
+    assert inner.asked == [1, 2, 3, 3, 1]
+
+
+def test_store_failures_fall_back_to_the_provider():
+    provider = CachedRatingProvider(CountingProvider({1: 7.0}), BrokenStore(), ttl=60, negative_ttl=10)
+    assert provider.ratings(MOVIES, [1]) == {1: 7.0}
+    assert provider.stats == CacheStats(misses=1, errors=2)
+
+
+def test_provider_setting_is_wrapped_in_the_configured_cache(tmp_path):
+    with override_settings(RATINGS_CACHE="sqlite", RATINGS_CACHE_PATH=str(tmp_path / "cache.sqlite3")):
+        provider = get_provider()
+    assert isinstance(provider, CachedRatingProvider)
+    assert isinstance(provider.provider, RandomRatingProvider)
+    with override_settings(RATINGS_CACHE=""):
+        assert isinstance(get_provider(), RandomRatingProvider)
+
+
+def test_redis_store(clock, redis_url):
+    store = RedisRatingStore(redis_url, max_entries=2, prefix="test:ratings:", clock=clock)
+    store.client.delete(*store.client.keys("test:ratings:*") or ["test:ratings:lru"])
+    store.set_many({"a": (7.5, 60), "b": (None, 60)})
+    assert store.get_many(["a", "b", "c"]) == {"a": (7.5, 1000.0), "b": (None, 1000.0)}
+    assert store.get_many(["a"], fetched_after=1000.0) == {}
+    clock.now += 1
+    store.get_many(["a"])
+    store.set_many({"c": (1.0, 60)})
+    assert set(store.get_many(["a", "b", "c"])) == {"a", "c"}
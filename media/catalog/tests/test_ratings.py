@@ -0,0 +1,197 @@
+import functools
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from catalog import rating_cache
+from catalog.models import MOVIES, SHOWS, Movie
+from catalog.rating_cache import SQLiteRatingStore, cached
+from catalog.ratings import (
+    RandomRatingProvider,
+    RatingProvider,
+    RatingStats,
+    get_provider,
+    plan_run,
+    refresh_ratings,
+    stalest,
+    write_ratings,
+)
+from catalog.snapshot import is_fresh, read_one, refresh_snapshot
+from catalog.versioning import get_version
+
+NOW = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+class FixedProvider(RatingProvider):
+    def __init__(self, ratings):
+        self.fixed = ratings
+        self.batches = []
+
+    def ratings(self, kind, ids):
+        self.batches.append(list(ids))
+        return {object_id: self.fixed[object_id] for object_id in ids if object_id in self.fixed}
+
+
+def create_movies(count, **fields):
+    start = Movie.objects.count()
+    return [
+        movie.id
+        for movie in Movie.objects.bulk_create(
+            Movie(title=f"Movie {i}", description="", image="//x", imdb_rating=7.0, kinopoisk_rating=5.0, **fields)
+            for i in range(start, start + count)
+        )
+    ]
+
+
+@pytest.mark.django_db
+def test_only_changed_ratings_are_written_in_batches():
+    ids = create_movies(5)
+    provider = FixedProvider({ids[0]: 5.0, ids[1]: 8.2, ids[3]: 6.4, ids[4]: 5.0})
+    assert get_version(MOVIES) is None
+
+    stats = refresh_ratings(MOVIES, provider, batch_size=2)
+    assert stats == RatingStats(checked=5, updated=2, missing=1)
+    assert provider.batches == [ids[0:2], ids[2:4], ids[4:5]]
+    assert dict(Movie.objects.values_list("id", "kinopoisk_rating")) == {
+        ids[0]: 5.0, ids[1]: 8.2, ids[2]: 5.0, ids[3]: 6.4, ids[4]: 5.0,
+    }
+    version = get_version(MOVIES)
+    assert version[0] == 1
+
+    # A rerun with the same ratings only stamps rating_updated_at.
+    with CaptureQueriesContext(connection) as rerun:
+        assert refresh_ratings(MOVIES, provider, batch_size=2) == RatingStats(checked=5, missing=1)
+    assert not [q for q in rerun.captured_queries if '"kinopoisk_rating" = CASE' in q["sql"]]
+    assert get_version(MOVIES) == version
+
+
+@pytest.mark.django_db
+def test_one_update_statement_per_batch():
+    ids = create_movies(6)
+    provider = FixedProvider({object_id: 7.5 for object_id in ids})
+    with CaptureQueriesContext(connection) as queries:
+        refresh_ratings(MOVIES, provider, batch_size=3)
+    assert sum('"kinopoisk_rating" = CASE' in q["sql"] for q in queries.captured_queries) == 2
+    assert set(Movie.objects.values_list("rating_updated_at", flat=True)) != {None}
+
+
+@pytest.mark.django_db
+def test_rating_changes_rebuild_only_their_snapshot_rows():
+    ids = create_movies(3)
+    refresh_snapshot(MOVIES)
+    Movie.objects.filter(id=ids[2]).update(title="Edited")
+    written = []
+
+    def write(kind, changes, batch_ids, now, cached_at):
+        write_ratings(kind, changes, batch_ids, now, cached_at)
+        written.append(is_fresh(MOVIES))
+
+    refresh_ratings(MOVIES, FixedProvider({ids[0]: 8.0, ids[1]: 5.0}), write=write)
+    assert written == [True]
+    assert is_fresh(MOVIES)
+    assert json.loads(read_one(MOVIES, ids[0]))["kinopoisk_rating"] == 8.0
+    assert json.loads(read_one(MOVIES, ids[2]))["title"] == "Movie 2"
+
+
+@pytest.mark.django_db
+def test_stalest_puts_never_rated_then_recent_releases_first():
+    old = create_movies(3, release_date=date(2000, 1, 1), rating_updated_at=NOW - timedelta(days=2))
+    Movie.objects.filter(id=old[1]).update(rating_updated_at=NOW - timedelta(days=3))
+    recent = create_movies(2, release_date=date(2025, 12, 20), rating_updated_at=NOW - timedelta(hours=4))
+    fresh_recent = create_movies(1, release_date=date(2025, 12, 20), rating_updated_at=NOW - timedelta(hours=1))
+    never = create_movies(1, release_date=date(2000, 1, 1))
+
+    assert [object_id for object_id, _ in stalest(MOVIES, 10, now=NOW)] == [
+        *recent, never[0], old[1], old[0], old[2], *fresh_recent,
+    ]
+    assert [object_id for object_id, _ in stalest(MOVIES, 3, now=NOW)] == [*recent, never[0]]
+
+
+@pytest.mark.django_db
+@override_settings(
+    RATINGS_RUN_INTERVAL=60, RATINGS_FRESHNESS_WINDOW=600,
+    RATINGS_RECENT_DAYS=30, RATINGS_RECENT_WINDOW=300, RATINGS_RUN_BUDGET=100,
+)
+def test_plan_run_cycles_the_catalog_within_the_window():
+    create_movies(18, release_date=date(2000, 1, 1))
+    create_movies(2, release_date=date(2025, 12, 20))
+    # 20 rows over 10 runs, plus 2 recent ones over 5.
+    assert plan_run(now=NOW) == {SHOWS: 0, MOVIES: 2 + 1}
+
+    now = NOW
+    for run in range(10):
+        refresh_ratings(MOVIES, FixedProvider({}), limit=plan_run(now=now)[MOVIES], now=now)
+        now += timedelta(seconds=60)
+    assert Movie.objects.filter(rating_updated_at__isnull=True).count() == 0
+    assert Movie.objects.filter(rating_updated_at__lt=now - timedelta(seconds=600)).count() == 0
+    assert not Movie.objects.filter(
+        release_date__gte=date(2025, 12, 1), rating_updated_at__lt=now - timedelta(seconds=300)
+    ).exists()
+
+    with override_settings(RATINGS_RUN_BUDGET=2):
+        assert plan_run(now=NOW) == {SHOWS: 0, MOVIES: 2}
+
+
+def test_random_provider():
+    ratings = RandomRatingProvider(seed=1).ratings(MOVIES, [1, 2, 3])
+    assert set(ratings) == {1, 2, 3}
+    assert all(5.0 <= rating <= 9.0 for rating in ratings.values())
+
+
+@override_settings(RATINGS_PROVIDER="catalog.ratings.RandomRatingProvider", RATINGS_CACHE="")
+def test_provider_comes_from_settings():
+    assert isinstance(get_provider(), RandomRatingProvider)
+
+
+@pytest.mark.django_db
+@override_settings(RATINGS_CACHE="sqlite", RATINGS_CACHE_TTL=6 * 3600, RATINGS_RECENT_WINDOW=3 * 3600)
+def test_cached_ratings_do_not_outlive_the_recent_release_window(tmp_path, monkeypatch, clock):
+    clock.now = NOW.timestamp()
+    monkeypatch.setattr(rating_cache, "SQLiteRatingStore", functools.partial(SQLiteRatingStore, clock=clock))
+    [movie_id] = create_movies(1, release_date=(NOW - timedelta(days=10)).date())
+    inner = FixedProvider({movie_id: 6.0})
+    with override_settings(RATINGS_CACHE_PATH=str(tmp_path / "cache.sqlite3")):
+        provider = cached(inner)
+
+    refresh_ratings(MOVIES, provider, limit=10, now=NOW)
+    inner.fixed[movie_id] = 7.0
+    later = NOW + timedelta(hours=3, minutes=1)
+    clock.now = later.timestamp()
+    assert [object_id for object_id, _ in stalest(MOVIES, 10, later)] == [movie_id]
+
+    refresh_ratings(MOVIES, provider, limit=10, now=later)
+    assert inner.batches == [[movie_id], [movie_id]]
+    assert Movie.objects.get(id=movie_id).kinopoisk_rating == 7.0
+
+
+@pytest.mark.django_db
+@override_settings(RATINGS_CACHE="sqlite", RATINGS_CACHE_TTL=6 * 3600, RATINGS_RECENT_WINDOW=3 * 3600)
+def test_cache_hits_are_stamped_with_the_time_they_were_fetched(tmp_path, monkeypatch, clock):
+    clock.now = NOW.timestamp()
+    monkeypatch.setattr(rating_cache, "SQLiteRatingStore", functools.partial(SQLiteRatingStore, clock=clock))
+    ids = create_movies(2)
+    inner = FixedProvider({ids[0]: 6.0, ids[1]: 7.0})
+    with override_settings(RATINGS_CACHE_PATH=str(tmp_path / "cache.sqlite3")):
+        provider = cached(inner)
+
+    refresh_ratings(MOVIES, provider, batch_size=1, now=NOW)
+    # A run that looked ids[0] up but never got to write it.
+    Movie.objects.filter(id=ids[0]).update(rating_updated_at=None, kinopoisk_rating=5.0)
+    later = NOW + timedelta(hours=1)
+    clock.now = later.timestamp()
+
+    refresh_ratings(MOVIES, provider, limit=1, now=later)
+    assert inner.batches == [[ids[0]], [ids[1]]]
+    assert Movie.objects.get(id=ids[0]).kinopoisk_rating == 6.0
+    assert Movie.objects.get(id=ids[0]).rating_updated_at == NOW
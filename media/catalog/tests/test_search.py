@@ -0,0 +1,62 @@
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from catalog.models import MOVIES, SHOWS, Movie, Show
+from catalog.search import index_objects, remove_objects, search
+
+def make(model, title, description=""):
+    return model.objects.create(
+        title=title,
+        description=description,
+        image="https://example.com/image.jpg",
+        release_date=date(2020, 1, 1),
+        imdb_rating=7.0,
+        kinopoisk_rating=0.0,
+    )
+
+@pytest.mark.django_db
+def test_title_matches_rank_above_description_matches():
+    in_description = make(Movie, "Quiet Evening", "A dragon appears at dinner.")
+    in_title = make(Movie, "Dragon Tales", "Stories.")
+    index_objects(MOVIES, [in_description, in_title])
+
+    assert [hit.id for hit in search("dragon")] == [in_title.id, in_description.id]
+
+@pytest.mark.django_db
+def test_search_is_prefix_based_and_filters_by_kind():
+    show = make(Show, "Breaking Point")
+    movie = make(Movie, "Breakfast Club")
+    index_objects(SHOWS, [show])
+    index_objects(MOVIES, [movie])
+
+    assert {(hit.kind, hit.id) for hit in search("brea")} == {(SHOWS, show.id), (MOVIES, movie.id)}
+    assert [hit.id for hit in search("brea", kinds=[SHOWS])] == [show.id]
+
+@pytest.mark.django_db
+def test_reindexing_replaces_and_removal_drops_documents():
+    movie = make(Movie, "Old Title")
+    index_objects(MOVIES, [movie])
+    movie.title = "New Title"
+    index_objects(MOVIES, [movie])
+
+    assert search("old") == []
+    assert [hit.title for hit in search("new")] == ["New Title"]
+
+    remove_objects(MOVIES, [movie.id])
+    assert search("new") == []
+
+@pytest.mark.django_db
+def test_query_syntax_characters_are_treated_as_text():
+    movie = make(Movie, "Mission: Impossible")
+    index_objects(MOVIES, [movie])
+
+    assert [hit.id for hit in search('mission: "impossible(')] == [movie.id]
+    assert search("***") == []
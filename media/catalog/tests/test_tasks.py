@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.test import override_settings
+from celery_app import IMPORTS_QUEUE, WRITES_QUEUE, app
+from catalog import tasks
+from catalog.models import Movie, Source
+from catalog.ratings import RatingProvider
+
+WRITERS = {
+    "catalog.tasks.write_import_shards_task",
+    "catalog.tasks.write_ratings_task",
+    "catalog.tasks.finish_ratings_task",
+    "catalog.tasks.record_source_checks_task",
+}
+# Runs on the writer so it lands behind the writes queued before it.
+ORDERED_AFTER_WRITES = {"catalog.tasks.release_lease_task"}
+
+
+def queue(name):
+    return app.amqp.router.route({}, name)["queue"].name
+
+
+def test_only_writers_are_routed_to_the_writer_queue():
+    app.finalize()
+    names = {name for name in app.tasks if name.startswith("catalog.tasks.")}
+    writes = WRITERS | ORDERED_AFTER_WRITES
+    assert writes < names
+    for name in names:
+        assert (queue(name) == WRITES_QUEUE) == (name in writes), name
+
+
+class Queued:
+    """
+    Stands in for `task.delay`: keeps the JSON-encoded arguments, as a
+    broker would, so they can be run afterwards as the writer would.
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.messages = []
+
+    def __call__(self, *args):
+        self.messages.append(json.loads(json.dumps(args)))
+
+    def run(self):
+        results = [self.task(*args) for args in self.messages]
+        self.messages = []
+        return results
+
+
+class Chord:
+    """
+    Stands in for `celery.chord`: keeps the header to run afterwards.
+    """
+
+    def __init__(self):
+        self.header = []
+        self.body = None
+
+    def __call__(self, header):
+        self.header.extend(header)
+        return self.set_body
+
+    def set_body(self, body):
+        self.body = body
+
+    def run(self):
+        return [signature() for signature in self.header]
+
+
+@pytest.fixture
+def released(monkeypatch):
+    """
+    The (task name, token) of every lease handed off to the writer.
+    """
+    queued = []
+    monkeypatch.setattr(tasks.release_lease_task, "apply_async", lambda args, kwargs, **options: queued.append(args))
+    return queued
+
+
+@pytest.mark.django_db
+def test_import_parses_on_the_imports_queue_and_only_writes_on_the_writer(tmp_path, monkeypatch, settings):
+    feed = tmp_path / "movies.json"
+    feed.write_text(json.dumps([
+        {"name": f"Movie {i}", "image": "https://example.com/movie.jpg", "release_year": 2001, "imdb_rating": 7.0}
+        for i in range(3)
+    ]))
+    shards = Chord()
+    monkeypatch.setattr(tasks, "chord", shards)
+    settings.CATALOG_IMPORT_STAGING_DIR = str(tmp_path / "staging")
+
+    assert tasks.import_movies_task(feed=str(feed)) is None
+    assert [(signature.task, queue(signature.task)) for signature in shards.header] == [
+        ("catalog.tasks.prepare_import_shard_task", IMPORTS_QUEUE)
+    ]
+    results = json.loads(json.dumps(shards.run()))
+    # Only counts travel through the result backend; the rows stay on disk.
+    assert results == [{"changed": 3, "unchanged": 0, "skipped": 0}]
+    staging = tmp_path / "staging" / "movies"
+    assert sorted(path.name for path in staging.iterdir()) == ["feed-0.ndjson", "rows-0.ndjson"]
+    assert not Movie.objects.exists()
+
+    write, release = shards.body.tasks
+    assert (queue(write.task), release.task) == (WRITES_QUEUE, "catalog.tasks.release_lease_task")
+    write(results)
+    assert Movie.objects.count() == 3
+    assert not staging.exists()
+    assert tasks.import_movies_task(feed=str(feed)) is None
+    assert len(shards.header) == 1
+
+
+class HalfProvider(RatingProvider):
+    def ratings(self, kind, ids):
+        return {object_id: 6.5 for object_id in ids}
+
+
+@pytest.mark.django_db
+@override_settings(RATINGS_CACHE="", RATINGS_PROVIDER="catalog.tests.test_tasks.HalfProvider")
+def test_ratings_run_leaves_its_writes_to_the_writer(monkeypatch, released):
+    Movie.objects.bulk_create(
+        Movie(title=f"Movie {i}", description="", image="//x", imdb_rating=7.0, kinopoisk_rating=5.0)
+        for i in range(3)
+    )
+    writes, finishes = Queued(tasks.write_ratings_task), Queued(tasks.finish_ratings_task)
+    monkeypatch.setattr(tasks.write_ratings_task, "delay", writes)
+    monkeypatch.setattr(tasks.finish_ratings_task, "delay", finishes)
+
+    report = tasks.update_ratings_task(full=True)
+    assert report["movies"]["updated"] == 3
+    assert set(Movie.objects.values_list("kinopoisk_rating", flat=True)) == {5.0}
+    assert [name for name, token in released] == ["update_ratings_task"]
+
+    writes.run()
+    finishes.run()
+    assert set(Movie.objects.values_list("kinopoisk_rating", flat=True)) == {6.5}
+    assert not Movie.objects.filter(rating_updated_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_validation_run_fans_out_probes_and_leaves_writes_to_the_writer(monkeypatch, server, validator):
+    movie = Movie.objects.create(title="M", description="", image="//x", imdb_rating=7.0)
+    for path in ("/ok", "/missing"):
+        Source.objects.create(movie=movie, url=server.url(path), source_type="direct")
+    checks, records = Chord(), Queued(tasks.record_source_checks_task)
+    monkeypatch.setattr(tasks, "chord", checks)
+    monkeypatch.setattr(tasks.record_source_checks_task, "delay", records)
+    monkeypatch.setattr(tasks, "_process_validator", validator)
+
+    assert tasks.validate_sources_task() == {"batches": 1}
+    assert checks.body.task == "catalog.tasks.release_lease_task"
+    assert checks.run() == [{"probed": 2, "reachable": 1}]
+    assert Source.objects.filter(last_status__isnull=True).count() == 2
+
+    assert records.run() == [{"deactivated": 1, "reactivated": 0}]
+    assert dict(Source.objects.values_list("url", "last_status")) == {
+        server.url("/ok"): 200,
+        server.url("/missing"): 404,
+    }
@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+import requests
+from catalog.models import Movie, Source
+from catalog.validation import SourceValidator, ValidationStats, next_interval, validate_sources
+
+NOW = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def test_probe_outcomes(server, validator):
+    results = validator().probe_many(
+        server.url(path) for path in ("/ok", "/missing", "/no-head", "/flaky", "/down", "/ok")
+    )
+    assert results == {
+        server.url("/ok"): 200,
+        server.url("/missing"): 404,
+        server.url("/no-head"): 200,
+        server.url("/flaky"): 200,
+        server.url("/down"): 503,
+    }
+    assert server.requests["HEAD", "/ok"] == 1
+    assert server.requests["GET", "/no-head"] == 1
+    assert server.requests["HEAD", "/flaky"] == 2
+    assert server.requests["HEAD", "/down"] == 3  # first try + 2 retries
+    assert server.requests["GET", "/ok"] == 0
+
+
+def test_retries_back_off_exponentially(server):
+    delays = []
+    SourceValidator(retries=3, backoff=0.1, sleep=delays.append).probe(server.url("/down"))
+    assert delays == [0.1, 0.2, 0.4]
+
+
+def test_per_host_limit_bounds_concurrency(server, validator):
+    urls = [server.url("/slow") + f"?n={i}" for i in range(12)]
+    validator(concurrency=12, per_host=3).probe_many(urls)
+    assert server.max_in_flight == 3
+
+
+def test_concurrent_callers_share_the_limits(server, validator):
+    shared = validator(concurrency=12, per_host=2)
+    callers = [
+        threading.Thread(target=shared.probe_many, args=([server.url("/slow") + f"?c={c}&n={i}" for i in range(6)],))
+        for c in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert server.max_in_flight == 2
+
+
+def test_worker_reuses_its_connection(server, validator):
+    probe = validator(concurrency=1).probe
+    for i in range(5):
+        assert probe(server.url("/ok")) == 200
+    assert len(server.connections) == 1
+
+
+def test_batches_share_the_pool_until_close(server, monkeypatch, validator):
+    closed = []
+    close = requests.Session.close
+    monkeypatch.setattr(requests.Session, "close", lambda session: closed.append(session) or close(session))
+    shared = validator(concurrency=1)
+    for i in range(3):
+        assert shared.probe_many([server.url("/ok")]) == {server.url("/ok"): 200}
+    assert len(server.connections) == 1
+    assert closed == []
+
+    shared.close()
+    assert len(closed) == 1
+    with pytest.raises(RuntimeError):
+        shared.probe_many([server.url("/ok")])
+
+
+def test_next_interval():
+    hour = timedelta(hours=1)
+    assert next_interval(None, None, True) == 6 * hour
+    assert next_interval(6 * hour, True, True) == 12 * hour
+    assert next_interval(6 * hour, False, False) == 12 * hour
+    assert next_interval(6 * hour, True, False) == hour
+    assert next_interval(hour / 2, False, True) == hour
+    assert next_interval(5 * 24 * hour, True, True) == 7 * 24 * hour
+
+
+def add_sources(url, count):
+    start = Movie.objects.count()
+    movies = Movie.objects.bulk_create(
+        Movie(title=f"Movie {i}", description="", image="//x", imdb_rating=7.0) for i in range(start, start + count)
+    )
+    Source.objects.bulk_create(Source(movie=movie, url=url, source_type="direct") for movie in movies)
+
+
+@pytest.mark.django_db
+def test_each_url_is_probed_once_for_all_its_sources(server, django_assert_max_num_queries, validator):
+    add_sources(server.url("/ok"), 3)
+    add_sources(server.url("/missing"), 2)
+    add_sources(server.url("/no-head"), 1)
+    Source.objects.filter(url=server.url("/no-head")).update(is_active=False)
+
+    # Per batch of URLs: two SELECTs, a savepoint and two UPDATEs per status
+    # group; then the empty read.
+    with django_assert_max_num_queries(15):
+        stats = validate_sources(validator(), batch_size=2, now=NOW)
+    assert stats == ValidationStats(probed=3, reachable=2, deactivated=2, reactivated=1)
+    assert server.requests["HEAD", "/ok"] == 1
+    assert set(Source.objects.filter(is_active=False).values_list("url", flat=True)) == {server.url("/missing")}
+    assert set(Source.objects.values_list("last_status", "last_checked_at", "next_check_at")) == {
+        (200, NOW, NOW + timedelta(hours=6)),
+        (404, NOW, NOW + timedelta(hours=6)),
+    }
+
+
+@pytest.mark.django_db
+def test_only_due_sources_are_probed_and_intervals_adapt(server, validator):
+    ok, flaky = server.url("/ok"), server.url("/flaky")
+    add_sources(ok, 2)
+    add_sources(flaky, 1)
+    validate_sources(validator(retries=0), now=NOW)  # /flaky answers 503 first
+    assert Source.objects.get(url=flaky).is_active is False
+
+    assert validate_sources(validator(), now=NOW + timedelta(hours=1)) == ValidationStats()
+
+    later = NOW + timedelta(hours=6)
+    assert validate_sources(validator(), now=later) == ValidationStats(probed=2, reachable=2, reactivated=1)
+    steady, recovered = Source.objects.get(url=ok, movie__title="Movie 0"), Source.objects.get(url=flaky)
+    assert steady.next_check_at == later + timedelta(hours=12)
+    assert recovered.is_active is True
+    assert recovered.next_check_at == later + timedelta(hours=1)
+
+    # A source added for a URL that is not due is probed with it once due,
+    # and joins its schedule.
+    add_sources(ok, 1)
+    assert validate_sources(validator(), now=later).probed == 1
+    assert set(Source.objects.filter(url=ok).values_list("next_check_at", flat=True)) == {later + timedelta(hours=12)}
@@ -0,0 +1,271 @@
+"""
+Concurrent reachability checks for Source URLs.
+
+URLs are probed from a thread pool (the global concurrency bound) with a
+semaphore per host on top, so one slow or rate-limited host cannot take all
+the workers. A SourceValidator owns its pool, and each of the pool's threads
+keeps its own keep-alive `requests.Session` across batches until `close()`.
+A probe is a HEAD, retried with a GET for servers that reject HEAD, and
+transient failures (connection errors, timeouts, 429 / 5xx) are retried with
+exponential backoff.
+
+A run only probes URLs with a source that is due (`Source.next_check_at`).
+URLs whose result keeps repeating are checked less and less often; one that
+flips between reachable and unreachable drops back to the minimum interval.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from catalog.models import Source
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_BATCH_SIZE = 1000
+PROBE_TIMEOUT = (2, 5)
+PROBE_RETRIES = 2
+PROBE_BACKOFF = 0.5
+# Servers that answer these to a HEAD may still serve the URL to a GET.
+HEAD_REJECTED = {403, 405, 501}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ValidationStats(NamedTuple):
+    probed: int = 0
+    reachable: int = 0
+    deactivated: int = 0
+    reactivated: int = 0
+
+
+def is_reachable(status: int) -> bool:
+    return 200 <= status < 300
+
+
+def next_interval(previous: Optional[timedelta], was_reachable: Optional[bool], reachable: bool) -> timedelta:
+    """
+    How long until a URL is probed again: the base interval after its first
+    check, the minimum after its result flipped, otherwise twice the previous
+    interval, capped at the maximum.
+    """
+    minimum = timedelta(seconds=settings.SOURCE_CHECK_MIN_INTERVAL)
+    if previous is None or was_reachable is None:
+        return timedelta(seconds=settings.SOURCE_CHECK_INTERVAL)
+    if was_reachable != reachable:
+        return minimum
+    return min(max(previous, minimum) * 2, timedelta(seconds=settings.SOURCE_CHECK_MAX_INTERVAL))
+
+
+class SourceValidator:
+    def __init__(
+        self,
+        concurrency: int = None,
+        per_host: int = None,
+        timeout=PROBE_TIMEOUT,
+        retries: int = PROBE_RETRIES,
+        backoff: float = PROBE_BACKOFF,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.concurrency = concurrency or settings.SOURCE_VALIDATION_CONCURRENCY
+        self.per_host = per_host or settings.SOURCE_VALIDATION_PER_HOST
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="probe")
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        # Shared by every probe_many call on this validator, so concurrent
+        # callers (e.g. Celery threads) stay within the same bounds.
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _request(self, url: str) -> int:
+        session = self._session()
+        with self._host_slot(url), self._slots:
+            response = session.head(url, timeout=self.timeout, allow_redirects=True)
+            response.close()
+            if response.status_code in HEAD_REJECTED:
+                # stream=True: only the status line and headers are read.
+                with session.get(url, timeout=self.timeout, allow_redirects=True, stream=True) as response:
+                    pass
+        return response.status_code
+
+    def probe(self, url: str) -> int:
+        """
+        The status `url` answers, after retries for transient failures; 0 if
+        it never answered.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                status = self._request(url)
+            except requests.RequestException as exc:
+                status, reason = 0, exc
+            else:
+                reason = status
+                if status not in RETRY_STATUSES:
+                    return status
+            if attempt < self.retries:
+                self.sleep(self.backoff * 2 ** attempt)
+        logger.info("Source %s unreachable: %s", url, reason)
+        return status
+
+    def probe_many(self, urls: Iterable[str]) -> Dict[str, int]:
+        urls = list(dict.fromkeys(urls))
+        return dict(zip(urls, self._executor.map(self.probe, urls)))
+
+    def close(self) -> None:
+        """
+        Stop the pool and close its sessions and their connections.
+        """
+        self._executor.shutdown(wait=True)
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+    def __enter__(self) -> "SourceValidator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# (status, next check, urls): one UPDATE pair in record_checks.
+CheckGroup = Tuple[int, datetime, List[str]]
+
+
+def due_urls(batch_size: int = VALIDATION_BATCH_SIZE, now: Optional[datetime] = None) -> Iterator[List[str]]:
+    """
+    Distinct URLs with at least one source due for a check, in keyset
+    batches.
+    """
+    now = now or timezone.now()
+    due = Q(next_check_at__isnull=True) | Q(next_check_at__lte=now)
+    last_url = ""
+    while True:
+        urls = list(
+            Source.objects.filter(due, url__gt=last_url)
+            .order_by("url")
+            .values_list("url", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not urls:
+            return
+        last_url = urls[-1]
+        yield urls
+
+
+def check_urls(validator: SourceValidator, urls: List[str], now: datetime) -> Tuple[List[CheckGroup], Dict[str, int]]:
+    """
+    Probe `urls` and work out the next check of each from its history.
+    Only reads the database; `record_checks` writes the result.
+    """
+    # History over every source of the URL, due or not: a source added
+    # since the last check joins the schedule of the others.
+    history = (
+        Source.objects.filter(url__in=urls)
+        .values("url")
+        .annotate(
+            last_checked_at=Max("last_checked_at"),
+            next_check_at=Max("next_check_at"),
+            last_status=Max("last_status"),
+        )
+        .order_by()
+    )
+    statuses = validator.probe_many(urls)
+    groups = defaultdict(list)
+    for row in history:
+        status = statuses[row["url"]]
+        reachable = is_reachable(status)
+        was_reachable = None if row["last_status"] is None else is_reachable(row["last_status"])
+        scheduled = row["next_check_at"]
+        if scheduled and scheduled > now and was_reachable == reachable:
+            # Probed early for a new source: the URL keeps its schedule.
+            next_check_at = scheduled
+        else:
+            previous = scheduled - row["last_checked_at"] if scheduled and row["last_checked_at"] else None
+            next_check_at = now + next_interval(previous, was_reachable, reachable)
+        groups[status, next_check_at].append(row["url"])
+    return [(status, next_check_at, group) for (status, next_check_at), group in groups.items()], statuses
+
+
+def record_checks(groups: Sequence[CheckGroup], now: datetime) -> Tuple[int, int]:
+    """
+    Write probe results to every source sharing each URL, in one
+    transaction. Returns how many sources were (deactivated, reactivated).
+    """
+    deactivated = reactivated = 0
+    with transaction.atomic():
+        for status, next_check_at, urls in groups:
+            sources = Source.objects.filter(url__in=urls)
+            reachable = is_reachable(status)
+            flipped = sources.filter(is_active=not reachable).update(is_active=reachable)
+            sources.update(last_checked_at=now, last_status=status, next_check_at=next_check_at)
+            if reachable:
+                reactivated += flipped
+            else:
+                deactivated += flipped
+    return deactivated, reactivated
+
+
+def validate_sources(
+    validator: SourceValidator = None,
+    batch_size: int = VALIDATION_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> ValidationStats:
+    """
+    Probe the URLs of the sources that are due and record the results.
+
+    Every distinct URL is probed once per run and its result is written to
+    all the sources sharing it, which also puts them on one schedule. Due
+    URLs are read in keyset batches; a batch is probed concurrently and
+    written with one pair of UPDATEs per (status, next check) group.
+    """
+    if validator is None:
+        with SourceValidator() as validator:
+            return validate_sources(validator, batch_size, now)
+    now = now or timezone.now()
+    stats = ValidationStats()
+    for urls in due_urls(batch_size, now):
+        groups, statuses = check_urls(validator, urls, now)
+        deactivated, reactivated = record_checks(groups, now)
+        stats = ValidationStats(
+            stats.probed + len(urls),
+            stats.reachable + sum(is_reachable(status) for status in statuses.values()),
+            stats.deactivated + deactivated,
+            stats.reactivated + reactivated,
+        )
+    return stats
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from catalog.models import CatalogVersion
+
+
+@transaction.atomic
+def bump_version(kind: str) -> None:
+    now = timezone.now()
+    bumped = CatalogVersion.objects.filter(kind=kind).update(
+        version=F("version") + 1, updated_at=now
+    )
+    if not bumped:
+        _, created = CatalogVersion.objects.get_or_create(
+            kind=kind, defaults={"version": 1, "updated_at": now}
+        )
+        if not created:
+            CatalogVersion.objects.filter(kind=kind).update(
+                version=F("version") + 1, updated_at=now
+            )
+
+
+def get_version(kind: str) -> Optional[Tuple[int, datetime]]:
+    """
+    (version, updated_at) for `kind`, or None if it was never bumped.
+    """
+    return (
+        CatalogVersion.objects.filter(kind=kind)
+        .values_list("version", "updated_at")
+        .first()
+    )
@@ -14,17 +14,54 @@ sys.path.insert(0, str(BASE_DIR))
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import beat_init
+from django.conf import settings
 
 app = Celery("media")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
+# One queue per workload, each served by its own worker (see
+# docker-compose.yml): "imports" (feed checks and shard parsing, prefork),
+# "ratings" (provider lookups), "validation" (URL probes, threads pool) and
+# "writes", the single writer: every task that writes to the database goes
+# there, and its worker runs one task at a time so SQLite never has two
+# writers.
+IMPORTS_QUEUE = "imports"
+RATINGS_QUEUE = "ratings"
+VALIDATION_QUEUE = "validation"
+WRITES_QUEUE = "writes"
+
+app.conf.task_routes = {
+    "catalog.tasks.import_shows_task": {"queue": IMPORTS_QUEUE},
+    "catalog.tasks.import_movies_task": {"queue": IMPORTS_QUEUE},
+    "catalog.tasks.prepare_import_shard_task": {"queue": IMPORTS_QUEUE},
+    "catalog.tasks.update_ratings_task": {"queue": RATINGS_QUEUE},
+    "catalog.tasks.validate_sources_task": {"queue": VALIDATION_QUEUE},
+    "catalog.tasks.check_sources_task": {"queue": VALIDATION_QUEUE},
+    "catalog.tasks.write_import_shards_task": {"queue": WRITES_QUEUE},
+    "catalog.tasks.write_ratings_task": {"queue": WRITES_QUEUE},
+    "catalog.tasks.finish_ratings_task": {"queue": WRITES_QUEUE},
+    "catalog.tasks.record_source_checks_task": {"queue": WRITES_QUEUE},
+    # Not a writer, but it has to run after the writes queued before it.
+    "catalog.tasks.release_lease_task": {"queue": WRITES_QUEUE},
+}
+# Anything unrouted may write, so it goes to the writer too.
+app.conf.task_default_queue = WRITES_QUEUE
+# Tasks run from seconds to minutes: reserve one at a time, so a busy
+# process does not sit on work an idle one could take, and the writer
+# runs its queue in order.
+app.conf.worker_prefetch_multiplier = 1
+
+@beat_init.connect
+def import_on_start(sender, **kwargs):
+    # Only the beat process kicks off the first imports, not every worker.
+    app.send_task("catalog.tasks.import_movies_task")
+    app.send_task("catalog.tasks.import_shows_task")
+
 @app.on_after_finalize.connect
 def setup_periodic_tasks(sender, **kwargs):
 
-    sender.send_task("catalog.tasks.import_movies_task")
-    sender.send_task("catalog.tasks.import_shows_task")
-
     sender.add_periodic_task(
         timedelta(hours=24),
         sender.signature("catalog.tasks.import_movies_task"),
@@ -38,13 +75,13 @@ def setup_periodic_tasks(sender, **kwargs):
     )
 
     sender.add_periodic_task(
-        crontab(minute="*/3"),
+        timedelta(seconds=settings.RATINGS_RUN_INTERVAL),
         sender.signature("catalog.tasks.update_ratings_task"),
-        name="update-ratings-every-3-mins",
+        name="update-ratings",
     )
 
     sender.add_periodic_task(
-        crontab(minute=0, hour="*/6"),
+        crontab(minute=0),
         sender.signature("catalog.tasks.validate_sources_task"),
-        name="validate-sources-every-6h",
+        name="validate-sources-hourly",
     )
\ No newline at end of file
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import HTTPException, Request, Response
+
+from catalog.versioning import get_version
+from service.cache import response_cache
+from service.executor import orm_executor
+
+
+def _etag(kind: str, version: int, request: Request) -> str:
+    # Different query strings render different bodies for the same version.
+    variant = f"{request.url.path}?{request.url.query}".encode()
+    return f'"{kind}-{version}-{hashlib.sha1(variant).hexdigest()[:16]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, updated_at) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates only have second precision.
+    return updated_at.replace(microsecond=0) <= since
+
+
+def catalog_validators(kind: str):
+    """
+    Dependency factory for conditional GETs on one catalog kind.
+
+    Reads a single CatalogVersion row (GET / HEAD only). A matching If-None-Match (or, without
+    it, a satisfied If-Modified-Since) short-circuits the request with a 304
+    before any model rows are loaded; otherwise the ETag / Last-Modified
+    headers are set on the response and also returned, for endpoints that
+    build their own Response objects.
+    """
+    async def dependency(request: Request, response: Response) -> dict:
+        if request.method not in ("GET", "HEAD"):
+            return {}
+        # Cached with the responses, so a cache hit never touches the database.
+        state = await response_cache.aget_or_set((kind, "version"), lambda: orm_executor.run(get_version, kind))
+        if state is None:
+            return {}
+        version, updated_at = state
+        updated_at = updated_at.astimezone(timezone.utc)
+        headers = {
+            "ETag": _etag(kind, version, request),
+            "Last-Modified": format_datetime(updated_at, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, headers["ETag"])
+        elif if_modified_since is not None:
+            not_modified = _not_modified_since(if_modified_since, updated_at)
+        else:
+            not_modified = False
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+        return headers
+
+    return dependency
@@ -0,0 +1,132 @@
+from datetime import date
+from typing import NamedTuple, Optional, Tuple
+
+from django.db.models import Q
+from fastapi import HTTPException, Query
+
+from service.api.pagination import ID_ORDER, SortKey
+
+# Sortable fields; each one is backed by an index (see catalog migration 0011).
+MOVIE_SORTS = ("id", "release_date", "release_year", "imdb_rating", "kinopoisk_rating")
+SHOW_SORTS = ("id", "release_date", "imdb_rating", "kinopoisk_rating")
+
+# The domain of each filterable column. A one-sided filter is closed with it:
+# without STAT4 statistics SQLite only expects a two-sided range to be
+# selective enough to search the index instead of scanning in id order.
+YEAR_RANGE = (1800, 2200)
+DATE_RANGE = (date.min, date.max)
+RATING_RANGE = (0.0, 10.0)
+
+SORT_DESCRIPTION = (
+    "Field to order by, `-` prefixed for descending. Ties are broken by id; "
+    "missing values sort as the smallest."
+)
+
+
+class Filters(NamedTuple):
+    lookups: Tuple[Tuple[str, object], ...] = ()
+    sort: SortKey = ID_ORDER
+
+    @property
+    def is_default(self) -> bool:
+        return not self.lookups and self.sort == ID_ORDER
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """
+        Columns the sort needs loaded besides `id` (for building cursors).
+        """
+        return (self.sort.field,) if self.sort.field else ()
+
+    def apply(self, queryset):
+        # Q(*lookups) rather than **kwargs: a lookup can repeat (years and
+        # dates both bound a show's release_date).
+        return queryset.filter(Q(*self.lookups))
+
+
+def parse_sort(sort: Optional[str], allowed: Tuple[str, ...]) -> SortKey:
+    if sort is None:
+        return ID_ORDER
+    name = sort.strip()
+    field = name.removeprefix("-")
+    if field not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sort: {name}. Allowed: {', '.join(allowed)} (prefix with - for descending)",
+        )
+    return SortKey(None if field == "id" else field, name.startswith("-"))
+
+
+def _range(lookups: list, field: str, low, high, low_param: str, high_param: str, domain: tuple) -> None:
+    if low is None and high is None:
+        return
+    if low is not None and high is not None and low > high:
+        raise HTTPException(status_code=400, detail=f"{low_param} must not be greater than {high_param}")
+    lookups.append((
+        f"{field}__range",
+        (domain[0] if low is None else low, domain[1] if high is None else high),
+    ))
+
+
+def _year_query(bound: str):
+    return Query(None, ge=YEAR_RANGE[0], le=YEAR_RANGE[1], description=f"{bound} release year (inclusive).")
+
+
+def _date_query(bound: str):
+    return Query(None, description=f"{bound} release date (inclusive).")
+
+
+def _rating_query(bound: str, provider: str):
+    return Query(None, ge=RATING_RANGE[0], le=RATING_RANGE[1], description=f"{bound} {provider} rating (inclusive).")
+
+
+def sort_query(allowed: Tuple[str, ...]):
+    return Query(None, description=f"{SORT_DESCRIPTION} One of: {', '.join(allowed)}.")
+
+
+def movie_filters(
+    year_from: Optional[int] = _year_query("Earliest"),
+    year_to: Optional[int] = _year_query("Latest"),
+    released_from: Optional[date] = _date_query("Earliest"),
+    released_to: Optional[date] = _date_query("Latest"),
+    imdb_min: Optional[float] = _rating_query("Minimum", "IMDb"),
+    imdb_max: Optional[float] = _rating_query("Maximum", "IMDb"),
+    kinopoisk_min: Optional[float] = _rating_query("Minimum", "Kinopoisk"),
+    kinopoisk_max: Optional[float] = _rating_query("Maximum", "Kinopoisk"),
+    sort: Optional[str] = sort_query(MOVIE_SORTS),
+) -> Filters:
+    lookups = []
+    _range(lookups, "release_year", year_from, year_to, "year_from", "year_to", YEAR_RANGE)
+    _range(lookups, "release_date", released_from, released_to, "released_from", "released_to", DATE_RANGE)
+    _range(lookups, "imdb_rating", imdb_min, imdb_max, "imdb_min", "imdb_max", RATING_RANGE)
+    _range(lookups, "kinopoisk_rating", kinopoisk_min, kinopoisk_max, "kinopoisk_min", "kinopoisk_max", RATING_RANGE)
+    return Filters(tuple(lookups), parse_sort(sort, MOVIE_SORTS))
+
+
+def show_filters(
+    year_from: Optional[int] = _year_query("Earliest"),
+    year_to: Optional[int] = _year_query("Latest"),
+    released_from: Optional[date] = _date_query("Earliest"),
+    released_to: Optional[date] = _date_query("Latest"),
+    imdb_min: Optional[float] = _rating_query("Minimum", "IMDb"),
+    imdb_max: Optional[float] = _rating_query("Maximum", "IMDb"),
+    kinopoisk_min: Optional[float] = _rating_query("Minimum", "Kinopoisk"),
+    kinopoisk_max: Optional[float] = _rating_query("Maximum", "Kinopoisk"),
+    sort: Optional[str] = sort_query(SHOW_SORTS),
+) -> Filters:
+    lookups = []
+    # Shows only store a release date, so years become a date range on the
+    # same index.
+    _range(
+        lookups,
+        "release_date",
+        date(year_from, 1, 1) if year_from is not None else None,
+        date(year_to, 12, 31) if year_to is not None else None,
+        "year_from",
+        "year_to",
+        DATE_RANGE,
+    )
+    _range(lookups, "release_date", released_from, released_to, "released_from", "released_to", DATE_RANGE)
+    _range(lookups, "imdb_rating", imdb_min, imdb_max, "imdb_min", "imdb_max", RATING_RANGE)
+    _range(lookups, "kinopoisk_rating", kinopoisk_min, kinopoisk_max, "kinopoisk_min", "kinopoisk_max", RATING_RANGE)
+    return Filters(tuple(lookups), parse_sort(sort, SHOW_SORTS))
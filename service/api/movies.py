@@ -1,78 +1,145 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from catalog.models import Movie, Source
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Literal, Optional, Union
+from catalog import snapshot
+from catalog.models import MOVIES, Movie, Source
+from catalog.queries import movie_queryset
+from catalog.rows import movie_rows, source_rows
+from catalog.serializers import MOVIE_FIELDS, MOVIE_LEVELS, dumps, movie_to_dict
+from service.api.conditional import catalog_validators
+from service.api.filtering import Filters, movie_filters
+from service.api.pagination import DEFAULT_PAGE_SIZE, limit_query
+from service.api.shaping import Shape, fields_query, include_query, parse_shape, shaped_list_response
+from service.api.snapshots import (
+    json_response,
+    snapshot_batch_response,
+    snapshot_item_response,
+    snapshot_list_response,
+)
+from service.api.streaming import iter_keyset, stream_query, stream_response
+from service.cache import cached_route, response_cache
+from service.executor import orm_endpoint
+from service.schemas.batch import BatchRequest, BatchResult
+from service.schemas.page import Page
 from service.schemas.movie import Movie as MovieSchema, MovieSource as MovieSourceSchema
 
-router = APIRouter(prefix="/movies", tags=["movies"])
+movie_validators = catalog_validators(MOVIES)
 
+FULL_SHAPE = Shape(MOVIE_LEVELS, MOVIE_FIELDS)
 
-@router.get("/", response_model=List[MovieSchema])
-def get_movies():
-    output: List[MovieSchema] = []
-    for movie in Movie.objects.all():
-        sources_data = [
-            MovieSourceSchema(
-                id=src.id,
-                url=src.url,
-                source_type=src.source_type,
-            )
-            for src in movie.sources.all()
-        ]
-        output.append(
-            MovieSchema(
-                id=movie.id,
-                title=movie.title,
-                description=movie.description,
-                image=movie.image,
-                release_date=movie.release_date,
-                imdb_rating=movie.imdb_rating,
-                kinopoisk_rating=movie.kinopoisk_rating,
-                sources=sources_data,
+router = APIRouter(
+    prefix="/movies",
+    tags=["movies"],
+    dependencies=[Depends(movie_validators)],
+)
+
+
+def _movie_values(shape: Shape, filters: Filters = Filters()):
+    """
+    `.values()` rows with the shape's columns and whatever the sort needs.
+    """
+    return filters.apply(Movie.objects.values(*dict.fromkeys(shape.fields + filters.columns)))
+
+
+def _stream_movies(shape, filters: Filters, fmt: str):
+    if shape is None and filters.is_default and snapshot.is_fresh(MOVIES):
+        bodies = snapshot.iter_bodies(MOVIES)
+    else:
+        shape = shape or FULL_SHAPE
+        bodies = (
+            dumps(movie_to_dict(movie, shape.include, shape.fields))
+            for movie in iter_keyset(
+                filters.apply(movie_queryset(shape.include, shape.fields + filters.columns)),
+                sort=filters.sort,
             )
         )
-    return output
+    return stream_response(bodies, fmt)
 
 
-@router.get("/{movie_id}", response_model=MovieSchema)
-def get_movie(movie_id: int):
-    try:
-        movie = Movie.objects.get(id=movie_id)
-    except Movie.DoesNotExist:
-        raise HTTPException(status_code=404, detail="Movie not found")
+@router.get("/", response_model=Union[List[MovieSchema], Page[MovieSchema]])
+@cached_route(response_cache, MOVIES)
+@orm_endpoint
+def get_movies(
+    limit: Optional[int] = limit_query(),
+    cursor: Optional[str] = None,
+    include: Optional[str] = include_query(MOVIE_LEVELS),
+    fields: Optional[str] = fields_query(MOVIE_FIELDS),
+    stream: Optional[Literal["json", "ndjson"]] = stream_query(),
+    filters: Filters = Depends(movie_filters),
+    validators: dict = Depends(movie_validators),
+):
+    shape = parse_shape(include, fields, MOVIE_LEVELS, MOVIE_FIELDS)
+    paged = limit is not None or cursor is not None
+    limit = limit or DEFAULT_PAGE_SIZE
+    if stream is not None:
+        return _stream_movies(shape, filters, stream)
 
-    sources_data = [
-        MovieSourceSchema(
-            id=src.id,
-            url=src.url,
-            source_type=src.source_type,
-        )
-        for src in movie.sources.all()
-    ]
-
-    return MovieSchema(
-        id=movie.id,
-        title=movie.title,
-        description=movie.description,
-        image=movie.image,
-        release_date=movie.release_date,
-        imdb_rating=movie.imdb_rating,
-        kinopoisk_rating=movie.kinopoisk_rating,
-        sources=sources_data,
+    if shape is None:
+        if filters.is_default:
+            prebuilt = snapshot_list_response(MOVIES, limit, cursor, paged, validators)
+        else:
+            prebuilt = snapshot_list_response(
+                MOVIES, limit, cursor, paged, validators,
+                queryset=filters.apply(Movie.objects.only("id", *filters.columns)),
+                sort=filters.sort,
+            )
+        if prebuilt is not None:
+            return prebuilt
+        shape = FULL_SHAPE
+
+    return shaped_list_response(
+        _movie_values(shape, filters),
+        lambda rows: movie_rows(rows, shape.include, shape.fields),
+        limit,
+        cursor,
+        paged,
+        filters.sort,
     )
 
 
-@router.get("/{movie_id}/sources", response_model=List[MovieSourceSchema])
-def get_movie_sources(movie_id: int):
-    try:
-        movie = Movie.objects.get(id=movie_id)
-    except Movie.DoesNotExist:
+@router.post("/batch", response_model=BatchResult[MovieSchema])
+@orm_endpoint
+def get_movies_batch(batch: BatchRequest):
+    """
+    Look up many movies at once. Unknown ids are listed in `missing`.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    prebuilt = snapshot_batch_response(MOVIES, ids)
+    if prebuilt is not None:
+        return prebuilt
+
+    found = {movie["id"]: movie for movie in movie_rows(Movie.objects.filter(id__in=ids).values(*MOVIE_FIELDS))}
+    return json_response(dumps({
+        "results": {movie_id: found[movie_id] for movie_id in ids if movie_id in found},
+        "missing": [movie_id for movie_id in ids if movie_id not in found],
+    }))
+
+
+@router.get("/{movie_id}", response_model=MovieSchema)
+@cached_route(response_cache, MOVIES)
+@orm_endpoint
+def get_movie(
+    movie_id: int,
+    include: Optional[str] = include_query(MOVIE_LEVELS),
+    fields: Optional[str] = fields_query(MOVIE_FIELDS),
+    validators: dict = Depends(movie_validators),
+):
+    shape = parse_shape(include, fields, MOVIE_LEVELS, MOVIE_FIELDS)
+    if shape is None:
+        prebuilt = snapshot_item_response(MOVIES, movie_id, validators)
+        if prebuilt is not None:
+            return prebuilt
+        shape = FULL_SHAPE
+
+    movies = movie_rows(_movie_values(shape).filter(id=movie_id), shape.include, shape.fields)
+    if not movies:
         raise HTTPException(status_code=404, detail="Movie not found")
+    return json_response(dumps(movies[0]))
 
-    return [
-        MovieSourceSchema(
-            id=src.id,
-            url=src.url,
-            source_type=src.source_type,
-        )
-        for src in movie.sources.all()
-    ]
+
+@router.get("/{movie_id}/sources", response_model=List[MovieSourceSchema])
+@cached_route(response_cache, MOVIES)
+@orm_endpoint
+def get_movie_sources(movie_id: int, validators: dict = Depends(movie_validators)):
+    if not Movie.objects.filter(id=movie_id).exists():
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return json_response(dumps(source_rows(Source.objects.filter(movie_id=movie_id))))
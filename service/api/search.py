@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Query
+from typing import List, Literal, Optional
+from catalog import search
+from service.executor import orm_endpoint
+from service.schemas.search import SearchHit as SearchHitSchema
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=List[SearchHitSchema])
+@orm_endpoint
+def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[Literal["shows", "movies"]] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    kinds = [kind] if kind is not None else None
+    return [
+        SearchHitSchema(kind=hit.kind, id=hit.id, title=hit.title, rank=hit.rank)
+        for hit in search.search(q, kinds, limit)
+    ]
@@ -0,0 +1,90 @@
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
+
+from catalog.serializers import dumps
+from service.api.pagination import ID_ORDER, SortKey, order_queryset, paginate
+from service.api.snapshots import json_response
+
+INCLUDE_DESCRIPTION = (
+    "Comma-separated nested levels to embed. The deepest level pulls in the "
+    "ones above it; pass an empty value for a flat listing. Default: all."
+)
+FIELDS_DESCRIPTION = (
+    "Comma-separated top-level fields to return (`id` is always included). "
+    "Default: all."
+)
+
+
+class Shape(NamedTuple):
+    include: Tuple[str, ...]
+    fields: Tuple[str, ...]
+
+
+def _split(value: str, allowed: Tuple[str, ...], param: str) -> set:
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {param}: {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(allowed)}",
+        )
+    return names
+
+
+def parse_shape(
+    include: Optional[str],
+    fields: Optional[str],
+    levels: Tuple[str, ...],
+    all_fields: Tuple[str, ...],
+) -> Optional[Shape]:
+    """
+    Validate `?include=` / `?fields=`; None means the full default shape.
+
+    Levels are nested, so the result is always a prefix of `levels`
+    (e.g. `include=sources` on shows also embeds seasons and episodes), and
+    fields keep the schema's order.
+    """
+    if include is None and fields is None:
+        return None
+
+    shape_levels = levels
+    if include is not None:
+        requested = _split(include, levels, "include")
+        depth = max((levels.index(name) + 1 for name in requested), default=0)
+        shape_levels = levels[:depth]
+
+    shape_fields = all_fields
+    if fields is not None:
+        requested = _split(fields, all_fields, "fields") | {"id"}
+        shape_fields = tuple(name for name in all_fields if name in requested)
+
+    return Shape(include=shape_levels, fields=shape_fields)
+
+
+def include_query(levels: Tuple[str, ...]):
+    return Query(None, description=f"{INCLUDE_DESCRIPTION} One of: {', '.join(levels)}.")
+
+
+def fields_query(all_fields: Tuple[str, ...]):
+    return Query(None, description=f"{FIELDS_DESCRIPTION} One of: {', '.join(all_fields)}.")
+
+
+def shaped_list_response(
+    queryset,
+    to_dicts,
+    limit: int,
+    cursor: Optional[str],
+    paged: bool,
+    sort: SortKey = ID_ORDER,
+) -> Response:
+    """
+    Render a listing of `.values()` rows straight to JSON bytes, one page or
+    the whole list; `to_dicts` turns the rows into the payload objects.
+    """
+    if not paged:
+        return json_response(dumps(to_dicts(list(order_queryset(queryset, sort)))))
+    rows, next_cursor = paginate(queryset, limit, cursor, sort)
+    return json_response(dumps({"items": to_dicts(rows), "next_cursor": next_cursor}))
@@ -1,6 +1,25 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from catalog.models import Show, Season, Episode, Source
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Literal, Optional, Union
+from catalog import snapshot
+from catalog.models import SHOWS, Show, Season, Episode, Source
+from catalog.queries import show_tree_queryset
+from catalog.rows import EPISODE_COLUMNS, SEASON_COLUMNS, episode_rows, season_rows, show_rows, source_rows
+from catalog.serializers import SHOW_FIELDS, SHOW_LEVELS, dumps, show_to_dict
+from service.api.conditional import catalog_validators
+from service.api.filtering import Filters, show_filters
+from service.api.pagination import DEFAULT_PAGE_SIZE, limit_query
+from service.api.shaping import Shape, fields_query, include_query, parse_shape, shaped_list_response
+from service.api.snapshots import (
+    json_response,
+    snapshot_batch_response,
+    snapshot_item_response,
+    snapshot_list_response,
+)
+from service.api.streaming import iter_keyset, stream_query, stream_response
+from service.cache import cached_route, response_cache
+from service.executor import orm_endpoint
+from service.schemas.batch import BatchRequest, BatchResult
+from service.schemas.page import Page
 from service.schemas.show import (
     Show as ShowSchema,
     Season as SeasonSchema,
@@ -8,188 +27,152 @@ from service.schemas.show import (
     EpisodeSource as EpisodeSourceSchema,
 )
 
-router = APIRouter(prefix="/shows", tags=["shows"])
-
-
-@router.get("/", response_model=List[ShowSchema])
-def get_shows():
-    output: List[ShowSchema] = []
-
-    for show in Show.objects.all():
-        seasons_data: List[SeasonSchema] = []
-        for season in show.seasons.all().order_by("number"):
-            episodes_data: List[EpisodeSchema] = []
-            for ep in season.episodes.all().order_by("number"):
-                sources_data = [
-                    EpisodeSourceSchema(
-                        id=src.id,
-                        url=src.url,
-                        source_type=src.source_type,
-                    )
-                    for src in ep.sources.all()
-                ]
-                episodes_data.append(
-                    EpisodeSchema(
-                        id=ep.id,
-                        number=ep.number,
-                        title=ep.title,
-                        release_date=ep.release_date,
-                        sources=sources_data,
-                    )
-                )
-            seasons_data.append(
-                SeasonSchema(
-                    id=season.id,
-                    number=season.number,
-                    episodes=episodes_data,
-                )
-            )
+show_validators = catalog_validators(SHOWS)
 
-        output.append(
-            ShowSchema(
-                id=show.id,
-                title=show.title,
-                description=show.description,
-                image=show.image,
-                release_date=show.release_date,
-                imdb_rating=show.imdb_rating,
-                kinopoisk_rating=show.kinopoisk_rating,
-                seasons=seasons_data,
-            )
-        )
+FULL_SHAPE = Shape(SHOW_LEVELS, SHOW_FIELDS)
 
-    return output
+router = APIRouter(
+    prefix="/shows",
+    tags=["shows"],
+    dependencies=[Depends(show_validators)],
+)
 
 
-@router.get("/{show_id}", response_model=ShowSchema)
-def get_show(show_id: int):
-    try:
-        show = Show.objects.get(id=show_id)
-    except Show.DoesNotExist:
+def _show_values(shape: Shape, filters: Filters = Filters()):
+    """
+    `.values()` rows with the shape's columns and whatever the sort needs.
+    """
+    return filters.apply(Show.objects.values(*dict.fromkeys(shape.fields + filters.columns)))
+
+
+def _ensure_show_exists(show_id: int) -> None:
+    if not Show.objects.filter(id=show_id).exists():
         raise HTTPException(status_code=404, detail="Show not found")
 
-    seasons_data: List[SeasonSchema] = []
-    for season in show.seasons.all().order_by("number"):
-        episodes_data: List[EpisodeSchema] = []
-        for ep in season.episodes.all().order_by("number"):
-            sources_data = [
-                EpisodeSourceSchema(
-                    id=src.id,
-                    url=src.url,
-                    source_type=src.source_type,
-                )
-                for src in ep.sources.all()
-            ]
-            episodes_data.append(
-                EpisodeSchema(
-                    id=ep.id,
-                    number=ep.number,
-                    title=ep.title,
-                    release_date=ep.release_date,
-                    sources=sources_data,
-                )
-            )
 
-        seasons_data.append(
-            SeasonSchema(
-                id=season.id,
-                number=season.number,
-                episodes=episodes_data,
+def _stream_shows(shape, filters: Filters, fmt: str):
+    if shape is None and filters.is_default and snapshot.is_fresh(SHOWS):
+        bodies = snapshot.iter_bodies(SHOWS)
+    else:
+        shape = shape or FULL_SHAPE
+        bodies = (
+            dumps(show_to_dict(show, shape.include, shape.fields))
+            for show in iter_keyset(
+                filters.apply(show_tree_queryset(shape.include, shape.fields + filters.columns)),
+                sort=filters.sort,
             )
         )
-
-    return ShowSchema(
-        id=show.id,
-        title=show.title,
-        description=show.description,
-        image=show.image,
-        release_date=show.release_date,
-        imdb_rating=show.imdb_rating,
-        kinopoisk_rating=show.kinopoisk_rating,
-        seasons=seasons_data,
+    return stream_response(bodies, fmt)
+
+
+@router.get("/", response_model=Union[List[ShowSchema], Page[ShowSchema]])
+@cached_route(response_cache, SHOWS)
+@orm_endpoint
+def get_shows(
+    limit: Optional[int] = limit_query(),
+    cursor: Optional[str] = None,
+    include: Optional[str] = include_query(SHOW_LEVELS),
+    fields: Optional[str] = fields_query(SHOW_FIELDS),
+    stream: Optional[Literal["json", "ndjson"]] = stream_query(),
+    filters: Filters = Depends(show_filters),
+    validators: dict = Depends(show_validators),
+):
+    shape = parse_shape(include, fields, SHOW_LEVELS, SHOW_FIELDS)
+    paged = limit is not None or cursor is not None
+    limit = limit or DEFAULT_PAGE_SIZE
+    if stream is not None:
+        return _stream_shows(shape, filters, stream)
+
+    if shape is None:
+        if filters.is_default:
+            prebuilt = snapshot_list_response(SHOWS, limit, cursor, paged, validators)
+        else:
+            prebuilt = snapshot_list_response(
+                SHOWS, limit, cursor, paged, validators,
+                queryset=filters.apply(Show.objects.only("id", *filters.columns)),
+                sort=filters.sort,
+            )
+        if prebuilt is not None:
+            return prebuilt
+        shape = FULL_SHAPE
+
+    return shaped_list_response(
+        _show_values(shape, filters),
+        lambda rows: show_rows(rows, shape.include, shape.fields),
+        limit,
+        cursor,
+        paged,
+        filters.sort,
     )
 
 
-@router.get("/{show_id}/seasons", response_model=List[SeasonSchema])
-def get_show_seasons(show_id: int):
-    try:
-        show = Show.objects.get(id=show_id)
-    except Show.DoesNotExist:
-        raise HTTPException(status_code=404, detail="Show not found")
+@router.post("/batch", response_model=BatchResult[ShowSchema])
+@orm_endpoint
+def get_shows_batch(batch: BatchRequest):
+    """
+    Look up many shows at once. Unknown ids are listed in `missing`.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    prebuilt = snapshot_batch_response(SHOWS, ids)
+    if prebuilt is not None:
+        return prebuilt
 
-    output: List[SeasonSchema] = []
-    for season in show.seasons.all().order_by("number"):
-        episodes_data: List[EpisodeSchema] = []
-        for ep in season.episodes.all().order_by("number"):
-            sources_data = [
-                EpisodeSourceSchema(
-                    id=src.id,
-                    url=src.url,
-                    source_type=src.source_type,
-                )
-                for src in ep.sources.all()
-            ]
-            episodes_data.append(
-                EpisodeSchema(
-                    id=ep.id,
-                    number=ep.number,
-                    title=ep.title,
-                    release_date=ep.release_date,
-                    sources=sources_data,
-                )
-            )
-        output.append(
-            SeasonSchema(
-                id=season.id,
-                number=season.number,
-                episodes=episodes_data,
-            )
-        )
-    return output
+    found = {show["id"]: show for show in show_rows(Show.objects.filter(id__in=ids).values(*SHOW_FIELDS))}
+    return json_response(dumps({
+        "results": {show_id: found[show_id] for show_id in ids if show_id in found},
+        "missing": [show_id for show_id in ids if show_id not in found],
+    }))
 
 
-@router.get("/{show_id}/episodes", response_model=List[EpisodeSchema])
-def get_show_episodes(show_id: int):
-    try:
-        show = Show.objects.get(id=show_id)
-    except Show.DoesNotExist:
+@router.get("/{show_id}", response_model=ShowSchema)
+@cached_route(response_cache, SHOWS)
+@orm_endpoint
+def get_show(
+    show_id: int,
+    include: Optional[str] = include_query(SHOW_LEVELS),
+    fields: Optional[str] = fields_query(SHOW_FIELDS),
+    validators: dict = Depends(show_validators),
+):
+    shape = parse_shape(include, fields, SHOW_LEVELS, SHOW_FIELDS)
+    if shape is None:
+        prebuilt = snapshot_item_response(SHOWS, show_id, validators)
+        if prebuilt is not None:
+            return prebuilt
+        shape = FULL_SHAPE
+
+    shows = show_rows(_show_values(shape).filter(id=show_id), shape.include, shape.fields)
+    if not shows:
         raise HTTPException(status_code=404, detail="Show not found")
+    return json_response(dumps(shows[0]))
 
-    output: List[EpisodeSchema] = []
-    for season in show.seasons.all().order_by("number"):
-        for ep in season.episodes.all().order_by("number"):
-            sources_data = [
-                EpisodeSourceSchema(
-                    id=src.id,
-                    url=src.url,
-                    source_type=src.source_type,
-                )
-                for src in ep.sources.all()
-            ]
-            output.append(
-                EpisodeSchema(
-                    id=ep.id,
-                    number=ep.number,
-                    title=ep.title,
-                    release_date=ep.release_date,
-                    sources=sources_data,
-                )
-            )
-    return output
+
+@router.get("/{show_id}/seasons", response_model=List[SeasonSchema])
+@cached_route(response_cache, SHOWS)
+@orm_endpoint
+def get_show_seasons(show_id: int, validators: dict = Depends(show_validators)):
+    _ensure_show_exists(show_id)
+    seasons = Season.objects.filter(show_id=show_id).order_by("number", "id").values(*SEASON_COLUMNS)
+    return json_response(dumps(season_rows(list(seasons))))
+
+
+@router.get("/{show_id}/episodes", response_model=List[EpisodeSchema])
+@cached_route(response_cache, SHOWS)
+@orm_endpoint
+def get_show_episodes(show_id: int, validators: dict = Depends(show_validators)):
+    _ensure_show_exists(show_id)
+    episodes = (
+        Episode.objects
+        .filter(season__show_id=show_id)
+        .order_by("season__number", "number", "id")
+        .values(*EPISODE_COLUMNS)
+    )
+    return json_response(dumps(episode_rows(list(episodes))))
 
 
 @router.get("/episodes/{episode_id}/sources", response_model=List[EpisodeSourceSchema])
-def get_episode_sources(episode_id: int):
-    try:
-        ep = Episode.objects.get(id=episode_id)
-    except Episode.DoesNotExist:
+@cached_route(response_cache, SHOWS)
+@orm_endpoint
+def get_episode_sources(episode_id: int, validators: dict = Depends(show_validators)):
+    if not Episode.objects.filter(id=episode_id).exists():
         raise HTTPException(status_code=404, detail="Episode not found")
-
-    return [
-        EpisodeSourceSchema(
-            id=src.id,
-            url=src.url,
-            source_type=src.source_type,
-        )
-        for src in ep.sources.all()
-    ]
+    return json_response(dumps(source_rows(Source.objects.filter(episode_id=episode_id))))
@@ -0,0 +1,93 @@
+import json
+from typing import List, Optional
+
+from fastapi.responses import Response
+
+from catalog import snapshot
+from catalog.serializers import dumps
+from service.api.pagination import ID_ORDER, SortKey, decode_cursor, encode_cursor, paginate
+
+
+def json_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def list_body(bodies: List[bytes]) -> bytes:
+    return b"[" + b",".join(bodies) + b"]"
+
+
+def page_body(bodies: List[bytes], next_cursor: Optional[str]) -> bytes:
+    return (
+        b'{"items":' + list_body(bodies)
+        + b',"next_cursor":' + json.dumps(next_cursor).encode() + b"}"
+    )
+
+
+def snapshot_list_response(
+    kind: str,
+    limit: int,
+    cursor: Optional[str],
+    paged: bool,
+    headers: Optional[dict] = None,
+    queryset=None,
+    sort: SortKey = ID_ORDER,
+) -> Optional[Response]:
+    """
+    Serve a list endpoint from the snapshot, or None if it is not fresh.
+
+    Pages use the same cursors as the live ORM path, so a client can move
+    between the two mid-walk. A filtered or sorted listing passes its
+    `queryset`: the page of ids comes from that (indexed) query and only the
+    bodies from the snapshot. Unpaged filtered listings are left to the
+    live path.
+    """
+    # A bad cursor is a 400 whichever path serves the page, so reject it
+    # before touching the database.
+    after_id = decode_cursor(cursor)["id"] if cursor is not None else 0
+    if not snapshot.is_fresh(kind):
+        return None
+    if queryset is not None:
+        if not paged:
+            return None
+        rows, next_cursor = paginate(queryset, limit, cursor, sort)
+        ids = [row.id for row in rows]
+        bodies = snapshot.read_many(kind, ids)
+        if len(bodies) < len(ids):
+            return None
+        return json_response(page_body([bodies[object_id] for object_id in ids], next_cursor), headers)
+    if not paged:
+        return json_response(list_body(snapshot.read_all(kind)), headers)
+
+    bodies, last_id = snapshot.read_page(kind, limit, after_id)
+    next_cursor = encode_cursor({"id": last_id}) if last_id is not None else None
+    return json_response(page_body(bodies, next_cursor), headers)
+
+
+def snapshot_item_response(kind: str, object_id: int, headers: Optional[dict] = None) -> Optional[Response]:
+    """
+    Serve a single show / movie from the snapshot, or None to fall back.
+
+    A fresh snapshot without the row still falls back, so the live path is
+    the one deciding on 404s.
+    """
+    if not snapshot.is_fresh(kind):
+        return None
+    body = snapshot.read_one(kind, object_id)
+    return json_response(body, headers) if body is not None else None
+
+
+def snapshot_batch_response(kind: str, ids: List[int]) -> Optional[Response]:
+    """
+    Serve a batch lookup from the snapshot, or None if it is not fresh.
+
+    A fresh snapshot holds every object of its kind, so ids it does not have
+    are reported as missing.
+    """
+    if not snapshot.is_fresh(kind):
+        return None
+    bodies = snapshot.read_many(kind, ids)
+    results = b",".join(b'"%d":%s' % (object_id, bodies[object_id]) for object_id in ids if object_id in bodies)
+    missing = [object_id for object_id in ids if object_id not in bodies]
+    return json_response(
+        b'{"results":{' + results + b'},"missing":' + dumps(missing) + b"}"
+    )
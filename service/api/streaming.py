@@ -0,0 +1,65 @@
+from typing import Iterable, Iterator, Optional
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+
+from service.api.pagination import ID_ORDER, SortKey, after_condition, cursor_values, order_queryset
+from service.executor import orm_executor
+
+STREAM_CHUNK_SIZE = 200
+
+STREAM_DESCRIPTION = (
+    "Stream the whole list instead of building it in one response: `json` "
+    "sends a JSON array incrementally, `ndjson` one object per line. `limit` "
+    "and `cursor` are ignored."
+)
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def stream_query():
+    return Query(None, description=STREAM_DESCRIPTION)
+
+
+def iter_keyset(queryset, chunk_size: Optional[int] = None, sort: SortKey = ID_ORDER) -> Iterator:
+    """
+    Yield every row of `queryset` in `sort` order, `chunk_size` rows at a time.
+
+    Each chunk is its own `(key, id) > last LIMIT chunk_size` query (with its
+    prefetches) rather than one long-lived cursor: the response pulls every
+    chunk from whichever ORM executor thread is free, and Django connections
+    must not be shared between threads.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    queryset = order_queryset(queryset, sort)
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield from chunk
+        after = after_condition(cursor_values(chunk[-1], sort), sort)
+        chunk = list(queryset.filter(after)[:chunk_size])
+
+
+def _json_array(bodies: Iterable[bytes]) -> Iterator[bytes]:
+    yield b"["
+    separator = b""
+    for body in bodies:
+        yield separator + body
+        separator = b","
+    yield b"]"
+
+
+def _ndjson(bodies: Iterable[bytes]) -> Iterator[bytes]:
+    for body in bodies:
+        yield body + b"\n"
+
+
+def stream_response(bodies: Iterable[bytes], fmt: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """
+    Send already serialized objects as they are produced, so memory stays
+    flat however large the list is. `bodies` is read on the ORM executor.
+    """
+    content = _ndjson(bodies) if fmt == "ndjson" else _json_array(bodies)
+    return StreamingResponse(orm_executor.iterate(content), media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,136 @@
+"""
+Per-object cost of rendering a page of movies, before and after the
+`.values()` fast path.
+
+    docker-compose exec service python -m service.benchmarks.serialization
+
+`before` is what the routes used to do with a page of ORM rows: build the
+response schema field by field, then have FastAPI validate and serialize it
+again through `response_model` and render it with JSONResponse. `after` is
+`catalog.rows` grouping `.values()` dicts and `catalog.serializers.dumps`
+encoding them with orjson. Both start from rows already read from the
+database, so only the serialization is timed, and both must produce the
+same JSON.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import time
+from datetime import date
+from types import SimpleNamespace
+from typing import List
+
+import service.main  # noqa: F401 (sets up Django)
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from catalog.rows import SOURCE_COLUMNS, embed, group_by
+from catalog.serializers import MOVIE_FIELDS, dumps
+from service.schemas.movie import Movie as MovieSchema, MovieSource as MovieSourceSchema
+
+
+def make_rows(objects: int, sources: int):
+    """
+    The same page as `.values()` dicts (movies, then sources with their
+    `movie_id`) and as ORM-like objects with a prefetched `sources`.
+    """
+    movies = [
+        {
+            "id": i,
+            "title": f"Movie {i}",
+            "description": "A movie about benchmarks. " * 4,
+            "image": f"https://example.com/images/{i}.jpg",
+            "release_date": date(2000 + i % 25, 1 + i % 12, 1 + i % 28),
+            "imdb_rating": 5.0 + i % 50 / 10,
+            "kinopoisk_rating": None if i % 7 == 0 else 6.5,
+        }
+        for i in range(1, objects + 1)
+    ]
+    source_values = [
+        {
+            "movie_id": movie["id"],
+            "id": movie["id"] * 100 + j,
+            "url": f"https://cdn.example.com/{movie['id']}/{j}.m3u8",
+            "source_type": "hls",
+        }
+        for movie in movies
+        for j in range(sources)
+    ]
+    instances = []
+    for movie in movies:
+        own = [
+            SimpleNamespace(**{name: src[name] for name in SOURCE_COLUMNS})
+            for src in source_values
+            if src["movie_id"] == movie["id"]
+        ]
+        instances.append(SimpleNamespace(**movie, sources=SimpleNamespace(all=lambda own=own: own)))
+    return movies, source_values, instances
+
+
+def before(instances, field) -> bytes:
+    page = [
+        MovieSchema(
+            id=movie.id,
+            title=movie.title,
+            description=movie.description,
+            image=movie.image,
+            release_date=movie.release_date,
+            imdb_rating=movie.imdb_rating,
+            kinopoisk_rating=movie.kinopoisk_rating,
+            sources=[
+                MovieSourceSchema(id=src.id, url=src.url, source_type=src.source_type)
+                for src in movie.sources.all()
+            ],
+        )
+        for movie in instances
+    ]
+    content = asyncio.run(serialize_response(field=field, response_content=page))
+    return JSONResponse(content).body
+
+
+def after(movies, source_values) -> bytes:
+    page = [{name: row[name] for name in MOVIE_FIELDS} for row in movies]
+    embed(page, "sources", group_by(source_values, "movie_id"))
+    return dumps(page)
+
+
+def timed(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--objects", type=int, default=500, help="movies per page")
+    parser.add_argument("--sources", type=int, default=3, help="sources per movie")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per path; the best one counts")
+    args = parser.parse_args()
+
+    movies, source_values, instances = make_rows(args.objects, args.sources)
+    field = create_model_field("Response", List[MovieSchema], mode="serialization")
+
+    def fresh():
+        # `group_by` takes the parent key out of the rows, so every run gets
+        # its own copies, made outside the timed part.
+        return copy.deepcopy(movies), copy.deepcopy(source_values)
+
+    if json.loads(before(instances, field)) != json.loads(after(*fresh())):
+        raise SystemExit("before and after disagree")
+
+    old = timed(lambda: before(instances, field), args.repeat)
+    batches = [fresh() for _ in range(args.repeat)]
+    new = timed(lambda: after(*batches.pop()), args.repeat)
+
+    for name, seconds in (("before", old), ("after", new)):
+        print(f"{name:>6}: {seconds / args.objects * 1e6:8.2f} us/object")
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
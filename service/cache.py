@@ -0,0 +1,210 @@
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+
+import redis
+from django.conf import settings
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+
+from catalog.serializers import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Thread-safe in-process cache with per-entry TTL and LRU eviction bounded
+    by both entry count and total bytes.
+
+    Keys are tuples whose first element is an invalidation group (a catalog
+    kind). `invalidate(group)` drops the group's entries and bumps its
+    generation, so a value computed from data read before the invalidation
+    is not stored afterwards.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _discard(self, key) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def _generation(self, group: Hashable) -> tuple:
+        return (self._epoch, self._generations.get(group, 0))
+
+    def generation(self, group: Hashable) -> tuple:
+        with self._lock:
+            return self._generation(group)
+
+    def set(self, key: tuple, value, size: int, generation: Optional[tuple] = None) -> None:
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation(key[0]):
+                return
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (self._clock() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    async def aget_or_set(self, key: tuple, factory: Callable[[], Awaitable], sizeof: Callable = lambda value: 0):
+        """
+        Cached value for `key`, awaiting `factory()` and storing its result on
+        a miss. None results are returned but never stored.
+        """
+        value = self.get(key)
+        if value is None:
+            generation = self.generation(key[0])
+            value = await factory()
+            if value is not None:
+                self.set(key, value, sizeof(value), generation)
+        return value
+
+    def invalidate(self, group: Hashable) -> None:
+        with self._lock:
+            self._generations[group] = self._generations.get(group, 0) + 1
+            for key in [key for key in self._entries if key[0] == group]:
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+
+def _render(result) -> bytes:
+    if isinstance(result, Response):
+        return bytes(result.body)
+    return dumps(jsonable_encoder(result))
+
+
+def cached_route(cache: ResponseCache, kind: str):
+    """
+    Cache a router function's rendered JSON body, keyed by route and
+    parameters.
+
+    The wrapped endpoint must be async and take a `validators` dependency
+    (see service.api.conditional); its ETag / Last-Modified headers are
+    applied fresh on every response and are not part of the key. Errors such
+    as 404s propagate and are never cached, and streaming responses pass
+    straight through. The endpoint is only awaited on a miss, so hits are
+    served without leaving the event loop.
+    """
+    def decorator(func):
+        def lookup(kwargs):
+            validators = kwargs.get("validators") or {}
+            params = tuple(sorted((k, v) for k, v in kwargs.items() if k != "validators"))
+            key = (kind, func.__name__, params)
+            return key, validators, cache.get(key)
+
+        def respond(body, status, validators):
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers={**validators, "X-Cache": status},
+            )
+
+        def store(key, generation, validators, result):
+            if isinstance(result, StreamingResponse):
+                result.headers.update(validators)
+                return result
+            body = _render(result)
+            cache.set(key, body, len(body), generation)
+            return respond(body, "MISS", validators)
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key, validators, body = lookup(kwargs)
+            if body is not None:
+                return respond(body, "HIT", validators)
+            generation = cache.generation(kind)
+            return store(key, generation, validators, await func(**kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def listen_for_changes(cache: ResponseCache, redis_url: str, channel: str) -> None:
+    """
+    Drop cached entries for every catalog kind published on `channel`.
+
+    Runs forever; reconnects with backoff and clears the whole cache after
+    each (re)subscribe, since messages sent while disconnected are lost.
+    """
+    delay = 1.0
+    while True:
+        try:
+            pubsub = redis.Redis.from_url(redis_url).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(channel)
+            cache.clear()
+            delay = 1.0
+            for message in pubsub.listen():
+                cache.invalidate(message["data"].decode())
+        except redis.RedisError as exc:
+            logger.warning("Cache invalidation listener disconnected: %s", exc)
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+def start_invalidation_listener(cache: ResponseCache, redis_url: str, channel: str) -> threading.Thread:
+    thread = threading.Thread(
+        target=listen_for_changes,
+        args=(cache, redis_url, channel),
+        name="catalog-cache-invalidation",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+response_cache = ResponseCache(
+    max_entries=settings.API_CACHE_MAX_ENTRIES,
+    max_bytes=settings.API_CACHE_MAX_BYTES,
+    ttl=settings.API_CACHE_TTL,
+)
@@ -0,0 +1,161 @@
+"""
+The threads the API runs its ORM work on.
+
+Django's ORM is synchronous, so the async endpoints hand their database work
+to `orm_executor` instead of Starlette's shared threadpool: API_DB_THREADS
+threads, each keeping its own Django connection open between jobs (up to
+CONN_MAX_AGE) and checked with `close_old_connections` around every job.
+At most API_DB_QUEUE jobs wait for a free thread; past that a request is
+turned away with a 503 and Retry-After, rather than queueing without bound.
+A streamed response keeps its request's slot until the stream is done.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+STREAM_BATCH_SIZE = 50
+
+
+class ExecutorSaturated(Exception):
+    """
+    Every thread is busy and the queue is full.
+    """
+
+
+class _Slot:
+    """
+    One acquired admission slot, released at most once: by its holder, or
+    when it is dropped still held (a stream that was never started).
+    """
+
+    def __init__(self, release: Callable[[], None]):
+        self._release = release
+        self._held = True
+
+    def take(self) -> "_Slot":
+        """
+        Hand the slot to a new holder; releasing this one becomes a no-op.
+        """
+        self._held = False
+        return _Slot(self._release)
+
+    def release(self) -> None:
+        if self._held:
+            self._held = False
+            self._release()
+
+    __del__ = release
+
+
+class ORMExecutor:
+    def __init__(self, threads: int, queue: int):
+        self.threads = threads
+        self.queue = queue
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="orm")
+        self._slots = threading.BoundedSemaphore(threads + queue)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.in_flight = 0
+        self.rejected = 0
+        self.streams = 0
+
+    def _call(self, func: Callable, args, kwargs, slot: Optional[_Slot]):
+        self._local.slot = slot
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            self._local.slot = None
+
+    def _done(self, future, slot: Optional[_Slot]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        if slot is not None:
+            slot.release()
+
+    def _admit(self) -> _Slot:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated()
+        return _Slot(self._slots.release)
+
+    async def _submit(self, func: Callable, args, kwargs, admit: bool):
+        slot = self._admit() if admit else None
+        with self._lock:
+            self.in_flight += 1
+        future = self._pool.submit(self._call, func, args, kwargs, slot)
+        # Released when the job is done, not when the caller stops waiting
+        # (a cancelled request still holds its thread until then).
+        future.add_done_callback(functools.partial(self._done, slot=slot))
+        return await asyncio.wrap_future(future)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        `func(*args, **kwargs)` on one of the threads; raises
+        ExecutorSaturated if it would have to wait behind a full queue.
+        """
+        return await self._submit(func, args, kwargs, admit=True)
+
+    def iterate(self, chunks: Iterable[bytes], batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[bytes]:
+        """
+        Pull a lazily read stream `batch_size` chunks per job.
+
+        The stream holds one slot until it finishes, fails or is cancelled,
+        so long streams count against the queue like any other job. Called
+        from a job (an endpoint building its response), it takes over that
+        job's slot; otherwise it is admitted here and may raise
+        ExecutorSaturated. Its batches are never turned away.
+        """
+        current = getattr(self._local, "slot", None)
+        self._local.slot = None
+        held = current.take() if current is not None else self._admit()
+        with self._lock:
+            self.streams += 1
+        return self._stream(iter(chunks), batch_size, _Slot(functools.partial(self._end_stream, held)))
+
+    def _end_stream(self, held: _Slot) -> None:
+        with self._lock:
+            self.streams -= 1
+        held.release()
+
+    async def _stream(self, iterator: Iterator[bytes], batch_size: int, slot: _Slot) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                batch = await self._submit(lambda: list(islice(iterator, batch_size)), (), {}, admit=False)
+                if not batch:
+                    return
+                yield b"".join(batch)
+        finally:
+            slot.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threads": self.threads,
+                "queue": self.queue,
+                "in_flight": self.in_flight,
+                "streams": self.streams,
+                "rejected": self.rejected,
+            }
+
+
+def orm_endpoint(func: Callable) -> Callable:
+    """
+    Make a sync endpoint async, running its body on `orm_executor`.
+    """
+    @functools.wraps(func)
+    async def endpoint(*args, **kwargs):
+        return await orm_executor.run(func, *args, **kwargs)
+
+    return endpoint
+
+
+orm_executor = ORMExecutor(threads=settings.API_DB_THREADS, queue=settings.API_DB_QUEUE)
@@ -13,9 +13,40 @@ import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
+from contextlib import asynccontextmanager
+from django.conf import settings
 from fastapi import FastAPI
-from service.api import shows, movies
+from fastapi.responses import JSONResponse
+from service.api import shows, movies, search
+from service.cache import response_cache, start_invalidation_listener
+from service.executor import ExecutorSaturated, orm_executor
 
-app = FastAPI(title="Media API")
+
+@asynccontextmanager
+async def lifespan(app):
+    start_invalidation_listener(
+        response_cache, settings.REDIS_URL, settings.CATALOG_CHANGES_CHANNEL
+    )
+    yield
+
+
+app = FastAPI(title="Media API", lifespan=lifespan)
 app.include_router(shows.router)
 app.include_router(movies.router)
+app.include_router(search.router)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated(request, exc):
+    # Every ORM thread is busy and the queue is full: shed the request.
+    return JSONResponse({"detail": "Server busy, retry shortly"}, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.get("/cache/stats", include_in_schema=False)
+async def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/executor/stats", include_in_schema=False)
+async def executor_stats():
+    return orm_executor.stats()
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Generic, List, TypeVar
+
+T = TypeVar("T")
+
+MAX_BATCH_SIZE = 200
+
+class BatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchResult(BaseModel, Generic[T]):
+    results: Dict[int, T]
+    missing: List[int] = []
@@ -17,7 +17,7 @@ class Movie(BaseModel):
     image: str
     release_date: Optional[date]  
     imdb_rating: float
-    kinopoisk_rating: float
+    kinopoisk_rating: Optional[float]
     sources: List[MovieSource] = []  
 
     class Config:
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Literal
+
+class SearchHit(BaseModel):
+    kind: Literal["shows", "movies"]
+    id: int
+    title: str
+    rank: float
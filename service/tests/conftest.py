@@ -0,0 +1,61 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # Tests have no Redis listener, so start each one with an empty cache.
+    from service.cache import response_cache
+    response_cache.clear()
+
+
+@pytest.fixture
+def make_movie():
+    from catalog.models import Movie
+
+    def make(title, **fields):
+        defaults = {
+            "description": "",
+            "image": "https://example.com/image.jpg",
+            "release_date": date(2020, 1, 1),
+            "release_year": 2020,
+            "imdb_rating": 7.0,
+            "kinopoisk_rating": 0.0,
+        }
+        defaults.update(fields)
+        return Movie.objects.create(title=title, **defaults)
+
+    return make
+
+
+@pytest.fixture
+def make_show():
+    from catalog.models import Episode, Season, Show, Source
+
+    def make(title, seasons=2, episodes=2):
+        show = Show.objects.create(
+            title=title,
+            description="",
+            image="https://example.com/image.jpg",
+            release_date=date(2020, 1, 1),
+            imdb_rating=7.0,
+            kinopoisk_rating=0.0,
+        )
+        for season_number in range(1, seasons + 1):
+            season = Season.objects.create(show=show, number=season_number)
+            for ep_number in range(1, episodes + 1):
+                episode = Episode.objects.create(
+                    season=season,
+                    number=ep_number,
+                    title=f"Episode {ep_number}",
+                    release_date=date(2020, 1, 1),
+                )
+                Source.objects.create(
+                    episode=episode,
+                    url="https://example.com/episode.mp4",
+                    source_type="direct",
+                )
+        return show
+
+    return make
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.db import connection
+from fastapi.testclient import TestClient
+from service import executor
+from service.executor import ExecutorSaturated, ORMExecutor
+from service.main import app
+
+client = TestClient(app)
+
+
+class Busy:
+    """
+    Keeps `count` threads of `orm` busy until the block exits.
+    """
+
+    def __init__(self, orm, count=1):
+        self.orm = orm
+        self.count = count
+        self.release = threading.Event()
+        self.threads = []
+
+    def __enter__(self):
+        for _ in range(self.count):
+            thread = threading.Thread(target=asyncio.run, args=(self.orm.run(self.release.wait),))
+            thread.start()
+            self.threads.append(thread)
+        while self.orm.stats()["in_flight"] < self.count:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.release.set()
+        for thread in self.threads:
+            thread.join()
+
+
+def test_jobs_past_the_queue_are_rejected():
+    orm = ORMExecutor(threads=1, queue=1)
+    with Busy(orm, count=2):
+        with pytest.raises(ExecutorSaturated):
+            asyncio.run(orm.run(lambda: None))
+    assert orm.stats() == {"threads": 1, "queue": 1, "in_flight": 0, "streams": 0, "rejected": 1}
+    assert asyncio.run(orm.run(lambda: 42)) == 42
+
+
+async def consume(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_streams_hold_their_request_slot_until_they_finish():
+    orm = ORMExecutor(threads=1, queue=1)
+    stream = asyncio.run(orm.run(orm.iterate, [b"a", b"b", b"c"], batch_size=2))
+    assert orm.stats()["streams"] == 1
+
+    with Busy(orm):
+        with pytest.raises(ExecutorSaturated):
+            asyncio.run(orm.run(lambda: None))
+
+    assert asyncio.run(consume(stream)) == b"abc"
+    assert orm.stats()["streams"] == 0
+    with Busy(orm, count=2):
+        pass
+
+
+def test_cancelled_and_unstarted_streams_give_their_slot_back():
+    orm = ORMExecutor(threads=1, queue=0)
+
+    async def cancel():
+        stream = orm.iterate([b"a", b"b"], batch_size=1)
+        assert await stream.__anext__() == b"a"
+        await stream.aclose()
+
+    asyncio.run(cancel())
+    stream = asyncio.run(orm.run(orm.iterate, [b"a"]))
+    with pytest.raises(ExecutorSaturated):
+        asyncio.run(orm.run(lambda: None))
+    del stream
+    assert orm.stats()["streams"] == 0
+    assert asyncio.run(orm.run(lambda: 42)) == 42
+
+
+@pytest.mark.django_db
+def test_threads_keep_their_connection_between_jobs():
+    orm = ORMExecutor(threads=1, queue=0)
+
+    def current():
+        connection.ensure_connection()
+        return threading.get_ident(), id(connection.connection)
+
+    first, second = asyncio.run(orm.run(current)), asyncio.run(orm.run(current))
+    assert first == second
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saturated_api_sheds_load_but_serves_cached_responses(monkeypatch, make_movie):
+    movie = make_movie("Cached")
+    orm = ORMExecutor(threads=1, queue=0)
+    monkeypatch.setattr(executor, "orm_executor", orm)
+    assert client.get(f"/movies/{movie.id}").headers["X-Cache"] == "MISS"
+
+    with Busy(orm):
+        r = client.get(f"/movies/{movie.id}")
+        assert (r.status_code, r.headers["X-Cache"]) == (200, "HIT")
+
+        r = client.get("/movies/")
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == "1"
+
+    assert client.get("/movies/").status_code == 200
+    assert orm.stats()["rejected"] == 1
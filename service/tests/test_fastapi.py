@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 
@@ -12,10 +13,16 @@ django.setup()
 
 import pytest
 from fastapi.testclient import TestClient
+from catalog.models import MOVIES
+from catalog.search import index_objects
+from catalog.snapshot import refresh_snapshot
+from catalog.versioning import bump_version
+from service.cache import ResponseCache, response_cache
 from service.main import app
 
 client = TestClient(app)
 
+
 def test_root_not_found():
     r = client.get("/")
     assert r.status_code == 404
@@ -31,3 +38,210 @@ def test_movies_list_returns_200():
     r = client.get("/movies/")
     assert r.status_code == 200
     assert isinstance(r.json(), list)
+
+@pytest.mark.django_db
+def test_limit_or_cursor_opts_into_the_page_envelope():
+    assert client.get("/shows/?limit=10").json() == {"items": [], "next_cursor": None}
+    assert client.get("/movies/", params={"cursor": "eyJpZCI6MH0"}).json() == {"items": [], "next_cursor": None}
+
+@pytest.mark.django_db(transaction=True)
+def test_movies_keyset_pagination_walks_every_row_once(make_movie):
+    ids = [make_movie(f"Movie {i}").id for i in range(7)]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/movies/", params=params).json()
+        seen.extend(m["id"] for m in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ids
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected():
+    assert client.get("/movies/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+@pytest.mark.django_db(transaction=True)
+def test_movies_snapshot_matches_live_payload(make_movie):
+    movie = make_movie("Snapshot")
+    movie.sources.create(url="https://example.com/movie.mp4", source_type="direct")
+    make_movie("Other")
+    paths = ["/movies/", "/movies/?limit=1", f"/movies/{movie.id}"]
+    live = {path: client.get(path).content for path in paths}
+
+    refresh_snapshot(MOVIES)
+    response_cache.invalidate(MOVIES)
+    assert {path: client.get(path).content for path in paths} == live
+
+@pytest.mark.django_db(transaction=True)
+def test_conditional_get_answers_304_until_catalog_version_changes(make_movie):
+    make_movie("Cached")
+    bump_version(MOVIES)
+
+    r = client.get("/movies/")
+    etag = r.headers["etag"]
+    last_modified = r.headers["last-modified"]
+
+    r = client.get("/movies/", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+    r = client.get("/movies/", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+
+    # Each query string is its own representation.
+    assert client.get("/movies/?limit=1", headers={"If-None-Match": etag}).status_code == 200
+
+    bump_version(MOVIES)
+    response_cache.invalidate(MOVIES)
+    r = client.get("/movies/", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_responses_carry_validators(make_movie):
+    movie = make_movie("Snapshot")
+    refresh_snapshot(MOVIES)
+    bump_version(MOVIES)
+
+    r = client.get(f"/movies/{movie.id}")
+    assert "etag" in r.headers
+    r = client.get(f"/movies/{movie.id}", headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+@pytest.mark.django_db(transaction=True)
+def test_responses_are_cached_until_invalidated(make_movie):
+    make_movie("First")
+    r = client.get("/movies/")
+    assert r.headers["x-cache"] == "MISS"
+    make_movie("Second")
+    r = client.get("/movies/")
+    assert r.headers["x-cache"] == "HIT"
+    assert len(r.json()) == 1
+
+    response_cache.invalidate(MOVIES)
+    r = client.get("/movies/")
+    assert r.headers["x-cache"] == "MISS"
+    assert len(r.json()) == 2
+    assert client.get("/cache/stats").json()["hits"] >= 1
+
+def test_response_cache_evicts_lru_by_bytes_and_expires_by_ttl():
+    now = [0.0]
+    cache = ResponseCache(max_entries=10, max_bytes=10, ttl=5, clock=lambda: now[0])
+    cache.set(("movies", "a"), b"aaaa", 4)
+    cache.set(("movies", "b"), b"bbbb", 4)
+    assert cache.get(("movies", "a")) == b"aaaa"
+    cache.set(("shows", "c"), b"cccc", 4)
+    assert cache.get(("movies", "b")) is None
+    assert cache.get(("movies", "a")) == b"aaaa"
+
+    now[0] = 6.0
+    assert cache.get(("movies", "a")) is None
+    assert cache.stats()["evictions"] == 1
+
+def test_response_cache_skips_values_read_before_invalidation():
+    cache = ResponseCache(max_entries=10, max_bytes=100, ttl=60)
+    generation = cache.generation("movies")
+    cache.invalidate("movies")
+    cache.set(("movies", "a"), b"old", 3, generation)
+    assert cache.get(("movies", "a")) is None
+
+@pytest.mark.django_db(transaction=True)
+def test_streaming_modes_match_the_full_list(monkeypatch, make_movie):
+    monkeypatch.setattr("service.api.streaming.STREAM_CHUNK_SIZE", 2)
+    for i in range(5):
+        make_movie(f"Movie {i}")
+    expected = client.get("/movies/").json()
+
+    r = client.get("/movies/?stream=json")
+    assert r.headers["content-type"] == "application/json"
+    assert r.json() == expected
+
+    r = client.get("/movies/?stream=ndjson")
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in r.text.splitlines()] == expected
+
+    refresh_snapshot(MOVIES)
+    assert client.get("/movies/?stream=json").json() == expected
+    assert client.get("/movies/?stream=json&include=&fields=title").json() == [
+        {"id": m["id"], "title": m["title"]} for m in expected
+    ]
+
+@pytest.mark.django_db(transaction=True)
+def test_movie_batch_reports_missing_ids(make_movie):
+    movies = [make_movie(f"Movie {i}") for i in range(3)]
+    for movie in movies:
+        movie.sources.create(url="https://example.com/movie.mp4", source_type="direct")
+    ids = [movies[2].id, 999999, movies[0].id, movies[2].id]
+
+    r = client.post("/movies/batch", json={"ids": ids})
+    assert r.status_code == 200
+    body = r.json()
+    assert list(body["results"]) == [str(movies[2].id), str(movies[0].id)]
+    assert body["results"][str(movies[0].id)] == client.get(f"/movies/{movies[0].id}").json()
+    assert body["missing"] == [999999]
+
+    refresh_snapshot(MOVIES)
+    assert client.post("/movies/batch", json={"ids": ids}).json() == body
+
+def test_batch_requires_ids():
+    assert client.post("/movies/batch", json={"ids": []}).status_code == 422
+    assert client.post("/shows/batch", json={}).status_code == 422
+
+@pytest.mark.django_db(transaction=True)
+def test_search_endpoint_returns_ranked_hits(make_movie):
+    movie = make_movie("Space Odyssey", description="Astronauts and a monolith.")
+    other = make_movie("Quiet Place", description="Nothing about space here.")
+    index_objects(MOVIES, [movie, other])
+
+    r = client.get("/search", params={"q": "space"})
+    assert r.status_code == 200
+    assert [hit["id"] for hit in r.json()] == [movie.id, other.id]
+    assert client.get("/search", params={"q": "space", "kind": "shows"}).json() == []
+    assert client.get("/search").status_code == 422
+
+@pytest.mark.django_db(transaction=True)
+def test_movies_filter_and_sort_walk_every_match_once(make_movie):
+    ratings = [(2009, 9.0, 5.0), (2010, 7.5, 8.0), (2012, 6.9, 9.0), (2013, 8.0, None),
+               (2014, 7.0, 8.0), (2015, 9.5, 3.0), (2016, 8.0, 7.0)]
+    movies = [
+        make_movie(f"Movie {year}", release_year=year, imdb_rating=imdb, kinopoisk_rating=kp)
+        for year, imdb, kp in ratings
+    ]
+    by_title = {movie.title: movie.id for movie in movies}
+    # 2010-2015 with imdb >= 7, kinopoisk descending, ties by id descending,
+    # missing ratings last.
+    expected = [by_title[f"Movie {year}"] for year in (2014, 2010, 2015, 2013)]
+    params = {"year_from": 2010, "year_to": 2015, "imdb_min": 7, "sort": "-kinopoisk_rating", "limit": 1}
+
+    def walk():
+        seen, cursor = [], None
+        while True:
+            page = client.get("/movies/", params={**params, "cursor": cursor} if cursor else params).json()
+            seen.extend(movie["id"] for movie in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen
+
+    assert walk() == expected
+    refresh_snapshot(MOVIES)
+    response_cache.invalidate(MOVIES)
+    assert walk() == expected
+    del params["limit"]
+    assert [m["id"] for m in client.get("/movies/", params=params).json()] == expected
+    assert [m["id"] for m in client.get("/movies/", params={**params, "stream": "json"}).json()] == expected
+
+@pytest.mark.django_db
+def test_movies_filter_params_are_validated():
+    assert client.get("/movies/", params={"sort": "title"}).status_code == 400
+    assert client.get("/movies/", params={"year_from": 2015, "year_to": 2010}).status_code == 400
+    assert client.get("/movies/", params={"imdb_min": 11}).status_code == 422
+    # A plain id cursor cannot continue a sorted walk.
+    r = client.get("/movies/", params={"sort": "imdb_rating", "cursor": "eyJpZCI6MX0"})
+    assert r.status_code == 400
@@ -0,0 +1,66 @@
+import inspect
+import os
+import sys
+from datetime import date
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from catalog.models import Movie, Show
+from service.api.filtering import movie_filters, show_filters
+from service.api.pagination import order_queryset
+
+
+def build(dependency, **params):
+    # Call the FastAPI dependency directly, with every other parameter unset.
+    defaults = {name: None for name in inspect.signature(dependency).parameters}
+    return dependency(**{**defaults, **params})
+
+
+def query_plan(model, filters) -> str:
+    queryset = order_queryset(filters.apply(model.objects.all()), filters.sort)[:51]
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model, dependency, params, index", [
+    (Movie, movie_filters, {"year_from": 2010, "year_to": 2015}, "movie_year_imdb_idx"),
+    (Movie, movie_filters, {"year_from": 2010}, "movie_year_imdb_idx"),
+    (Movie, movie_filters, {"released_from": date(2020, 1, 1)}, "movie_release_date_idx"),
+    (Movie, movie_filters, {"imdb_min": 7}, "movie_imdb_rating_idx"),
+    (Movie, movie_filters, {"kinopoisk_max": 3}, "movie_kinopoisk_rating_idx"),
+    (Show, show_filters, {"year_to": 2000}, "show_release_date_idx"),
+    (Show, show_filters, {"released_from": date(2020, 1, 1)}, "show_release_date_idx"),
+    (Show, show_filters, {"imdb_min": 7}, "show_imdb_rating_idx"),
+    (Show, show_filters, {"kinopoisk_min": 7}, "show_kinopoisk_rating_idx"),
+])
+def test_each_filter_searches_its_index(model, dependency, params, index):
+    plan = query_plan(model, build(dependency, **params))
+    assert f"SEARCH {model._meta.db_table} USING INDEX {index}" in plan
+
+
+@pytest.mark.django_db
+def test_combined_filters_and_sort_still_search_an_index():
+    filters = build(movie_filters, year_from=2010, year_to=2015, imdb_min=7, sort="-kinopoisk_rating")
+    assert "SEARCH catalog_movie USING INDEX" in query_plan(Movie, filters)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model, dependency, sort, index", [
+    (Movie, movie_filters, "kinopoisk_rating", "movie_kinopoisk_rating_idx"),
+    (Movie, movie_filters, "-imdb_rating", "movie_imdb_rating_idx"),
+    (Movie, movie_filters, "-release_date", "movie_release_date_idx"),
+    (Show, show_filters, "release_date", "show_release_date_idx"),
+    (Show, show_filters, "-kinopoisk_rating", "show_kinopoisk_rating_idx"),
+])
+def test_sorts_read_in_index_order(model, dependency, sort, index):
+    plan = query_plan(model, build(dependency, sort=sort))
+    assert f"USING INDEX {index}" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,232 @@
+import os
+import sys
+from datetime import date
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+
+import pytest
+from django.db.backends.utils import CursorWrapper
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from catalog.models import SHOWS, Show
+from catalog.snapshot import mark_stale, refresh_snapshot
+from catalog.versioning import bump_version
+from service.cache import response_cache
+from service.main import app
+from service.schemas.batch import BatchResult
+from service.schemas.page import Page
+from service.schemas.show import Episode as EpisodeSchema, Season as SeasonSchema, Show as ShowSchema
+
+client = TestClient(app)
+
+
+def capture_queries(monkeypatch, path, headers=None, status=200, json=None):
+    # Endpoints run in the server's worker threads, each with its own
+    # connection, so count at the cursor level rather than per connection.
+    # The response cache is cleared first so the cost of a miss is measured.
+    response_cache.clear()
+    executed = []
+    original = CursorWrapper._execute_with_wrappers
+
+    def counting(self, sql, *args, **kwargs):
+        executed.append(sql)
+        return original(self, sql, *args, **kwargs)
+
+    with monkeypatch.context() as m:
+        m.setattr(CursorWrapper, "_execute_with_wrappers", counting)
+        if json is None:
+            r = client.get(path, headers=headers)
+        else:
+            r = client.post(path, headers=headers, json=json)
+    assert r.status_code == status
+    return executed
+
+
+@pytest.mark.django_db(transaction=True)
+def test_show_tree_is_nested_and_ordered(make_show):
+    show = make_show("Tree")
+    r = client.get(f"/shows/{show.id}")
+    assert r.status_code == 200
+    seasons = r.json()["seasons"]
+    assert [s["number"] for s in seasons] == [1, 2]
+    assert [e["number"] for e in seasons[0]["episodes"]] == [1, 2]
+    assert len(seasons[0]["episodes"][0]["sources"]) == 1
+
+    r = client.get(f"/shows/{show.id}/episodes")
+    assert len(r.json()) == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_show_endpoints_use_constant_query_count(monkeypatch, make_show):
+    show = make_show("First")
+    paths = [
+        "/shows/",
+        f"/shows/{show.id}",
+        f"/shows/{show.id}/seasons",
+        f"/shows/{show.id}/episodes",
+    ]
+    before = {path: len(capture_queries(monkeypatch, path)) for path in paths}
+
+    for i in range(5):
+        make_show(f"Show {i}", seasons=3, episodes=4)
+    make_show("Wide", seasons=1, episodes=1)
+    show.seasons.first().episodes.create(
+        number=3, title="Episode 3", release_date=date(2020, 1, 1)
+    )
+
+    after = {path: len(capture_queries(monkeypatch, path)) for path in paths}
+    assert before == after
+    # Catalog version, snapshot freshness, then one query per level of the
+    # show -> season -> episode -> source tree.
+    assert after["/shows/"] == 6
+
+
+@pytest.mark.django_db
+def test_missing_show_returns_404():
+    assert client.get("/shows/999999/seasons").status_code == 404
+    assert client.get("/shows/999999/episodes").status_code == 404
+    assert client.get("/shows/999999").status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_serves_same_payload_as_live_orm(make_show):
+    show = make_show("Snapshot")
+    make_show("Other")
+    paths = ["/shows/", "/shows/?limit=1", f"/shows/{show.id}"]
+    live = {path: client.get(path).json() for path in paths}
+
+    refresh_snapshot(SHOWS)
+    response_cache.invalidate(SHOWS)
+    assert {path: client.get(path).json() for path in paths} == live
+
+    Show.objects.filter(id=show.id).update(title="Renamed")
+    response_cache.invalidate(SHOWS)
+    assert client.get(f"/shows/{show.id}").json()["title"] == "Snapshot"
+    mark_stale(SHOWS)
+    response_cache.invalidate(SHOWS)
+    assert client.get(f"/shows/{show.id}").json()["title"] == "Renamed"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_partial_snapshot_refresh_rebuilds_only_the_given_rows(make_show):
+    first, second = make_show("First"), make_show("Second")
+    refresh_snapshot(SHOWS)
+    Show.objects.filter(id=first.id).update(title="First, renamed")
+    Show.objects.filter(id=second.id).update(title="Second, renamed")
+
+    refresh_snapshot(SHOWS, [first.id])
+    assert client.get(f"/shows/{first.id}").json()["title"] == "First, renamed"
+    assert client.get(f"/shows/{second.id}").json()["title"] == "Second"
+
+    # A stale snapshot is rebuilt whole, and served again afterwards.
+    mark_stale(SHOWS)
+    refresh_snapshot(SHOWS, [first.id])
+    Show.objects.filter(id=second.id).update(title="Second, live")
+    response_cache.invalidate(SHOWS)
+    assert client.get(f"/shows/{second.id}").json()["title"] == "Second, renamed"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_live_bytes_are_what_the_response_schemas_would_send(make_show):
+    show = make_show("Bytes")
+    make_show("Other", seasons=1, episodes=3)
+    schemas = {
+        "/shows/": list[ShowSchema],
+        "/shows/?limit=1": Page[ShowSchema],
+        f"/shows/{show.id}": ShowSchema,
+        f"/shows/{show.id}/seasons": list[SeasonSchema],
+        f"/shows/{show.id}/episodes": list[EpisodeSchema],
+    }
+    for path, schema in schemas.items():
+        body = client.get(path).content
+        adapter = TypeAdapter(schema)
+        assert adapter.dump_json(adapter.validate_json(body)) == body, path
+
+    body = client.post("/shows/batch", json={"ids": [show.id, 999999]}).content
+    adapter = TypeAdapter(BatchResult[ShowSchema])
+    assert adapter.dump_json(adapter.validate_json(body)) == body
+
+    live = client.get(f"/shows/{show.id}").content
+    refresh_snapshot(SHOWS)
+    response_cache.invalidate(SHOWS)
+    assert client.get(f"/shows/{show.id}").content == live
+
+
+def test_openapi_still_documents_the_response_schemas():
+    paths = client.get("/openapi.json").json()["paths"]
+    ok = paths["/shows/{show_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert ok == {"$ref": "#/components/schemas/Show"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_not_modified_reads_only_the_version_row(monkeypatch, make_show):
+    show = make_show("Polled")
+    bump_version(SHOWS)
+    for path in ["/shows/", f"/shows/{show.id}/episodes"]:
+        etag = client.get(path).headers["etag"]
+        assert len(capture_queries(monkeypatch, path, {"If-None-Match": etag}, status=304)) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_shallow_listing_is_one_narrow_query(monkeypatch, make_show):
+    for i in range(3):
+        make_show(f"Show {i}")
+
+    r = client.get("/shows/", params={"include": "", "fields": "title,imdb_rating"})
+    assert r.json()[0] == {"id": r.json()[0]["id"], "title": "Show 0", "imdb_rating": 7.0}
+
+    executed = capture_queries(monkeypatch, "/shows/?include=&fields=title,imdb_rating")
+    show_queries = [sql for sql in executed if "catalog_show" in sql]
+    assert len(show_queries) == 1
+    assert "description" not in show_queries[0]
+    assert not any("catalog_season" in sql or "catalog_episode" in sql for sql in executed)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_include_embeds_levels_down_to_the_deepest_requested(make_show):
+    show = make_show("Nested")
+    seasons = client.get(f"/shows/{show.id}", params={"include": "seasons"}).json()["seasons"]
+    assert "episodes" not in seasons[0]
+
+    seasons = client.get(f"/shows/{show.id}", params={"include": "episodes"}).json()["seasons"]
+    assert "sources" not in seasons[0]["episodes"][0]
+
+    full = client.get(f"/shows/{show.id}", params={"include": "sources"}).json()
+    assert full == client.get(f"/shows/{show.id}").json()
+
+
+@pytest.mark.django_db
+def test_unknown_include_or_field_is_rejected():
+    assert client.get("/shows/", params={"include": "cast"}).status_code == 400
+    assert client.get("/movies/", params={"fields": "budget"}).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_show_batch_uses_constant_query_count(monkeypatch, make_show):
+    ids = [make_show("First").id]
+    before = capture_queries(monkeypatch, "/shows/batch", json={"ids": ids})
+
+    ids += [make_show(f"Show {i}", seasons=3).id for i in range(4)]
+    after = capture_queries(monkeypatch, "/shows/batch", json={"ids": ids + [999999]})
+    assert len(after) == len(before)
+
+    r = client.post("/shows/batch", json={"ids": ids + [999999]})
+    assert len(r.json()["results"]) == len(ids)
+    assert r.json()["missing"] == [999999]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_year_filter_and_date_sort_on_shows(make_show):
+    released = {"Old": date(1999, 12, 31), "New": date(2011, 1, 1), "Newest": date(2012, 6, 1)}
+    for title, release_date in released.items():
+        Show.objects.filter(id=make_show(title, seasons=1).id).update(release_date=release_date)
+
+    r = client.get("/shows/", params={"year_from": 2000, "sort": "-release_date", "include": "", "fields": "title"})
+    assert [show["title"] for show in r.json()] == ["Newest", "New"]